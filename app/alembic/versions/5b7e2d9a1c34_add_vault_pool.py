@@ -0,0 +1,49 @@
+"""add vault_pool table
+
+Revision ID: 5b7e2d9a1c34
+Revises: 13d9e5c7f4b2
+Create Date: 2025-08-20 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5b7e2d9a1c34"
+down_revision: Union[str, Sequence[str], None] = "13d9e5c7f4b2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "vault_pool",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("vault_id", sa.String(), nullable=False),
+        sa.Column("assets", postgresql.JSONB(), nullable=False, server_default=sa.text("'{}'::jsonb")),
+        sa.Column("ready", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("claimed_by", sa.UUID(), nullable=True),
+        sa.Column("claimed_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.ForeignKeyConstraint(["claimed_by"], ["users.id"]),
+        sa.UniqueConstraint("vault_id"),
+    )
+    op.create_index(
+        "ix_vault_pool_unclaimed",
+        "vault_pool",
+        ["created_at"],
+        unique=False,
+        postgresql_where=sa.text("claimed_by IS NULL AND ready"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_vault_pool_unclaimed", table_name="vault_pool")
+    op.drop_table("vault_pool")
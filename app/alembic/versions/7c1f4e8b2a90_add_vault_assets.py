@@ -0,0 +1,47 @@
+"""add vault_assets mirror table
+
+Revision ID: 7c1f4e8b2a90
+Revises: 5b7e2d9a1c34
+Create Date: 2025-08-22 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7c1f4e8b2a90"
+down_revision: Union[str, Sequence[str], None] = "5b7e2d9a1c34"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "vault_assets",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("vault_id", sa.String(), nullable=False),
+        sa.Column("asset_id", sa.String(), nullable=False),
+        sa.Column("address", sa.String(), nullable=True),
+        sa.Column("synced_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("vault_id", "asset_id", name="uq_vault_assets_vault_asset"),
+    )
+    # Seed the mirror with what the wallets table already knows
+    op.execute(
+        """
+        INSERT INTO vault_assets (id, vault_id, asset_id, address, synced_at)
+        SELECT DISTINCT ON (vault_id, currency) gen_random_uuid(), vault_id, currency, address, now()
+        FROM wallets
+        WHERE network = 'FIREBLOCKS'
+        ORDER BY vault_id, currency, created_at
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("vault_assets")
@@ -0,0 +1,37 @@
+"""add event_id to webhook_events for deduplication
+
+Revision ID: 9d3a6f1e5b27
+Revises: 7c1f4e8b2a90
+Create Date: 2025-08-25 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9d3a6f1e5b27"
+down_revision: Union[str, Sequence[str], None] = "7c1f4e8b2a90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("webhook_events", sa.Column("event_id", sa.String(), nullable=True))
+    op.execute("UPDATE webhook_events SET event_id = id::text WHERE event_id IS NULL")
+    op.alter_column("webhook_events", "event_id", nullable=False)
+    op.create_index(
+        "ux_webhook_events_provider_event",
+        "webhook_events",
+        ["provider", "event_id"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ux_webhook_events_provider_event", table_name="webhook_events")
+    op.drop_column("webhook_events", "event_id")
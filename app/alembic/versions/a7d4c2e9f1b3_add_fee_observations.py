@@ -0,0 +1,41 @@
+"""add fee_observations history table
+
+Revision ID: a7d4c2e9f1b3
+Revises: f3c8a1e6d2b9
+Create Date: 2025-09-05 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a7d4c2e9f1b3"
+down_revision: Union[str, Sequence[str], None] = "f3c8a1e6d2b9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "fee_observations",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("asset", sa.String(), nullable=False),
+        sa.Column("observed_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("low", sa.BigInteger(), nullable=False),
+        sa.Column("medium", sa.BigInteger(), nullable=False),
+        sa.Column("high", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_fee_observations_asset_observed", "fee_observations", ["asset", "observed_at"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_fee_observations_asset_observed", table_name="fee_observations")
+    op.drop_table("fee_observations")
@@ -0,0 +1,33 @@
+"""add partial index on unprocessed webhook events
+
+Revision ID: b4e8c2d7a613
+Revises: 9d3a6f1e5b27
+Create Date: 2025-08-26 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b4e8c2d7a613"
+down_revision: Union[str, Sequence[str], None] = "9d3a6f1e5b27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_webhook_events_unprocessed",
+        "webhook_events",
+        ["received_at"],
+        postgresql_where=sa.text("processed_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_webhook_events_unprocessed", table_name="webhook_events")
@@ -0,0 +1,35 @@
+"""add partial index for the batched withdrawal queue
+
+Revision ID: c5e1b7f3a9d4
+Revises: a7d4c2e9f1b3
+Create Date: 2025-09-08 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c5e1b7f3a9d4"
+down_revision: Union[str, Sequence[str], None] = "a7d4c2e9f1b3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_transactions_withdrawal_queue",
+        "transactions",
+        ["created_at"],
+        postgresql_where=sa.text(
+            "provider_ref_id IS NULL AND type = 'crypto_out' AND status = 'pending'"
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_transactions_withdrawal_queue", table_name="transactions")
@@ -0,0 +1,38 @@
+"""add id to the transaction history indexes for keyset paging
+
+Revision ID: d1a7f3b9c5e2
+Revises: b4e8c2d7a613
+Create Date: 2025-08-28 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d1a7f3b9c5e2"
+down_revision: Union[str, Sequence[str], None] = "b4e8c2d7a613"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # (created_at, id) is the page key, so the index covers the whole seek
+    op.drop_index("ix_transactions_user_created", table_name="transactions")
+    op.create_index(
+        "ix_transactions_user_created", "transactions", ["user_id", "created_at", "id"]
+    )
+    op.drop_index("ix_transactions_wallet_created", table_name="transactions")
+    op.create_index(
+        "ix_transactions_wallet_created", "transactions", ["wallet_id", "created_at", "id"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_transactions_wallet_created", table_name="transactions")
+    op.create_index("ix_transactions_wallet_created", "transactions", ["wallet_id", "created_at"])
+    op.drop_index("ix_transactions_user_created", table_name="transactions")
+    op.create_index("ix_transactions_user_created", "transactions", ["user_id", "created_at"])
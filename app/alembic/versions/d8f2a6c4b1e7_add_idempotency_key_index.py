@@ -0,0 +1,33 @@
+"""add index for Idempotency-Key lookups
+
+Revision ID: d8f2a6c4b1e7
+Revises: c5e1b7f3a9d4
+Create Date: 2025-09-15 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d8f2a6c4b1e7"
+down_revision: Union[str, Sequence[str], None] = "c5e1b7f3a9d4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_transactions_idempotency_key",
+        "transactions",
+        ["user_id", "idempotency_key"],
+        postgresql_where=sa.text("idempotency_key IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_transactions_idempotency_key", table_name="transactions")
@@ -0,0 +1,100 @@
+"""partition transactions by month on created_at
+
+Revision ID: e6b2a9d4f8c1
+Revises: d1a7f3b9c5e2
+Create Date: 2025-09-01 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e6b2a9d4f8c1"
+down_revision: Union[str, Sequence[str], None] = "d1a7f3b9c5e2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_transactions_user_created", "user_id, created_at, id"),
+    ("ix_transactions_wallet_created", "wallet_id, created_at, id"),
+    ("ix_transactions_provider_ref", "provider, provider_ref_id"),
+    ("ix_transactions_group_id", "group_id"),
+    ("ix_transactions_type_status", "type, status"),
+]
+
+# Monthly partitions from the oldest row (or this month) to three months ahead
+CREATE_PARTITIONS = """
+DO $$
+DECLARE
+    start_month date := date_trunc(
+        'month', coalesce((SELECT min(created_at) FROM transactions_unpartitioned), now())
+    );
+    end_month date := date_trunc('month', now()) + interval '3 months';
+BEGIN
+    WHILE start_month <= end_month LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF transactions FOR VALUES FROM (%L) TO (%L)',
+            'transactions_' || to_char(start_month, '"y"YYYY"m"MM'),
+            start_month,
+            start_month + interval '1 month'
+        );
+        start_month := start_month + interval '1 month';
+    END LOOP;
+END $$;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE transactions RENAME TO transactions_unpartitioned")
+    op.execute(
+        "ALTER TABLE transactions_unpartitioned "
+        "RENAME CONSTRAINT transactions_pkey TO transactions_unpartitioned_pkey"
+    )
+    for name, _ in INDEXES:
+        op.execute(f"ALTER INDEX {name} RENAME TO {name}_old")
+    op.execute(
+        """
+        CREATE TABLE transactions (
+            LIKE transactions_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+            PRIMARY KEY (id, created_at),
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (wallet_id) REFERENCES wallets (id),
+            FOREIGN KEY (counterparty_user) REFERENCES users (id)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute(CREATE_PARTITIONS)
+    op.execute("INSERT INTO transactions SELECT * FROM transactions_unpartitioned")
+    op.execute("DROP TABLE transactions_unpartitioned")
+    for name, columns in INDEXES:
+        op.execute(f"CREATE INDEX {name} ON transactions ({columns})")
+    op.execute("ANALYZE transactions")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE transactions RENAME TO transactions_partitioned")
+    op.execute(
+        "ALTER TABLE transactions_partitioned "
+        "RENAME CONSTRAINT transactions_pkey TO transactions_partitioned_pkey"
+    )
+    for name, _ in INDEXES:
+        op.execute(f"ALTER INDEX {name} RENAME TO {name}_old")
+    op.execute(
+        """
+        CREATE TABLE transactions (
+            LIKE transactions_partitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+            PRIMARY KEY (id),
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (wallet_id) REFERENCES wallets (id),
+            FOREIGN KEY (counterparty_user) REFERENCES users (id)
+        )
+        """
+    )
+    op.execute("INSERT INTO transactions SELECT * FROM transactions_partitioned")
+    op.execute("DROP TABLE transactions_partitioned CASCADE")
+    for name, columns in INDEXES:
+        op.execute(f"CREATE INDEX {name} ON transactions ({columns})")
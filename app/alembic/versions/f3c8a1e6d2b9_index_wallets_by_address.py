@@ -0,0 +1,27 @@
+"""index wallets by address and currency
+
+Revision ID: f3c8a1e6d2b9
+Revises: e6b2a9d4f8c1
+Create Date: 2025-09-03 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3c8a1e6d2b9"
+down_revision: Union[str, Sequence[str], None] = "e6b2a9d4f8c1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_wallets_address_currency", "wallets", ["address", "currency"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_wallets_address_currency", table_name="wallets")
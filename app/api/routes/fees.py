@@ -1,24 +1,25 @@
-﻿from fastapi import APIRouter, Depends, Request
-from app.core.responses import ok, err
+﻿from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.responses import EnvelopeRoute, ok, err
 from app.core.limits import rate_limit_fee
+from app.database import get_db
+from app.models.user import User
 from app.schemas.fees import FeeEstimateRequest
 from app.services.fees import estimate_fee, FireblocksError
+from app.utils.auth import get_current_user
 
-try:
-    from app.core.auth import get_current_user
-except Exception:
-    def get_current_user():
-        return None
-
-router = APIRouter(prefix='/fees', tags=['fees'])
+router = APIRouter(prefix='/fees', tags=['fees'], route_class=EnvelopeRoute)
 
 @router.post('/estimate')
-def estimate_transaction_fee(payload: FeeEstimateRequest, request: Request, user = Depends(get_current_user)):
-    key = getattr(user, 'id', None) or request.client.host or 'anon'
-    if not rate_limit_fee.allow(key):
+async def estimate_transaction_fee(
+    payload: FeeEstimateRequest,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    if not rate_limit_fee.allow(user.id):
         return err('Too many requests. Please slow down.', code='rate_limited', http_status=429)
     try:
-        quote = estimate_fee(payload)
+        quote = await estimate_fee(db, payload, user.id)
         return ok(quote.dict())
     except FireblocksError as e:
         code = (e.code or '').lower()
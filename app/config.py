@@ -41,9 +41,135 @@ class Settings:
             os.getenv("FIREBLOCKS_API_SECRET")
         )
 
+        # Fireblocks webhooks: public key (PEM or path) used to verify signatures
+        self.FIREBLOCKS_WEBHOOK_PUBLIC_KEY = self._load_secret(
+            os.getenv("FIREBLOCKS_WEBHOOK_PUBLIC_KEY")
+        )
+        self.WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "20000"))
+        self.WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "500"))
+        self.WEBHOOK_FLUSH_INTERVAL = float(os.getenv("WEBHOOK_FLUSH_INTERVAL", "0.05"))
+        self.WEBHOOK_PROCESS_BATCH_SIZE = int(os.getenv("WEBHOOK_PROCESS_BATCH_SIZE", "500"))
+        self.WEBHOOK_PROCESS_INTERVAL = float(os.getenv("WEBHOOK_PROCESS_INTERVAL", "1"))
+        self.WEBHOOK_PROCESSORS = int(os.getenv("WEBHOOK_PROCESSORS", "1"))
+
+        # Seconds between keepalive comments on idle event streams
+        self.SSE_KEEPALIVE_INTERVAL = float(os.getenv("SSE_KEEPALIVE_INTERVAL", "15"))
+
+        # Monthly transactions partitions: months created ahead, months kept
+        # attached (0 keeps all) and seconds between maintenance runs
+        self.TX_PARTITION_MONTHS_AHEAD = int(os.getenv("TX_PARTITION_MONTHS_AHEAD", "3"))
+        self.TX_PARTITION_RETENTION_MONTHS = int(os.getenv("TX_PARTITION_RETENTION_MONTHS", "0"))
+        self.TX_PARTITION_MAINTENANCE_INTERVAL = float(
+            os.getenv("TX_PARTITION_MAINTENANCE_INTERVAL", "86400")
+        )
+
+        # Cold archive: days kept in the live tables (0 disables), target directory,
+        # rows per archive file, records per compressed block, seconds between runs
+        self.TX_ARCHIVE_RETENTION_DAYS = int(os.getenv("TX_ARCHIVE_RETENTION_DAYS", "0"))
+        self.WEBHOOK_ARCHIVE_RETENTION_DAYS = int(
+            os.getenv("WEBHOOK_ARCHIVE_RETENTION_DAYS", "0")
+        )
+        self.ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+        self.ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "10000"))
+        self.ARCHIVE_BLOCK_RECORDS = int(os.getenv("ARCHIVE_BLOCK_RECORDS", "500"))
+        self.ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "3600"))
+
+        # Rows fetched per server-side cursor round trip by statement exports
+        self.EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "2000"))
+
+        # Upper bound for ?wait= on GET /transfers/{id}
+        self.TRANSFER_WAIT_MAX = float(os.getenv("TRANSFER_WAIT_MAX", "60"))
+
+        # Fallback polling of pending Fireblocks transactions (interval 0 disables)
+        self.STATUS_POLL_INTERVAL = float(os.getenv("STATUS_POLL_INTERVAL", "5"))
+        self.STATUS_POLL_MIN_INTERVAL = float(os.getenv("STATUS_POLL_MIN_INTERVAL", "30"))
+        self.STATUS_POLL_MAX_INTERVAL = float(os.getenv("STATUS_POLL_MAX_INTERVAL", "900"))
+        self.STATUS_POLL_CONCURRENCY = int(os.getenv("STATUS_POLL_CONCURRENCY", "8"))
+        self.STATUS_POLL_BATCH_SIZE = int(os.getenv("STATUS_POLL_BATCH_SIZE", "1000"))
+
+        # Background fee table: seconds between refreshes (0 disables) and the
+        # age after which quotes fall back to a live estimate
+        self.FEE_REFRESH_INTERVAL = float(os.getenv("FEE_REFRESH_INTERVAL", "30"))
+        self.FEE_TABLE_MAX_AGE = float(os.getenv("FEE_TABLE_MAX_AGE", "120"))
+
+        # Fee history: observations kept per asset, window and minimum samples
+        # for percentile quotes, seconds between flushes to fee_observations
+        self.FEE_HISTORY_CAPACITY = int(os.getenv("FEE_HISTORY_CAPACITY", "2880"))
+        self.FEE_HISTORY_WINDOW_MINUTES = float(os.getenv("FEE_HISTORY_WINDOW_MINUTES", "30"))
+        self.FEE_HISTORY_MIN_SAMPLES = int(os.getenv("FEE_HISTORY_MIN_SAMPLES", "5"))
+        self.FEE_HISTORY_FLUSH_INTERVAL = float(os.getenv("FEE_HISTORY_FLUSH_INTERVAL", "300"))
+
+        # Batched withdrawals (opt-in): seconds the oldest queued withdrawal may
+        # wait, outputs per batch, seconds between batching runs, submissions
+        # of one batch before it is parked for manual reconciliation.  Every
+        # user has their own vault, so a batch only combines one user's
+        # withdrawals: this saves fees for users who withdraw repeatedly, not
+        # across users
+        self.WITHDRAWAL_BATCHING = os.getenv("WITHDRAWAL_BATCHING", "false").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+        self.WITHDRAWAL_BATCH_WINDOW = float(os.getenv("WITHDRAWAL_BATCH_WINDOW", "60"))
+        self.WITHDRAWAL_BATCH_MAX_OUTPUTS = int(os.getenv("WITHDRAWAL_BATCH_MAX_OUTPUTS", "50"))
+        self.WITHDRAWAL_BATCH_INTERVAL = float(os.getenv("WITHDRAWAL_BATCH_INTERVAL", "5"))
+        self.WITHDRAWAL_BATCH_MAX_ATTEMPTS = int(os.getenv("WITHDRAWAL_BATCH_MAX_ATTEMPTS", "10"))
+
+        # Bulk payouts: items per request, concurrent Fireblocks submissions
+        self.PAYOUT_MAX_ITEMS = int(os.getenv("PAYOUT_MAX_ITEMS", "5000"))
+        self.PAYOUT_CONCURRENCY = int(os.getenv("PAYOUT_CONCURRENCY", "8"))
+        # Resuming queued payout items: seconds between runs (0 disables) and
+        # age in seconds before an item is taken over from its request
+        self.PAYOUT_RESUME_INTERVAL = float(os.getenv("PAYOUT_RESUME_INTERVAL", "60"))
+        self.PAYOUT_RESUME_AFTER = float(os.getenv("PAYOUT_RESUME_AFTER", "300"))
+        # Seconds before ``since`` that GET /payouts/{id} looks back, to catch
+        # updates stamped before the previous poll but committed after it
+        self.PAYOUT_CURSOR_OVERLAP = float(os.getenv("PAYOUT_CURSOR_OVERLAP", "30"))
+
+        # Velocity limits: ASSET:AMOUNT pairs withdrawn per user over the last
+        # hour / day (assets not listed are unlimited), and the bucket width in
+        # seconds of the rolling totals.  Each worker keeps its own totals;
+        # requests they allow are checked again against the transactions table
+        # so the limits hold across workers
+        self.VELOCITY_HOURLY_LIMITS = self._split_list(os.getenv("VELOCITY_HOURLY_LIMITS"))
+        self.VELOCITY_DAILY_LIMITS = self._split_list(os.getenv("VELOCITY_DAILY_LIMITS"))
+        self.VELOCITY_BUCKET_SECONDS = float(os.getenv("VELOCITY_BUCKET_SECONDS", "60"))
+
+        # Idempotency-Key: seconds a response is replayed from memory, and the
+        # most responses kept
+        self.IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+        self.IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "100000"))
+
+        # Addresses accepted per POST /addresses/validate request
+        self.ADDRESS_VALIDATION_MAX_ITEMS = int(os.getenv("ADDRESS_VALIDATION_MAX_ITEMS", "50000"))
+
+        # Asset registry: JSON file replacing the built-in assets (reloaded on
+        # SIGHUP), and the X-Admin-Token for POST /assets/reload (unset disables it)
+        self.ASSET_REGISTRY_PATH = os.getenv("ASSET_REGISTRY_PATH")
+        self.ASSET_RELOAD_TOKEN = os.getenv("ASSET_RELOAD_TOKEN")
+
         # Donation
         self.DONATION_PRIVACY_ID = os.getenv("DONATION_PRIVACY_ID")
 
+        # Warm pool of pre-provisioned vaults (0 disables the provisioner)
+        self.VAULT_POOL_SIZE = int(os.getenv("VAULT_POOL_SIZE", "0"))
+        self.VAULT_POOL_LOW_WATER = int(os.getenv("VAULT_POOL_LOW_WATER", "5"))
+        self.VAULT_POOL_REFILL_INTERVAL = float(os.getenv("VAULT_POOL_REFILL_INTERVAL", "30"))
+        self.VAULT_POOL_ASSETS = self._split_list(
+            os.getenv("VAULT_POOL_ASSETS", "BTC,ETH,TRX,USDT_ERC20,USDT_TRC20")
+        )
+
+        # Max concurrent Fireblocks calls when activating several assets at once
+        self.PROVISIONING_FANOUT = int(os.getenv("PROVISIONING_FANOUT", "4"))
+
+        # Seconds between full syncs of the vault_assets mirror (0 disables)
+        self.VAULT_ASSET_SYNC_INTERVAL = float(os.getenv("VAULT_ASSET_SYNC_INTERVAL", "3600"))
+
+    @staticmethod
+    def _split_list(value: str | None) -> list[str]:
+        """Split a comma separated environment value into a list."""
+        return [item.strip() for item in (value or "").split(",") if item.strip()]
+
     @staticmethod
     def _load_secret(value: str | None) -> str | None:
         """Return the contents of *value* if it is a path to a file.
@@ -0,0 +1,99 @@
+"""Checksum decoding for base58check (BTC legacy, TRON) and bech32 (BTC segwit).
+
+Only the Python standard library is used: base58 is decoded with one big
+integer conversion and bech32 checksums follow BIP-173 / BIP-350.
+"""
+from __future__ import annotations
+
+import hashlib
+
+_B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_B58_INDEX = {c: i for i, c in enumerate(_B58_ALPHABET)}
+
+_BECH32_CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+_BECH32_INDEX = {c: i for i, c in enumerate(_BECH32_CHARSET)}
+# Maps bech32 characters to base-32 digits so ``int(..., 32)`` can decode them
+_BECH32_TO_BASE32 = str.maketrans(_BECH32_CHARSET, "0123456789abcdefghijklmnopqrstuv")
+_BECH32_CONST = 1
+_BECH32M_CONST = 0x2BC830A3
+_GENERATOR = (0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3)
+
+
+def _generator_terms(top: int) -> int:
+    out = 0
+    for i in range(5):
+        if (top >> i) & 1:
+            out ^= _GENERATOR[i]
+    return out
+
+
+# Generator terms for every value of the 5 bits shifted out per step
+_POLYMOD_TABLE = tuple(_generator_terms(top) for top in range(32))
+
+
+def base58check_payload(address: str) -> bytes | None:
+    """Version byte plus payload of a base58check string, ``None`` if invalid."""
+    number = 0
+    for char in address:
+        digit = _B58_INDEX.get(char)
+        if digit is None:
+            return None
+        number = number * 58 + digit
+    # Each leading "1" encodes a leading zero byte
+    zeros = len(address) - len(address.lstrip("1"))
+    raw = b"\0" * zeros + number.to_bytes((number.bit_length() + 7) // 8, "big")
+    if len(raw) < 5:
+        return None
+    payload, checksum = raw[:-4], raw[-4:]
+    if hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] != checksum:
+        return None
+    return payload
+
+
+def _polymod(values) -> int:
+    chk = 1
+    for value in values:
+        chk = (chk & 0x1FFFFFF) << 5 ^ value ^ _POLYMOD_TABLE[chk >> 25]
+    return chk
+
+
+def _hrp_expand(hrp: str) -> list[int]:
+    return [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp]
+
+
+def _program_bytes(words: str) -> bytes | None:
+    """Regroup 5-bit words (as base-32 digits) into bytes, rejecting bad padding."""
+    bits = 5 * len(words)
+    pad = bits % 8
+    number = int(words, 32) if words else 0
+    if pad >= 5 or number & ((1 << pad) - 1):
+        return None
+    return (number >> pad).to_bytes(bits // 8, "big")
+
+
+def segwit_program(address: str, hrp: str) -> tuple[int, bytes] | None:
+    """Witness version and program of a segwit address for ``hrp``.
+
+    Version 0 must use the bech32 checksum and later versions bech32m;
+    ``None`` when the address is malformed or for another network.
+    """
+    if address.lower() != address and address.upper() != address:
+        return None
+    address = address.lower()
+    pos = address.rfind("1")
+    if address[:pos] != hrp or len(address) > 90 or len(address) - pos - 1 < 7:
+        return None
+    try:
+        data = [_BECH32_INDEX[c] for c in address[pos + 1 :]]
+    except KeyError:
+        return None
+    const = _polymod(_hrp_expand(hrp) + data)
+    version = data[0]
+    if const != (_BECH32_CONST if version == 0 else _BECH32M_CONST) or version > 16:
+        return None
+    program = _program_bytes(address[pos + 2 : -6].translate(_BECH32_TO_BASE32))
+    if program is None or not 2 <= len(program) <= 40:
+        return None
+    if version == 0 and len(program) not in (20, 32):
+        return None
+    return version, program
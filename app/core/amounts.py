@@ -0,0 +1,184 @@
+"""Exact fixed-point amounts.
+
+An :class:`Amount` is an integer number of base units plus the number of
+decimals they are scaled by, so ``Amount(150, 2)`` is 1.50.  Values are
+parsed once without going through ``float``, arithmetic is integer
+arithmetic, and amounts serialise to plain decimal strings.  Request
+schemas parse ``amount`` fields into an Amount at the asset's decimals (see
+:class:`app.schemas.amount.AssetAmount`); ``Decimal`` only appears at the
+database boundary through :attr:`Amount.decimal`.
+"""
+from __future__ import annotations
+
+from decimal import MAX_EMAX, MAX_PREC, MIN_EMIN, Context, Decimal
+
+# Widest scale accepted from exponent notation; columns are Numeric(38, 18)
+_MAX_EXPONENT = 38
+# Shifting the exponent with this context never rounds
+_EXACT = Context(prec=MAX_PREC, Emax=MAX_EMAX, Emin=MIN_EMIN)
+
+
+class Amount:
+    __slots__ = ("units", "decimals")
+
+    def __init__(self, units: int, decimals: int = 0):
+        self.units = units
+        self.decimals = decimals
+
+    @classmethod
+    def parse(cls, value, decimals: int | None = None) -> Amount:
+        """Parse ``value`` exactly, rescaled to ``decimals`` places when given.
+
+        Accepts strings, ints, ``Decimal`` values, amounts and floats (by
+        their shortest repr, which is what a JSON number was written as).
+        Raises ``ValueError`` for malformed values and for more places than
+        ``decimals`` allows.
+        """
+        if isinstance(value, Amount):
+            amount = value
+        elif isinstance(value, str):
+            amount = cls._from_str(value)
+        elif isinstance(value, bool):
+            raise ValueError(f"Invalid amount: {value!r}")
+        elif isinstance(value, int):
+            amount = cls(value)
+        elif isinstance(value, Decimal):
+            amount = cls._from_decimal(value)
+        elif isinstance(value, float):
+            amount = cls._from_str(repr(value))
+        else:
+            raise ValueError(f"Invalid amount: {value!r}")
+        return amount if decimals is None else amount.rescale(decimals)
+
+    @classmethod
+    def _from_str(cls, text: str) -> Amount:
+        text = text.strip()
+        body = text[1:] if text[:1] in ("-", "+") else text
+        whole, _, frac = body.partition(".")
+        if (whole or frac) and (whole + frac).isdigit() and (whole + frac).isascii():
+            units = int(whole + frac) if whole or frac else 0
+            return cls(-units if text[:1] == "-" else units, len(frac))
+        # Exponent notation, as Python writes small floats
+        mantissa, _, exponent = body.lower().partition("e")
+        if (
+            text.isascii()
+            and mantissa.replace(".", "", 1).isdigit()
+            and (exponent[1:] if exponent[:1] in ("-", "+") else exponent).isdigit()
+        ):
+            return cls._from_decimal(Decimal(text))
+        raise ValueError(f"Invalid amount: {text!r}")
+
+    @classmethod
+    def _from_decimal(cls, value: Decimal) -> Amount:
+        if not value.is_finite():
+            raise ValueError(f"Invalid amount: {value}")
+        exponent = value.as_tuple().exponent
+        if abs(exponent) > _MAX_EXPONENT:
+            raise ValueError(f"Amount out of range: {value}")
+        if exponent >= 0:
+            return cls(int(value))
+        return cls(int(value.scaleb(-exponent, _EXACT)), -exponent)
+
+    def rescale(self, decimals: int) -> Amount:
+        """The same value with ``decimals`` places; ``ValueError`` if that loses digits."""
+        diff = decimals - self.decimals
+        if diff >= 0:
+            return self if diff == 0 else Amount(self.units * 10**diff, decimals)
+        units, remainder = divmod(self.units, 10**-diff)
+        if remainder:
+            raise ValueError(f"Amount {self} has more than {decimals} decimal places")
+        return Amount(units, decimals)
+
+    def _align(self, other) -> tuple[int, int, int]:
+        if not isinstance(other, Amount):
+            other = Amount.parse(other)
+        if other.decimals == self.decimals:
+            return self.units, other.units, self.decimals
+        if other.decimals > self.decimals:
+            scale = 10 ** (other.decimals - self.decimals)
+            return self.units * scale, other.units, other.decimals
+        scale = 10 ** (self.decimals - other.decimals)
+        return self.units, other.units * scale, self.decimals
+
+    def __add__(self, other) -> Amount:
+        a, b, decimals = self._align(other)
+        return Amount(a + b, decimals)
+
+    __radd__ = __add__
+
+    def __sub__(self, other) -> Amount:
+        a, b, decimals = self._align(other)
+        return Amount(a - b, decimals)
+
+    def __rsub__(self, other) -> Amount:
+        a, b, decimals = self._align(other)
+        return Amount(b - a, decimals)
+
+    def __neg__(self) -> Amount:
+        return Amount(-self.units, self.decimals)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (Amount, int, Decimal)):
+            return NotImplemented
+        a, b, _ = self._align(other)
+        return a == b
+
+    def __lt__(self, other) -> bool:
+        a, b, _ = self._align(other)
+        return a < b
+
+    def __le__(self, other) -> bool:
+        a, b, _ = self._align(other)
+        return a <= b
+
+    def __gt__(self, other) -> bool:
+        a, b, _ = self._align(other)
+        return a > b
+
+    def __ge__(self, other) -> bool:
+        a, b, _ = self._align(other)
+        return a >= b
+
+    def __hash__(self) -> int:
+        # Equal to the hash of the same value as int or Decimal
+        return hash(self.decimal)
+
+    def __bool__(self) -> bool:
+        return self.units != 0
+
+    def __str__(self) -> str:
+        if self.decimals == 0:
+            return str(self.units)
+        digits = str(abs(self.units)).rjust(self.decimals + 1, "0")
+        whole = digits[: -self.decimals]
+        frac = digits[-self.decimals :].rstrip("0")
+        sign = "-" if self.units < 0 else ""
+        return f"{sign}{whole}.{frac}" if frac else f"{sign}{whole}"
+
+    def __repr__(self) -> str:
+        return f"Amount('{self}')"
+
+    @property
+    def decimal(self) -> Decimal:
+        """The value as ``Decimal``, for ``Numeric`` columns."""
+        return Decimal(self.units).scaleb(-self.decimals, _EXACT)
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source, handler):
+        from pydantic_core import core_schema
+
+        # Documented as a string; numbers are accepted for compatibility
+        return core_schema.json_or_python_schema(
+            json_schema=core_schema.no_info_after_validator_function(
+                cls.parse,
+                core_schema.union_schema(
+                    [
+                        core_schema.str_schema(),
+                        core_schema.int_schema(),
+                        core_schema.float_schema(),
+                    ]
+                ),
+            ),
+            python_schema=core_schema.no_info_plain_validator_function(cls.parse),
+            serialization=core_schema.to_string_ser_schema(when_used="always"),
+        )
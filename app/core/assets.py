@@ -1,6 +1,16 @@
-﻿from dataclasses import dataclass
+﻿from collections.abc import Mapping
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Callable, Optional
+import json
 import re
+import sys
+
+from app.config import settings
+from app.core.addresses import base58check_payload, segwit_program
+from app.core.amounts import Amount
+from app.core.size_models import SIZE_MODELS, SizeModel, parse_size_model
 try:
     from eth_utils import is_checksum_address as eth_is_checksum
 except Exception:
@@ -13,17 +23,36 @@ class AssetMeta:
     decimals: int
     native: bool
     address_validator: Optional[Callable[[str], bool]] = None
+    size_model: Optional[SizeModel] = None
+    # Asset network fees are paid in: the asset itself when native
+    fee_asset: Optional[str] = None
 
 _re_btc_main = re.compile(r"^(bc1[qpzry9x8gf2tvdw0s3jn54khce6mua7l]{14,64}|[13][a-km-zA-HJ-NP-Z1-9]{25,34})$")
 _re_btc_test = re.compile(r"^(tb1[qpzry9x8gf2tvdw0s3jn54khce6mua7l]{14,64}|[mn2][a-km-zA-HJ-NP-Z1-9]{25,34})$")
 _re_eth = re.compile(r"^0x[a-fA-F0-9]{40}$")
 _re_tron = re.compile(r"^T[1-9A-HJ-NP-Za-km-z]{33}$")
 
+# (asset, address) results kept by validate_destinations
+VALIDATION_CACHE_SIZE = 65536
+
+def _base58_version(addr: str) -> int | None:
+    """Version byte of a checksummed 21-byte base58check address."""
+    payload = base58check_payload(addr)
+    return payload[0] if payload is not None and len(payload) == 21 else None
+
 def is_btc_main(addr: str) -> bool:
-    return bool(_re_btc_main.match(addr or ""))
+    if not _re_btc_main.match(addr or ""):
+        return False
+    if addr.startswith("bc1"):
+        return segwit_program(addr, "bc") is not None
+    return _base58_version(addr) in (0x00, 0x05)
 
 def is_btc_test(addr: str) -> bool:
-    return bool(_re_btc_test.match(addr or ""))
+    if not _re_btc_test.match(addr or ""):
+        return False
+    if addr.startswith("tb1"):
+        return segwit_program(addr, "tb") is not None
+    return _base58_version(addr) in (0x6F, 0xC4)
 
 def is_eth(addr: str) -> bool:
     if not _re_eth.match(addr or ""):
@@ -35,18 +64,129 @@ def is_eth(addr: str) -> bool:
     return True
 
 def is_tron(addr: str) -> bool:
-    return bool(_re_tron.match(addr or ""))
-
-ASSETS: dict[str, AssetMeta] = {
-    "BTC":       AssetMeta("BTC",       "BTC",   8,  True,  is_btc_main),
-    "BTC_TEST":  AssetMeta("BTC_TEST",  "BTC",   8,  True,  is_btc_test),
-    "ETH":       AssetMeta("ETH",       "ETH",  18,  True,  is_eth),
-    "ETH_TEST":  AssetMeta("ETH_TEST",  "ETH",  18,  True,  is_eth),
-    "TRX":       AssetMeta("TRX",       "TRON",  6,  True,  is_tron),
-    "USDT_ERC20":AssetMeta("USDT",      "ETH",   6,  False, is_eth),
-    "USDT_TRC20":AssetMeta("USDT",      "TRON",  6,  False, is_tron),
+    return bool(_re_tron.match(addr or "")) and _base58_version(addr) == 0x41
+
+# Validators a registry file may name
+VALIDATORS: dict[str, Callable[[str], bool]] = {
+    "btc_main": is_btc_main,
+    "btc_test": is_btc_test,
+    "eth": is_eth,
+    "tron": is_tron,
+}
+
+BUILTIN_ASSETS: dict[str, dict] = {
+    "BTC":        {"symbol": "BTC",      "network": "BTC",  "decimals": 8,  "native": True,  "validator": "btc_main"},
+    "BTC_TEST":   {"symbol": "BTC_TEST", "network": "BTC",  "decimals": 8,  "native": True,  "validator": "btc_test"},
+    "ETH":        {"symbol": "ETH",      "network": "ETH",  "decimals": 18, "native": True,  "validator": "eth"},
+    "ETH_TEST":   {"symbol": "ETH_TEST", "network": "ETH",  "decimals": 18, "native": True,  "validator": "eth"},
+    "TRX":        {"symbol": "TRX",      "network": "TRON", "decimals": 6,  "native": True,  "validator": "tron"},
+    "USDT_ERC20": {"symbol": "USDT",     "network": "ETH",  "decimals": 6,  "native": False, "validator": "eth",  "fee_asset": "ETH"},
+    "USDT_TRC20": {"symbol": "USDT",     "network": "TRON", "decimals": 6,  "native": False, "validator": "tron", "fee_asset": "TRX"},
 }
 
+def build_assets(entries: dict[str, dict]) -> Mapping[str, AssetMeta]:
+    """Immutable asset table from ``{asset_id: {symbol, network, decimals, native, validator}}``.
+
+    Identifiers are interned and validators resolved from :data:`VALIDATORS`
+    up front; ``ValueError`` names the first bad entry.  An entry may carry
+    its own ``size_model``; otherwise its network must have a default in
+    :data:`~app.core.size_models.SIZE_MODELS`, so every asset can be quoted.
+    Tokens (``native`` false) name the native ``fee_asset`` of the same table
+    their network fees are paid in.
+    """
+    table = {}
+    for asset_id, entry in entries.items():
+        try:
+            validator = entry.get("validator")
+            if validator is not None and validator not in VALIDATORS:
+                raise ValueError(f"unknown validator {validator!r}")
+            decimals = entry["decimals"]
+            if not isinstance(decimals, int) or isinstance(decimals, bool) or not 0 <= decimals <= 18:
+                raise ValueError("decimals must be an integer between 0 and 18")
+            network = entry["network"]
+            if entry.get("size_model") is not None:
+                size_model = parse_size_model(entry["size_model"])
+            else:
+                size_model = SIZE_MODELS.get(network)
+                if size_model is None:
+                    raise ValueError(f"network {network!r} has no default size_model; give one")
+            native = bool(entry["native"])
+            fee_asset = asset_id if native else entry.get("fee_asset")
+            fee_entry = entries.get(fee_asset) if isinstance(fee_asset, str) else None
+            if not isinstance(fee_entry, dict) or not fee_entry.get("native"):
+                raise ValueError("fee_asset must name a native asset of the registry")
+            table[sys.intern(asset_id)] = AssetMeta(
+                sys.intern(entry["symbol"]),
+                sys.intern(network),
+                decimals,
+                native,
+                VALIDATORS.get(validator),
+                size_model,
+                sys.intern(fee_asset),
+            )
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError(f"Invalid asset {asset_id!r}: {exc}") from None
+    return MappingProxyType(table)
+
+def load_assets(path: str) -> Mapping[str, AssetMeta]:
+    """Asset table from a JSON registry file in the :data:`BUILTIN_ASSETS` format."""
+    with open(path, "r", encoding="utf-8") as fh:
+        entries = json.load(fh)
+    if not isinstance(entries, dict):
+        raise ValueError("Asset registry must be a JSON object keyed by asset id")
+    return build_assets(entries)
+
+class AssetRegistry(Mapping):
+    """Read-only view of the current asset table.
+
+    Each table is immutable and a reload replaces it with one attribute
+    assignment, so lookups take no lock and never see a half-loaded table.
+    Code that needs several lookups to agree takes :meth:`snapshot` once.
+    """
+
+    def __init__(self, snapshot: Mapping[str, AssetMeta]):
+        self._snapshot = snapshot
+
+    def snapshot(self) -> Mapping[str, AssetMeta]:
+        return self._snapshot
+
+    def replace(self, snapshot: Mapping[str, AssetMeta]) -> None:
+        self._snapshot = snapshot
+
+    def __getitem__(self, asset_id: str) -> AssetMeta:
+        return self._snapshot[asset_id]
+
+    def get(self, asset_id: str, default=None):
+        return self._snapshot.get(asset_id, default)
+
+    def __contains__(self, asset_id) -> bool:
+        return asset_id in self._snapshot
+
+    def __iter__(self):
+        return iter(self._snapshot)
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+ASSETS = AssetRegistry(
+    load_assets(settings.ASSET_REGISTRY_PATH)
+    if settings.ASSET_REGISTRY_PATH
+    else build_assets(BUILTIN_ASSETS)
+)
+
+def reload_assets(path: str | None = None) -> int:
+    """Load the registry file (``ASSET_REGISTRY_PATH`` by default) and swap it in.
+
+    Without a file the built-in table is used.  A file that fails to load
+    raises and leaves the current table in place.  Returns the asset count.
+    """
+    path = path or settings.ASSET_REGISTRY_PATH
+    snapshot = load_assets(path) if path else build_assets(BUILTIN_ASSETS)
+    ASSETS.replace(snapshot)
+    # Cached results may come from validators that were just replaced
+    _is_valid_destination.cache_clear()
+    return len(snapshot)
+
 def get_asset(symbol: str) -> AssetMeta:
     meta = ASSETS.get(symbol)
     if not meta:
@@ -59,8 +199,22 @@ def validate_destination(asset_symbol: str, address: str) -> bool:
         return False
     return meta.address_validator(address.strip())
 
-def human_amount_from_base(amount_base_units: int | float, decimals: int) -> float:
-    return float(amount_base_units) / (10 ** decimals)
+@lru_cache(maxsize=VALIDATION_CACHE_SIZE)
+def _is_valid_destination(asset_symbol: str, address: str) -> bool:
+    return validate_destination(asset_symbol, address)
+
+def validate_destinations(asset_symbol: str, addresses) -> list[bool]:
+    """Validate many addresses for one asset, checksums included.
+
+    Recent results are memoised, so resubmitted payout lists are checked
+    from the cache.
+    """
+    get_asset(asset_symbol)
+    return [_is_valid_destination(asset_symbol, address) for address in addresses]
+
+def human_amount_from_base(amount_base_units: int, decimals: int) -> str:
+    return str(Amount(int(amount_base_units), decimals))
 
-def base_amount_from_human(amount_human: float, decimals: int) -> int:
-    return int(round(float(amount_human) * (10 ** decimals)))
+def base_amount_from_human(amount_human, decimals: int) -> int:
+    """Exact base units of a str/Decimal/Amount; ``ValueError`` on excess precision."""
+    return Amount.parse(amount_human, decimals).units
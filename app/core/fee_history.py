@@ -0,0 +1,141 @@
+"""Per-asset ring buffers of provider fee observations.
+
+Each asset keeps its last ``FEE_HISTORY_CAPACITY`` observations in flat
+``array`` buffers (one float64 timestamp, three int64 fees and a one-byte
+"loaded from the database" flag per slot), so memory is fixed at about 33
+bytes per slot whatever the uptime.  Percentiles over a time window are
+computed with numpy on zero-copy views of the buffers when it is installed,
+and in pure Python otherwise.
+"""
+from __future__ import annotations
+
+import math
+from array import array
+
+from app.config import settings
+
+try:
+    import numpy
+except ModuleNotFoundError:  # pragma: no cover - optional dependency
+    numpy = None
+
+LEVELS = ("low", "medium", "high")
+
+
+def _percentile(ordered: list[int], q: float) -> float:
+    """Linear-interpolated percentile of sorted values (numpy's default method)."""
+    pos = (len(ordered) - 1) * q / 100
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+class FeeRing:
+    """Fixed-size buffer of ``(timestamp, low, medium, high)`` observations."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.fees = array("q", bytes(8 * capacity * len(LEVELS)))
+        # Slots seeded from fee_observations, which must not be flushed again
+        self.loaded = bytearray(capacity)
+        # Total observations ever written; the next slot is written % capacity
+        self.written = 0
+
+    def __len__(self) -> int:
+        return min(self.written, self.capacity)
+
+    def append(self, timestamp: float, fees: tuple[int, int, int], loaded: bool = False) -> None:
+        slot = self.written % self.capacity
+        self.times[slot] = timestamp
+        self.fees[slot * 3 : slot * 3 + 3] = array("q", fees)
+        self.loaded[slot] = loaded
+        self.written += 1
+
+    def since(self, position: int) -> list[tuple[float, tuple[int, int, int]]]:
+        """Observations recorded after ``position`` that are still in the buffer.
+
+        Slots seeded by :meth:`FeeHistory.load` are skipped.
+        """
+        start = max(position, self.written - self.capacity)
+        out = []
+        for n in range(start, self.written):
+            slot = n % self.capacity
+            if self.loaded[slot]:
+                continue
+            out.append((self.times[slot], tuple(self.fees[slot * 3 : slot * 3 + 3])))
+        return out
+
+    def percentiles(
+        self, start: float, qs, level: str = "medium", min_samples: int = 1
+    ) -> list[float] | None:
+        """Percentiles ``qs`` of ``level`` over observations at or after ``start``.
+
+        ``None`` when fewer than ``min_samples`` observations fall in the window.
+        """
+        column = LEVELS.index(level)
+        size = len(self)
+        if numpy is not None:
+            times = numpy.frombuffer(self.times, dtype=numpy.float64)[:size]
+            fees = numpy.frombuffer(self.fees, dtype=numpy.int64)[: size * 3]
+            values = fees.reshape(-1, 3)[times >= start, column]
+            if len(values) < max(min_samples, 1):
+                return None
+            return [float(v) for v in numpy.percentile(values, qs)]
+        values = sorted(
+            self.fees[slot * 3 + column] for slot in range(size) if self.times[slot] >= start
+        )
+        if len(values) < max(min_samples, 1):
+            return None
+        return [_percentile(values, q) for q in qs]
+
+
+class FeeHistory:
+    """Ring buffers for every asset plus the flush position of each."""
+
+    def __init__(self):
+        self._rings: dict[str, FeeRing] = {}
+        self._flushed: dict[str, int] = {}
+
+    def ring(self, asset: str) -> FeeRing:
+        ring = self._rings.get(asset)
+        if ring is None:
+            ring = self._rings[asset] = FeeRing(max(settings.FEE_HISTORY_CAPACITY, 1))
+        return ring
+
+    def record(self, asset: str, timestamp: float, fees: tuple[int, int, int]) -> None:
+        self.ring(asset).append(timestamp, fees)
+
+    def percentiles(
+        self, asset: str, start: float, qs, level: str = "medium", min_samples: int = 1
+    ) -> list[float] | None:
+        ring = self._rings.get(asset)
+        return ring.percentiles(start, qs, level, min_samples) if ring is not None else None
+
+    def pending(self) -> dict[str, tuple[int, list]]:
+        """Unflushed observations per asset, with the position to mark as flushed."""
+        pending = {}
+        for asset, ring in self._rings.items():
+            if ring.written > self._flushed.get(asset, 0):
+                observations = ring.since(self._flushed.get(asset, 0))
+                if observations:
+                    pending[asset] = (ring.written, observations)
+                else:
+                    self.mark_flushed(asset, ring.written)
+        return pending
+
+    def mark_flushed(self, asset: str, position: int) -> None:
+        self._flushed[asset] = max(self._flushed.get(asset, 0), position)
+
+    def load(self, asset: str, observations) -> None:
+        """Seed ``asset`` with already persisted observations, oldest first.
+
+        They are flagged as loaded so no flush writes them again, whether or
+        not observations were recorded before the load.
+        """
+        ring = self.ring(asset)
+        for timestamp, fees in observations:
+            ring.append(timestamp, fees, loaded=True)
+
+
+fee_history = FeeHistory()
@@ -23,7 +23,7 @@ class SimpleRateLimiter:
 
 rate_limit_fee = SimpleRateLimiter(limit=10, window_seconds=60)
 
-def fee_cache_key(asset: str, amount_human: float, dest_addr: str) -> Tuple[str, float, str]:
-    amt = round(float(amount_human), 8)
-    masked = f"{(dest_addr or '')[:4]}...{(dest_addr or '')[-4:]}" if dest_addr else ""
-    return (asset, amt, masked)
+def fee_cache_key(asset: str, amount_bucket: int, destination_class: str) -> Tuple[str, int, str]:
+    # Keys never contain the address itself, so the cache stays small and
+    # holds nothing that identifies a destination
+    return (asset, amount_bucket, destination_class)
@@ -0,0 +1,33 @@
+"""Minimal in-process metrics registry.
+
+Counters and gauges live in module-level dicts so any service can record
+values without threading a registry around.  ``snapshot()`` is served by the
+``/metrics`` endpoint.
+"""
+import threading
+
+_lock = threading.Lock()
+_counters: dict[str, float] = {}
+_gauges: dict[str, float] = {}
+
+
+def inc(name: str, value: float = 1) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name: str, value: float) -> None:
+    with _lock:
+        _gauges[name] = value
+
+
+def get(name: str, default: float = 0) -> float:
+    with _lock:
+        if name in _gauges:
+            return _gauges[name]
+        return _counters.get(name, default)
+
+
+def snapshot() -> dict:
+    with _lock:
+        return {"counters": dict(_counters), "gauges": dict(_gauges)}
@@ -0,0 +1,61 @@
+"""In-process publish/subscribe fan-out.
+
+Each subscriber owns a small bounded queue registered under a topic key;
+publishing is a non-blocking ``put_nowait`` into every queue of the topic, so
+a slow or idle subscriber costs one queue and never blocks the publisher.
+When a subscriber falls behind, its oldest message is dropped.
+
+Only subscribers in the current process are reached; changes committed by
+other workers arrive through :class:`app.services.notifications.ChangeRelay`.
+"""
+import asyncio
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Hashable, Iterator
+
+from app.core import metrics
+
+
+class Broker:
+    def __init__(self, maxsize: int = 100):
+        self._maxsize = maxsize
+        self._topics: dict[Hashable, set[asyncio.Queue]] = defaultdict(set)
+        self._subscriptions = 0
+
+    @contextmanager
+    def subscribe(self, *topics: Hashable) -> Iterator[asyncio.Queue]:
+        """Yield a queue receiving messages published to any of ``topics``."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._maxsize)
+        for topic in topics:
+            self._topics[topic].add(queue)
+        self._subscriptions += 1
+        metrics.set_gauge("pubsub_subscriptions", self._subscriptions)
+        try:
+            yield queue
+        finally:
+            for topic in topics:
+                subscribers = self._topics.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(queue)
+                    if not subscribers:
+                        del self._topics[topic]
+            self._subscriptions -= 1
+            metrics.set_gauge("pubsub_subscriptions", self._subscriptions)
+
+    def publish(self, topic: Hashable, message) -> int:
+        """Deliver ``message`` to the subscribers of ``topic``; returns how many."""
+        subscribers = self._topics.get(topic)
+        if not subscribers:
+            return 0
+        for queue in subscribers:
+            if queue.full():
+                queue.get_nowait()
+                metrics.inc("pubsub_dropped_total")
+            queue.put_nowait(message)
+        return len(subscribers)
+
+    def subscriber_count(self, topic: Hashable) -> int:
+        return len(self._topics.get(topic, ()))
+
+
+broker = Broker()
@@ -1,6 +1,8 @@
-﻿from typing import Any
-from fastapi import Response, HTTPException
+﻿from typing import Any, Callable
+from fastapi import Request, Response, HTTPException
 from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
 
 def ok(data: Any, status: str = "ok"):
     return {"status": status, "data": data, "error": None}
@@ -13,3 +15,21 @@ def err(message: str, code: str = "bad_request", http_status: int = 400):
 
 def to_json(resp: Any, http_status: int = 200) -> Response:
     return Response(content=jsonable_encoder(resp), media_type="application/json", status_code=http_status)
+
+class EnvelopeRoute(APIRoute):
+    """Route whose body validation errors use the ``err`` envelope (400 bad_request).
+
+    The body stays a typed model, so it still appears in the OpenAPI schema.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def envelope_handler(request: Request) -> Response:
+            try:
+                return await handler(request)
+            except RequestValidationError as exc:
+                message = "; ".join(str(e.get("msg")) for e in exc.errors())
+                err(message or "Invalid request", code="bad_request", http_status=400)
+
+        return envelope_handler
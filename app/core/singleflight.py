@@ -0,0 +1,34 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Hashable
+
+
+class SingleFlight:
+    """Serialise coroutines that share a key within this process.
+
+    Callers that arrive while another caller holds the key wait for it to
+    finish and then re-check their state, so they reuse the first caller's
+    result instead of repeating the work.  Locks are dropped as soon as no
+    caller references them, keeping memory bounded by the number of keys in
+    flight.
+    """
+
+    def __init__(self):
+        self._locks: dict[Hashable, list] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._locks
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable) -> AsyncIterator[None]:
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
@@ -0,0 +1,77 @@
+"""Transaction size models used to scale reference network fees.
+
+Every asset in the registry carries one: either its own ``size_model`` entry
+or the default for its network from :data:`SIZE_MODELS`.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+
+
+@dataclass(frozen=True)
+class SizeModel:
+    """Transaction size as a function of the amount sent.
+
+    ``base_size`` is the size of the transfer Fireblocks prices (one input,
+    payment plus change output for UTXO chains).  Each ``input_amount`` of
+    value beyond the first is assumed to need one more input of
+    ``input_size``; amounts needing more than ``max_inputs`` are priced live.
+    """
+
+    base_size: int
+    input_size: int = 0
+    input_amount: Decimal | None = None
+    max_inputs: int = 1
+    script_output_extra: int = 0
+
+    def inputs(self, amount: Decimal) -> int:
+        if self.input_amount is None:
+            return 1
+        return max(1, math.ceil(amount / self.input_amount))
+
+    def size(self, amount: Decimal, kind: str = "key") -> int:
+        size = self.base_size + self.input_size * (self.inputs(amount) - 1)
+        if kind == "script":
+            size += self.script_output_extra
+        return size
+
+
+# Defaults keyed by ``AssetMeta.network``; sizes in vbytes for BTC (P2WPKH)
+SIZE_MODELS = {
+    "BTC": SizeModel(141, 68, Decimal("0.01"), max_inputs=20, script_output_extra=12),
+    "ETH": SizeModel(1),
+    "TRON": SizeModel(1),
+}
+
+_INT_FIELDS = ("base_size", "input_size", "max_inputs", "script_output_extra")
+
+
+def parse_size_model(entry: dict) -> SizeModel:
+    """:class:`SizeModel` from a registry ``size_model`` object; ``ValueError`` if malformed."""
+    if not isinstance(entry, dict):
+        raise ValueError("size_model must be an object")
+    unknown = entry.keys() - {*_INT_FIELDS, "input_amount"}
+    if unknown:
+        raise ValueError(f"unknown size_model fields {sorted(unknown)}")
+    if "base_size" not in entry:
+        raise ValueError("size_model needs base_size")
+    fields = {}
+    for name in _INT_FIELDS:
+        if name in entry:
+            value = entry[name]
+            if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+                raise ValueError(f"size_model {name} must be a non-negative integer")
+            fields[name] = value
+    if fields["base_size"] < 1 or fields.get("max_inputs", 1) < 1:
+        raise ValueError("size_model base_size and max_inputs must be at least 1")
+    if entry.get("input_amount") is not None:
+        try:
+            input_amount = Decimal(str(entry["input_amount"]))
+        except InvalidOperation:
+            raise ValueError("size_model input_amount must be a number") from None
+        if not input_amount.is_finite() or input_amount <= 0:
+            raise ValueError("size_model input_amount must be positive")
+        fields["input_amount"] = input_amount
+    return SizeModel(**fields)
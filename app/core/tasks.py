@@ -0,0 +1,38 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# Strong references so running tasks are not garbage collected.
+_tasks: set[asyncio.Task] = set()
+
+
+def start_background(coro: Awaitable, name: str | None = None) -> asyncio.Task:
+    """Schedule ``coro`` on the running loop and keep it alive until it ends."""
+    task = asyncio.create_task(coro, name=name)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+async def run_periodically(
+    name: str, interval: float, fn: Callable[[], Awaitable]
+) -> None:
+    """Call ``fn`` every ``interval`` seconds, logging and surviving failures."""
+    while True:
+        try:
+            await fn()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Background job %s failed", name)
+        await asyncio.sleep(interval)
+
+
+async def stop_background() -> None:
+    """Cancel every task started with :func:`start_background`."""
+    tasks = list(_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,187 @@
+"""Rolling per-user withdrawal totals for velocity limits.
+
+Outgoing amounts are summed per ``(user_id, asset)`` into fixed-width time
+buckets, with a running total per window, so checking a transfer against the
+hourly and daily limits is a dictionary lookup and a couple of integer
+comparisons.  Totals are seeded from ``transactions`` at startup (see
+:mod:`app.services.velocity`) and updated as withdrawals are recorded.
+
+Only assets with a configured limit are tracked.  Totals live in the
+process, so with several workers each one only sees the withdrawals it
+handled itself plus those present when it started: they reject most requests
+over a limit without a query, and :meth:`VelocityLimits.exceeded_by` checks
+the rest against every worker's withdrawals summed by the database.
+"""
+from __future__ import annotations
+
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Hashable, Iterator
+
+from app.config import settings
+from app.core.amounts import Amount
+
+# Amounts are stored as Numeric(38, 18), so whole 1e-18 units are exact
+_SCALE = 18
+
+WINDOWS = {"hourly": 3600, "daily": 86400}
+
+
+class VelocityLimitExceeded(Exception):
+    """Raised when a withdrawal would take a user over one of their limits."""
+
+    def __init__(self, window: str, asset: str):
+        super().__init__(f"{window.capitalize()} {asset} withdrawal limit exceeded")
+        self.window = window
+        self.asset = asset
+
+
+def parse_limits(items: list[str]) -> dict[str, Amount]:
+    """``["BTC:0.5", "ETH:10"]`` as ``{"BTC": Amount('0.5'), "ETH": Amount('10')}``."""
+    limits = {}
+    for item in items:
+        asset, sep, amount = item.partition(":")
+        if not sep or not asset.strip():
+            raise ValueError(f"Velocity limit must look like ASSET:AMOUNT, got {item!r}")
+        limits[asset.strip()] = Amount.parse(amount)
+    return limits
+
+
+class RollingTotal:
+    """Sum of what was added over the last ``span`` seconds, in ``bucket``-second steps.
+
+    A bucket is dropped once it lies entirely outside the window, so the total
+    can include up to one bucket more than the window but never less.
+    """
+
+    __slots__ = ("span", "bucket", "buckets", "total")
+
+    def __init__(self, span: float, bucket: float):
+        self.span = span
+        self.bucket = bucket
+        self.buckets: deque[list] = deque()
+        self.total = 0
+
+    def add(self, at: float, units: int) -> None:
+        start = at - at % self.bucket
+        if self.buckets and self.buckets[-1][0] >= start:
+            # Same bucket, or an earlier time folded into the newest bucket
+            self.buckets[-1][1] += units
+        else:
+            self.buckets.append([start, units])
+        self.total += units
+
+    def current(self, now: float) -> int:
+        horizon = now - self.span
+        buckets = self.buckets
+        while buckets and buckets[0][0] + self.bucket <= horizon:
+            self.total -= buckets.popleft()[1]
+        return self.total
+
+
+class VelocityLimits:
+    """Hourly and daily withdrawal totals per user and asset, checked against limits."""
+
+    def __init__(
+        self,
+        hourly: dict[str, Amount],
+        daily: dict[str, Amount],
+        bucket_seconds: float = 60,
+    ):
+        self.limits = {
+            "hourly": {asset: limit.rescale(_SCALE).units for asset, limit in hourly.items()},
+            "daily": {asset: limit.rescale(_SCALE).units for asset, limit in daily.items()},
+        }
+        self.assets = frozenset(hourly) | frozenset(daily)
+        self.bucket_seconds = bucket_seconds
+        self._totals: dict[tuple, dict[str, RollingTotal]] = {}
+
+    @property
+    def tracked(self) -> int:
+        """Number of ``(user_id, asset)`` pairs with totals in memory."""
+        return len(self._totals)
+
+    def _windows(self, key: tuple) -> dict[str, RollingTotal]:
+        windows = self._totals.get(key)
+        if windows is None:
+            windows = self._totals[key] = {
+                name: RollingTotal(span, self.bucket_seconds) for name, span in WINDOWS.items()
+            }
+        return windows
+
+    def record(self, user_id: Hashable, asset: str, amount, at: float | None = None) -> None:
+        """Count ``amount`` (negative to take it back) as withdrawn at ``at``."""
+        if asset not in self.assets:
+            return
+        at = time.time() if at is None else at
+        units = Amount.parse(amount).rescale(_SCALE).units
+        for total in self._windows((user_id, asset)).values():
+            # Taking back from a bucket that already expired would undercount
+            if units >= 0 or at > time.time() - total.span:
+                total.add(at, units)
+
+    def exceeded(self, user_id: Hashable, asset: str, amount, now: float | None = None) -> str | None:
+        """Name of the first window that ``amount`` more would exceed, or ``None``."""
+        if asset not in self.assets:
+            return None
+        now = time.time() if now is None else now
+        windows = self._totals.get((user_id, asset))
+        used = {name: total.current(now) for name, total in (windows or {}).items()}
+        return self._over(asset, used, Amount.parse(amount).rescale(_SCALE).units)
+
+    def exceeded_by(self, asset: str, withdrawn: dict, amount) -> str | None:
+        """Like :meth:`exceeded`, for amounts already ``withdrawn`` per window name."""
+        if asset not in self.assets:
+            return None
+        used = {
+            name: Amount.parse(total).rescale(_SCALE).units for name, total in withdrawn.items()
+        }
+        return self._over(asset, used, Amount.parse(amount).rescale(_SCALE).units)
+
+    def _over(self, asset: str, used: dict[str, int], units: int) -> str | None:
+        for name, limits in self.limits.items():
+            limit = limits.get(asset)
+            if limit is not None and used.get(name, 0) + units > limit:
+                return name
+        return None
+
+    @contextmanager
+    def reserve(self, user_id: Hashable, asset: str, amount) -> Iterator[None]:
+        """Count ``amount`` against the user's limits while a withdrawal is made.
+
+        Raises :class:`VelocityLimitExceeded` without counting anything when a
+        limit would be exceeded, and takes the amount back if the block raises.
+        Checking and counting happen without yielding to the event loop, so
+        concurrent requests cannot both pass on the same headroom.
+        """
+        now = time.time()
+        window = self.exceeded(user_id, asset, amount, now)
+        if window is not None:
+            raise VelocityLimitExceeded(window, asset)
+        self.record(user_id, asset, amount, now)
+        try:
+            yield
+        except BaseException:
+            self.record(user_id, asset, -Amount.parse(amount), now)
+            raise
+
+    def prune(self, now: float | None = None) -> int:
+        """Forget users with nothing left in any window; returns how many."""
+        now = time.time() if now is None else now
+        idle = []
+        for key, windows in self._totals.items():
+            for total in windows.values():
+                total.current(now)
+            if not any(total.buckets for total in windows.values()):
+                idle.append(key)
+        for key in idle:
+            del self._totals[key]
+        return len(idle)
+
+
+velocity_limits = VelocityLimits(
+    parse_limits(settings.VELOCITY_HOURLY_LIMITS),
+    parse_limits(settings.VELOCITY_DAILY_LIMITS),
+    settings.VELOCITY_BUCKET_SECONDS,
+)
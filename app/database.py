@@ -1,3 +1,4 @@
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
@@ -24,3 +25,14 @@ async def get_db():
         yield db
     finally:
         await db.close()
+
+
+async def advisory_xact_lock(db: AsyncSession, key: str) -> None:
+    """Take a Postgres advisory lock on ``key`` until the current transaction ends.
+
+    Used to serialise work across API workers.  Other backends (SQLite in
+    tests) have no advisory locks, so the call is a no-op there.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    await db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": key})
@@ -1,8 +1,47 @@
+import asyncio
+import logging
+import signal
+
 from fastapi import FastAPI, Depends
 from fastapi.openapi.utils import get_openapi
 from fastapi.middleware.cors import CORSMiddleware
 from app.utils.auth import oauth2_scheme
-from app.routes import auth, user, twofa, wallet
+from app.config import settings
+from app.core import metrics
+from app.core.assets import reload_assets
+from app.core.tasks import start_background, run_periodically, stop_background
+from app.database import AsyncSessionLocal, engine
+from app.routes import (
+    auth,
+    user,
+    twofa,
+    wallet,
+    webhooks,
+    events,
+    transfers,
+    transactions,
+    archive,
+    payouts,
+    addresses,
+    assets,
+)
+from app.api.routes import fees
+from app.services.donation import donation_destinations
+from app.services.notifications import change_relay
+from app.services.vault_pool import refill_pool, validate_pool_assets
+from app.services.vault_assets import sync_vault_assets
+from app.services.webhook_ingest import webhook_ingestor
+from app.services.webhook_processor import process_webhook_events
+from app.services.status_poller import status_poller
+from app.services.partitions import maintain_partitions
+from app.services.archive import archive_old_rows
+from app.services.fee_engine import fee_engine
+from app.services.fee_history import flush_fee_history, load_fee_history
+from app.services.withdrawal_batches import process_withdrawal_batches
+from app.services.payouts import resume_payouts
+from app.services.velocity import load_velocity, prune_velocity
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Privacy Fintech API")
 
@@ -10,6 +49,140 @@ app.include_router(auth.router)
 app.include_router(user.router)
 app.include_router(twofa.router)
 app.include_router(wallet.router)
+app.include_router(webhooks.router)
+app.include_router(events.router)
+app.include_router(transfers.router)
+app.include_router(transactions.router)
+app.include_router(archive.router)
+app.include_router(payouts.router)
+app.include_router(addresses.router)
+app.include_router(assets.router)
+app.include_router(fees.router)
+
+
+def reload_assets_on_signal():
+    # Donation wallets are resolved again on their next use
+    donation_destinations.invalidate()
+    try:
+        count = reload_assets()
+    except (OSError, ValueError):
+        logger.exception("Asset registry reload failed; keeping the current assets")
+        return
+    logger.info("Asset registry reloaded with %d assets", count)
+
+
+@app.on_event("startup")
+async def start_background_jobs():
+    # SIGHUP re-reads ASSET_REGISTRY_PATH and re-resolves donation wallets
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_assets_on_signal)
+    except (AttributeError, NotImplementedError, RuntimeError):
+        # No SIGHUP on Windows, and handlers need the main thread
+        pass
+    # Resolve donation wallets in the background so startup is not blocked
+    # on Fireblocks provisioning.
+    start_background(donation_destinations.warm_up(AsyncSessionLocal))
+    start_background(webhook_ingestor.run(AsyncSessionLocal), name="webhook_writer")
+    # Streams on this worker also get changes committed by the others
+    start_background(change_relay.run(engine), name="change_relay")
+    # SKIP LOCKED lets processors share the backlog without coordination
+    for _ in range(settings.WEBHOOK_PROCESSORS):
+        start_background(
+            run_periodically(
+                "webhook_processor",
+                settings.WEBHOOK_PROCESS_INTERVAL,
+                lambda: process_webhook_events(AsyncSessionLocal),
+            )
+        )
+    if settings.TX_PARTITION_MAINTENANCE_INTERVAL > 0:
+        start_background(
+            run_periodically(
+                "transaction_partitions",
+                settings.TX_PARTITION_MAINTENANCE_INTERVAL,
+                lambda: maintain_partitions(AsyncSessionLocal),
+            )
+        )
+    if settings.TX_ARCHIVE_RETENTION_DAYS > 0 or settings.WEBHOOK_ARCHIVE_RETENTION_DAYS > 0:
+        start_background(
+            run_periodically(
+                "cold_archive",
+                settings.ARCHIVE_INTERVAL,
+                lambda: archive_old_rows(AsyncSessionLocal),
+            )
+        )
+    start_background(load_fee_history(AsyncSessionLocal), name="fee_history_load")
+    if settings.VELOCITY_HOURLY_LIMITS or settings.VELOCITY_DAILY_LIMITS:
+        # Awaited so limits hold from the first request after a restart
+        await load_velocity(AsyncSessionLocal)
+        start_background(run_periodically("velocity_prune", 3600, prune_velocity))
+    if settings.FEE_REFRESH_INTERVAL > 0:
+        start_background(
+            run_periodically("fee_refresh", settings.FEE_REFRESH_INTERVAL, fee_engine.refresh)
+        )
+    if settings.FEE_HISTORY_FLUSH_INTERVAL > 0:
+        start_background(
+            run_periodically(
+                "fee_history_flush",
+                settings.FEE_HISTORY_FLUSH_INTERVAL,
+                lambda: flush_fee_history(AsyncSessionLocal),
+            )
+        )
+    if settings.WITHDRAWAL_BATCHING:
+        start_background(
+            run_periodically(
+                "withdrawal_batches",
+                settings.WITHDRAWAL_BATCH_INTERVAL,
+                lambda: process_withdrawal_batches(AsyncSessionLocal),
+            )
+        )
+    if settings.PAYOUT_RESUME_INTERVAL > 0:
+        start_background(
+            run_periodically(
+                "payout_resume",
+                settings.PAYOUT_RESUME_INTERVAL,
+                lambda: resume_payouts(AsyncSessionLocal),
+            )
+        )
+    if settings.STATUS_POLL_INTERVAL > 0:
+        start_background(
+            run_periodically(
+                "status_poller",
+                settings.STATUS_POLL_INTERVAL,
+                lambda: status_poller.poll(AsyncSessionLocal),
+            )
+        )
+    if settings.VAULT_POOL_SIZE > 0:
+        # Fails startup rather than retrying an impossible activation forever
+        validate_pool_assets()
+        start_background(
+            run_periodically(
+                "vault_pool_refill",
+                settings.VAULT_POOL_REFILL_INTERVAL,
+                lambda: refill_pool(AsyncSessionLocal),
+            )
+        )
+    if settings.VAULT_ASSET_SYNC_INTERVAL > 0:
+        start_background(
+            run_periodically(
+                "vault_asset_sync",
+                settings.VAULT_ASSET_SYNC_INTERVAL,
+                lambda: sync_vault_assets(AsyncSessionLocal),
+            )
+        )
+
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    await stop_background()
+    if settings.FEE_HISTORY_FLUSH_INTERVAL > 0:
+        # Keep what was recorded since the last periodic flush
+        await flush_fee_history(AsyncSessionLocal)
+
+
+@app.get("/metrics", tags=["Metrics"])
+async def get_metrics():
+    return metrics.snapshot()
+
 
 # Allow frontend usage (optional)
 app.add_middleware(
@@ -1,16 +1,25 @@
-from . import user, twofa, wallet, vault
+from . import user, twofa, wallet, vault, vault_pool, vault_asset, fee_observation
 from .user import User
 from .twofa import EmailCode
 from .wallet import Wallet
 from .vault import Vault
+from .vault_pool import PooledVault
+from .vault_asset import VaultAsset
+from .fee_observation import FeeObservation
 
 __all__ = [
     "user",
     "twofa",
     "wallet",
     "vault",
+    "vault_pool",
+    "vault_asset",
+    "fee_observation",
     "User",
     "EmailCode",
     "Wallet",
     "Vault",
+    "PooledVault",
+    "VaultAsset",
+    "FeeObservation",
 ]
@@ -0,0 +1,25 @@
+from sqlalchemy import BigInteger, Column, String, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+from datetime import datetime
+
+from app.database import Base
+
+
+class FeeObservation(Base):
+    """Provider fee levels for one asset at one point in time.
+
+    Fees are for the size model's reference transfer, in the asset's base
+    units (satoshi, wei, sun).
+    """
+
+    __tablename__ = "fee_observations"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    asset = Column(String, nullable=False)
+    observed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    low = Column(BigInteger, nullable=False)
+    medium = Column(BigInteger, nullable=False)
+    high = Column(BigInteger, nullable=False)
+
+    __table_args__ = (Index("ix_fee_observations_asset_observed", "asset", "observed_at"),)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Enum, Numeric, ForeignKey, Index
+from sqlalchemy import Column, String, DateTime, Enum, Numeric, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from enum import Enum as PyEnum
 import uuid
@@ -45,7 +45,8 @@ class Transaction(Base):
     fee_amount = Column(Numeric(38, 18))
     fee_currency = Column(String)
     balance_after = Column(Numeric(38, 18))
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Partition key, hence part of the primary key (see app.services.partitions)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, primary_key=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     group_id = Column(UUID(as_uuid=True))
@@ -76,9 +77,25 @@ class Transaction(Base):
 
     # Index definitions mirror the SQL from the specification
     __table_args__ = (
-        Index("ix_transactions_user_created", "user_id", "created_at"),
-        Index("ix_transactions_wallet_created", "wallet_id", "created_at"),
+        Index("ix_transactions_user_created", "user_id", "created_at", "id"),
+        Index("ix_transactions_wallet_created", "wallet_id", "created_at", "id"),
         Index("ix_transactions_provider_ref", "provider", "provider_ref_id"),
         Index("ix_transactions_group_id", "group_id"),
+        # Retries carrying an Idempotency-Key (see app.services.idempotency)
+        Index(
+            "ix_transactions_idempotency_key",
+            "user_id",
+            "idempotency_key",
+            postgresql_where=text("idempotency_key IS NOT NULL"),
+        ),
         Index("ix_transactions_type_status", "type", "status"),
+        # Withdrawals waiting to be batched (see app.services.withdrawal_batches)
+        Index(
+            "ix_transactions_withdrawal_queue",
+            "created_at",
+            postgresql_where=text(
+                "provider_ref_id IS NULL AND type = 'crypto_out' AND status = 'pending'"
+            ),
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, DateTime, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+from datetime import datetime
+
+from app.database import Base
+
+
+class VaultAsset(Base):
+    """Local mirror of the assets activated in each Fireblocks vault.
+
+    ``address`` is the known deposit address, or ``None`` when only the
+    existence of the asset is known (e.g. from the paginated sync).
+    """
+
+    __tablename__ = "vault_assets"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    vault_id = Column(String, nullable=False)
+    asset_id = Column(String, nullable=False)
+    address = Column(String, nullable=True)
+    synced_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("vault_id", "asset_id", name="uq_vault_assets_vault_asset"),
+    )
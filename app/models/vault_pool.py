@@ -0,0 +1,33 @@
+from sqlalchemy import Boolean, Column, String, DateTime, ForeignKey, Index, and_
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+import uuid
+from datetime import datetime
+
+from app.database import Base
+
+
+class PooledVault(Base):
+    """A Fireblocks vault provisioned ahead of time and not yet owned by a user.
+
+    ``assets`` maps each pool asset id to its deposit address, ``None`` until
+    the asset is activated.  Only ``ready`` vaults, with every asset active,
+    are handed out.
+    """
+
+    __tablename__ = "vault_pool"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    vault_id = Column(String, unique=True, nullable=False)
+    assets = Column(JSONB, default=dict, nullable=False)
+    ready = Column(Boolean, default=False, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    claimed_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_vault_pool_unclaimed",
+            "created_at",
+            postgresql_where=and_(claimed_by.is_(None), ready),
+        ),
+    )
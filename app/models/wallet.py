@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -20,3 +20,6 @@ class Wallet(Base):
 
     user = relationship("User", backref="wallets")
     vault = relationship("Vault", back_populates="wallets")
+
+    # Resolves a destination address to one of our wallets (internal transfers)
+    __table_args__ = (Index("ix_wallets_address_currency", "address", "currency"),)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 import uuid
 from datetime import datetime
@@ -11,9 +11,20 @@ class WebhookEvent(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     provider = Column(String, nullable=False)
+    # Provider event id (or payload digest) used to drop redelivered events
+    event_id = Column(String, nullable=False)
     event_type = Column(String, nullable=False)
     provider_ref_id = Column(String)
     payload = Column(JSONB, nullable=False)
     received_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     processed_at = Column(DateTime)
     processing_error = Column(String)
+
+    __table_args__ = (
+        Index("ux_webhook_events_provider_event", "provider", "event_id", unique=True),
+        Index(
+            "ix_webhook_events_unprocessed",
+            "received_at",
+            postgresql_where=processed_at.is_(None),
+        ),
+    )
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.config import settings
+from app.core.assets import ASSETS, validate_destinations
+from app.models.user import User
+from app.schemas.address import AddressValidationRequest, AddressValidationResponse
+from app.utils.auth import get_current_user
+
+router = APIRouter(prefix="/addresses", tags=["Addresses"])
+
+
+@router.post("/validate", response_model=AddressValidationResponse)
+async def validate_addresses(
+    payload: AddressValidationRequest,
+    current_user: User = Depends(get_current_user),
+):
+    """Validate a list of destination addresses for one asset.
+
+    Format and checksum (base58check, bech32/bech32m, EIP-55 when
+    ``eth_utils`` is installed) are checked for every address, so a payout
+    file can be vetted before it is submitted.
+    """
+    if payload.asset not in ASSETS:
+        raise HTTPException(status_code=400, detail=f"Unsupported asset: {payload.asset}")
+    if len(payload.addresses) > settings.ADDRESS_VALIDATION_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.ADDRESS_VALIDATION_MAX_ITEMS} addresses per request",
+        )
+    results = validate_destinations(payload.asset, payload.addresses)
+    return AddressValidationResponse(
+        asset=payload.asset,
+        total=len(results),
+        invalid=[index for index, valid in enumerate(results) if not valid],
+    )
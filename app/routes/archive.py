@@ -0,0 +1,39 @@
+import asyncio
+from datetime import datetime
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.models.user import User
+from app.services.archive import find_archived, scan_archived
+from app.utils.auth import get_current_user
+
+router = APIRouter(prefix="/archive", tags=["Archive"])
+
+
+@router.get("/transactions/{transaction_id}")
+async def get_archived_transaction(
+    transaction_id: UUID,
+    current_user: User = Depends(get_current_user),
+):
+    """Return one of the user's transactions from the cold archive."""
+    record = await asyncio.to_thread(find_archived, "transactions", transaction_id)
+    if record is None or record["user_id"] != str(current_user.id):
+        raise HTTPException(status_code=404, detail="Archived transaction not found")
+    return record
+
+
+@router.get("/transactions")
+async def list_archived_transactions(
+    start: datetime,
+    end: datetime,
+    limit: int = Query(500, ge=1, le=5000),
+    current_user: User = Depends(get_current_user),
+):
+    """Return the user's archived transactions created in ``[start, end)``."""
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    records = await asyncio.to_thread(
+        scan_archived, "transactions", start, end, limit=limit, owner=current_user.id
+    )
+    return {"items": records}
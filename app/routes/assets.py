@@ -0,0 +1,43 @@
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from app.config import settings
+from app.core.assets import ASSETS, reload_assets
+from app.models.user import User
+from app.schemas.asset import AssetInfo, AssetReloadResponse
+from app.utils.auth import get_current_user
+
+router = APIRouter(prefix="/assets", tags=["Assets"])
+
+
+@router.get("/", response_model=list[AssetInfo])
+async def list_assets(current_user: User = Depends(get_current_user)):
+    """Return the assets of the current registry."""
+    return [
+        AssetInfo(
+            asset=asset,
+            symbol=meta.symbol,
+            network=meta.network,
+            decimals=meta.decimals,
+            native=meta.native,
+        )
+        for asset, meta in ASSETS.snapshot().items()
+    ]
+
+
+@router.post("/reload", response_model=AssetReloadResponse)
+async def reload_asset_registry(x_admin_token: str | None = Header(None)):
+    """Re-read ``ASSET_REGISTRY_PATH`` and swap the new assets in.
+
+    Only the worker serving the request reloads; send SIGHUP to reload every
+    worker process.  A registry that fails to load keeps the current assets.
+    """
+    token = settings.ASSET_RELOAD_TOKEN
+    if not token or not hmac.compare_digest((x_admin_token or "").encode(), token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    try:
+        count = reload_assets()
+    except (OSError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=f"Asset registry not reloaded: {exc}")
+    return AssetReloadResponse(assets=count)
@@ -0,0 +1,44 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.pubsub import broker
+from app.database import get_db
+from app.models.user import User
+from app.services.notifications import user_topic
+from app.utils.auth import get_current_user
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+
+async def _event_stream(topic):
+    with broker.subscribe(topic) as queue:
+        yield ": connected\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), settings.SSE_KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {message['event']}\ndata: {json.dumps(message)}\n\n"
+
+
+@router.get("/stream")
+async def stream_events(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Server-Sent Events feed of the user's transaction status and balance changes."""
+    topic = user_topic(current_user.id)
+    # Idle streams must not pin a pooled DB connection
+    await db.close()
+    return StreamingResponse(
+        _event_stream(topic),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
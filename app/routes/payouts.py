@@ -0,0 +1,133 @@
+from datetime import datetime
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import settings
+from app.core.tasks import start_background
+from app.core.velocity import VelocityLimitExceeded
+from app.database import AsyncSessionLocal, get_db
+from app.models.transaction import TxStatus
+from app.models.user import User
+from app.models.wallet import Wallet
+from app.schemas.payout import PayoutBatch, PayoutItemStatus, PayoutRequest
+from app.services.payouts import (
+    PAYOUT_KEY,
+    QUEUED,
+    InsufficientBalanceError,
+    PayoutError,
+    create_payout,
+    item_status,
+    payout_status,
+    run_payout,
+)
+from app.utils.auth import get_current_user
+
+router = APIRouter(prefix="/payouts", tags=["Payouts"])
+
+
+@router.post("/", response_model=PayoutBatch)
+async def create_payout_batch(
+    payload: PayoutRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Pay many addresses or users from one wallet in a single request.
+
+    The request is rejected as a whole if any item is invalid (every invalid
+    item is listed) or the wallet cannot cover the total.  Otherwise all
+    items are recorded as queued and submitted in the background; poll
+    ``GET /payouts/{batch_id}`` for their progress.
+    """
+    if not payload.items:
+        raise HTTPException(status_code=400, detail="No payout items")
+    if len(payload.items) > settings.PAYOUT_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.PAYOUT_MAX_ITEMS} items per payout",
+        )
+
+    result = await db.execute(
+        select(Wallet).where(
+            Wallet.id == payload.wallet_id,
+            Wallet.user_id == current_user.id,
+        )
+    )
+    wallet = result.scalar_one_or_none()
+    if wallet is None:
+        raise HTTPException(status_code=404, detail="Wallet not found")
+    if payload.asset != wallet.currency:
+        raise HTTPException(status_code=400, detail="Asset mismatch with wallet")
+
+    try:
+        payout = await create_payout(db, current_user, wallet, payload.items)
+    except PayoutError as exc:
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "Invalid payout items", "items": exc.errors},
+        ) from exc
+    except InsufficientBalanceError as exc:
+        raise HTTPException(status_code=400, detail="Insufficient balance") from exc
+    except VelocityLimitExceeded as exc:
+        raise HTTPException(status_code=429, detail=str(exc)) from exc
+
+    start_background(
+        run_payout(AsyncSessionLocal, wallet.vault_id, wallet.currency, payout.jobs),
+        name=f"payout:{payout.batch_id}",
+    )
+    return PayoutBatch(
+        batch_id=payout.batch_id,
+        counts={QUEUED: len(payout.rows)},
+        items=[
+            PayoutItemStatus(
+                index=row["meta"][PAYOUT_KEY],
+                transaction_id=row["id"],
+                address_to=row["address_to"],
+                amount=str(row["amount"]),
+                status=QUEUED,
+                updated_at=row["updated_at"],
+            )
+            for row in payout.rows
+        ],
+        cursor=payout.rows[0]["updated_at"],
+    )
+
+
+@router.get("/{batch_id}", response_model=PayoutBatch)
+async def get_payout_batch(
+    batch_id: UUID,
+    since: datetime | None = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Return item counts and the items changed after ``since``.
+
+    Without ``since`` every item is returned; pass the previous response's
+    ``cursor`` to receive what changed since then.  Items updated shortly
+    before the cursor are returned again, so keep the latest per
+    ``transaction_id``.
+    """
+    status = await payout_status(db, current_user.id, batch_id, since)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Payout not found")
+    counts, txs, cursor = status
+    return PayoutBatch(
+        batch_id=batch_id,
+        counts=counts,
+        items=[
+            PayoutItemStatus(
+                index=tx.meta[PAYOUT_KEY],
+                transaction_id=tx.id,
+                address_to=tx.address_to,
+                amount=str(tx.amount),
+                status=item_status(tx),
+                transfer_id=tx.provider_ref_id,
+                error=tx.description if tx.status == TxStatus.failed else None,
+                updated_at=tx.updated_at,
+            )
+            for tx in txs
+        ],
+        cursor=cursor,
+    )
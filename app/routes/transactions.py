@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal, get_db
+from app.models.user import User
+from app.models.transaction import TxType, TxStatus
+from app.schemas.transaction import TransactionPage
+from app.services.export import FORMATS, export_transactions
+from app.services.history import HISTORY_COLUMNS, fetch_page, parse_fields
+from app.utils.auth import get_current_user
+
+router = APIRouter(prefix="/transactions", tags=["Transactions"])
+
+
+@router.get("", response_model=TransactionPage)
+async def list_transactions(
+    type: list[TxType] | None = Query(None),
+    status: list[TxStatus] | None = Query(None),
+    currency: str | None = None,
+    fields: str | None = Query(None, description="Comma-separated columns to return"),
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Return the user's transactions, newest first, one keyset page at a time."""
+    try:
+        items, next_cursor = await fetch_page(
+            db,
+            current_user.id,
+            fields=parse_fields(fields),
+            cursor=cursor,
+            limit=limit,
+            types=type,
+            statuses=status,
+            currency=currency,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return TransactionPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/export")
+async def export_user_transactions(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    type: list[TxType] | None = Query(None),
+    status: list[TxStatus] | None = Query(None),
+    currency: str | None = None,
+    fields: str | None = Query(None, description="Comma-separated columns to export"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Stream the user's full statement as CSV or NDJSON, optionally gzipped."""
+    try:
+        columns = parse_fields(fields) if fields else list(HISTORY_COLUMNS)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    user_id = current_user.id
+    # The export reads through its own session for as long as it streams
+    await db.close()
+
+    filename = f"transactions.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export_transactions(
+            AsyncSessionLocal,
+            user_id,
+            columns,
+            format,
+            gzip,
+            types=type,
+            statuses=status,
+            currency=currency,
+        ),
+        media_type="application/gzip" if gzip else FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
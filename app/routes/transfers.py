@@ -0,0 +1,79 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import settings
+from app.core import metrics
+from app.core.pubsub import broker
+from app.database import get_db
+from app.models.user import User
+from app.models.transaction import Transaction, TxStatus
+from app.schemas.transaction import TransferStatus
+from app.services.notifications import transfer_topic
+from app.utils.auth import get_current_user
+
+router = APIRouter(prefix="/transfers", tags=["Transfers"])
+
+
+@router.get("/{transfer_id}", response_model=TransferStatus)
+async def get_transfer_status(
+    transfer_id: str,
+    wait: float = Query(0, ge=0, description="Seconds to wait for a status change"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Return the status of a transfer, optionally long-polling until it changes.
+
+    With ``wait`` the request returns as soon as the transfer leaves its
+    current status, or with the unchanged status once ``wait`` seconds
+    (capped at ``TRANSFER_WAIT_MAX``) have passed.
+    """
+    # Subscribe before reading so a change committed in between is not missed
+    with broker.subscribe(transfer_topic(transfer_id)) as queue:
+        result = await db.execute(
+            select(Transaction)
+            .where(
+                Transaction.provider_ref_id == transfer_id,
+                Transaction.user_id == current_user.id,
+            )
+            .order_by(Transaction.created_at)
+            .limit(1)
+        )
+        tx = result.scalar_one_or_none()
+        if tx is None:
+            raise HTTPException(status_code=404, detail="Transfer not found")
+        response = TransferStatus(
+            transfer_id=transfer_id,
+            transaction_id=tx.id,
+            status=tx.status.value,
+            tx_hash=tx.tx_hash,
+            updated_at=tx.updated_at,
+        )
+        timeout = min(wait, settings.TRANSFER_WAIT_MAX)
+        if tx.status != TxStatus.pending or timeout <= 0:
+            return response
+
+        # Waiting costs a queue entry, not a DB connection
+        await db.close()
+        metrics.inc("transfer_waiters_total")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return response
+            try:
+                message = await asyncio.wait_for(queue.get(), remaining)
+            except asyncio.TimeoutError:
+                return response
+            if message["id"] == str(tx.id) and message["status"] != response.status:
+                return TransferStatus(
+                    transfer_id=transfer_id,
+                    transaction_id=tx.id,
+                    status=message["status"],
+                    tx_hash=message["tx_hash"],
+                    updated_at=message["updated_at"],
+                    changed=True,
+                )
@@ -1,18 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from uuid import UUID, uuid4
+from contextlib import asynccontextmanager
 from decimal import Decimal
 
-from app.database import get_db
-from app.config import settings
+from app.core.amounts import Amount
+from app.core.velocity import velocity_limits
+from app.database import get_db, advisory_xact_lock
 from app.models.user import User
 from app.models.wallet import Wallet
-from app.models.vault import Vault
 from app.models.transaction import Transaction, TxType, TxStatus
 
 from app.schemas.wallet import (
     WalletOut,
+    BulkWalletRequest,
+    BulkWalletResult,
+    BulkWalletResponse,
     WalletBalance,
     WithdrawalRequest,
     WithdrawalResponse,
@@ -21,21 +25,101 @@ from app.schemas.wallet import (
     FeeEstimateRequest,
     FeeEstimateResponse,
 )
+from app.schemas.transaction import TransactionPage
 from app.utils.auth import get_current_user
 from app.services.fireblocks import (
-    create_vault_account,
-    create_asset_for_vault,
-    generate_address_for_vault,
     get_wallet_balance,
     create_transfer,
     transfer_between_vault_accounts,
     estimate_transaction_fee,
     AssetAlreadyExistsError,
 )
+from app.services.provisioning import ensure_vault, ensure_wallet, ensure_wallets
+from app.services.history import fetch_page, parse_fields
+from app.services.fee_engine import fee_engine
+from app.services.withdrawal_batches import QUEUED, queued_amount, supports_batching
+from app.services.velocity import recent_withdrawals
+from app.services.idempotency import (
+    FINGERPRINT_META,
+    IdempotencyKeyReused,
+    idempotency_store,
+    provider_key,
+    request_fingerprint,
+)
+from app.services.donation import (
+    donation_destinations,
+    DonationDestination,
+    DonationNotConfiguredError,
+    DonationUserNotFoundError,
+)
 
 router = APIRouter(prefix="/wallets", tags=["Wallets"])
 
 
+@asynccontextmanager
+async def _reserve_withdrawal(db, user_id, asset: str, amount):
+    """Hold ``amount`` against the user's velocity limits until the block ends.
+
+    Rejects the request with a 429 when a limit would be exceeded, counting
+    the withdrawals made through every worker.  The block must commit the
+    withdrawal in ``db``'s transaction.
+    """
+    window = velocity_limits.exceeded(user_id, asset, amount)
+    if window is None and asset in velocity_limits.assets:
+        withdrawn = await recent_withdrawals(db, user_id, asset)
+        window = velocity_limits.exceeded_by(asset, withdrawn, amount)
+        # Checked again after the query so the reservation below cannot fail
+        window = window or velocity_limits.exceeded(user_id, asset, amount)
+    if window is not None:
+        raise HTTPException(
+            status_code=429, detail=f"{window.capitalize()} {asset} withdrawal limit exceeded"
+        )
+    with velocity_limits.reserve(user_id, asset, amount):
+        yield
+
+
+def _provider_key(user: User, idempotency_key: str | None) -> str | None:
+    return provider_key(user.id, idempotency_key) if idempotency_key else None
+
+
+def _replay_withdrawal(tx: Transaction) -> WithdrawalResponse:
+    """Response of the request that wrote ``tx``, for a retry with its key."""
+    if "batch" in tx.meta:
+        return WithdrawalResponse(transfer_id="", status=QUEUED, transaction_id=tx.id)
+    return WithdrawalResponse(transfer_id=tx.provider_ref_id or "", status=tx.status.value)
+
+
+def _request_meta(fingerprint: str | None, **meta) -> dict:
+    """``meta`` for the transaction of a request, with its fingerprint when keyed."""
+    if fingerprint is not None:
+        meta[FINGERPRINT_META] = fingerprint
+    return meta
+
+
+async def _idempotent(db, user: User, idempotency_key: str | None, request: tuple, handler):
+    """Run ``handler(fingerprint)`` once per ``Idempotency-Key``.
+
+    ``fingerprint`` is ``None`` for requests without a key; the handler
+    stores it in its transaction's ``meta`` through :func:`_request_meta`.
+    Nothing in the handler may commit before its transaction is written, as
+    that would release the idempotency lock.
+    """
+    fingerprint = request_fingerprint(*request)
+    try:
+        return await idempotency_store.run(
+            db,
+            user.id,
+            idempotency_key,
+            fingerprint,
+            lambda: handler(fingerprint if idempotency_key else None),
+            _replay_withdrawal,
+        )
+    except IdempotencyKeyReused:
+        raise HTTPException(
+            status_code=422, detail="Idempotency-Key was already used for a different request"
+        )
+
+
 @router.post("/vault")
 async def create_user_vault(
     current_user: User = Depends(get_current_user),
@@ -43,24 +127,15 @@ async def create_user_vault(
 ):
     """Create a Fireblocks vault for the current user.
 
-    If the user already has a vault, an HTTP 400 error is raised. Otherwise a new
-    vault is created via the Fireblocks service and persisted along with the
-    updated user flag.
+    If the user already has a vault, an HTTP 400 error is raised. Otherwise a
+    vault is claimed from the warm pool or created via the Fireblocks service
+    and persisted along with the updated user flag.
     """
 
     if current_user.has_vault:
         raise HTTPException(status_code=400, detail="User already has a vault")
 
-    data = await create_vault_account(str(current_user.id))
-    vault = Vault(vault_id=data["vault_account_id"], user_id=current_user.id)
-
-    current_user.has_vault = True
-    db.add(vault)
-    db.add(current_user)
-    await db.commit()
-    await db.refresh(vault)
-
-    return vault
+    return await ensure_vault(db, current_user)
 
 
 @router.post("/", response_model=WalletOut)
@@ -72,53 +147,51 @@ async def create_user_wallet(
     if not current_user.email_verified:
         raise HTTPException(status_code=400, detail="Email not verified")
 
-    # Check if wallet for this asset already exists
-    result = await db.execute(
-        select(Wallet).where(
-            Wallet.user_id == current_user.id,
-            Wallet.currency == asset,
-            Wallet.network == "FIREBLOCKS",
-        )
-    )
-    existing_wallet = result.scalar_one_or_none()
-    if existing_wallet:
-        return existing_wallet
-
-    # Fetch or create the user's vault
-    result = await db.execute(select(Vault).where(Vault.user_id == current_user.id))
-    vault = result.scalar_one_or_none()
-
-    if vault is None:
-        vault_data = await create_vault_account(str(current_user.id))
-        vault = Vault(vault_id=vault_data["vault_account_id"], user_id=current_user.id)
-        current_user.has_vault = True
-        db.add(vault)
-        db.add(current_user)
-        await db.commit()
-        await db.refresh(vault)
-
+    # Existing wallets are returned as-is; concurrent requests for the same
+    # user and asset share a single provisioning call.
     try:
-        address = await create_asset_for_vault(vault.vault_id, asset)
+        wallet = await ensure_wallet(
+            db, current_user, asset, reuse_existing_asset=False
+        )
     except AssetAlreadyExistsError as exc:
         raise HTTPException(
             status_code=409,
             detail="asset already provisioned for this vault",
         ) from exc
 
-    wallet = Wallet(
-        user_id=current_user.id,
-        vault_id=vault.vault_id,
-        address=address,
-        currency=asset,
-        network="FIREBLOCKS",
-    )
-    db.add(wallet)
-    await db.commit()
-    await db.refresh(wallet)
-
     return wallet
 
 
+@router.post("/bulk", response_model=BulkWalletResponse)
+async def create_user_wallets(
+    payload: BulkWalletRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Create wallets for several assets in one call.
+
+    Results are returned per asset in request order; an asset that fails to
+    provision does not prevent the others from being created.
+    """
+    if not current_user.email_verified:
+        raise HTTPException(status_code=400, detail="Email not verified")
+    if not payload.assets:
+        raise HTTPException(status_code=400, detail="No assets requested")
+
+    results = await ensure_wallets(db, current_user, payload.assets)
+    return BulkWalletResponse(
+        results=[
+            BulkWalletResult(
+                asset=r.asset,
+                status=r.status,
+                wallet=r.wallet,
+                error=r.error,
+            )
+            for r in results
+        ]
+    )
+
+
 @router.get("/{wallet_id}/balance", response_model=WalletBalance)
 async def wallet_balance(
     wallet_id: UUID,
@@ -147,6 +220,34 @@ async def wallet_balance(
     )
 
 
+@router.get("/{wallet_id}/transactions", response_model=TransactionPage)
+async def wallet_transactions(
+    wallet_id: UUID,
+    type: list[TxType] | None = Query(None),
+    status: list[TxStatus] | None = Query(None),
+    fields: str | None = Query(None, description="Comma-separated columns to return"),
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Return the transactions of one wallet, newest first, one keyset page at a time."""
+    try:
+        items, next_cursor = await fetch_page(
+            db,
+            current_user.id,
+            fields=parse_fields(fields),
+            cursor=cursor,
+            limit=limit,
+            wallet_id=wallet_id,
+            types=type,
+            statuses=status,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return TransactionPage(items=items, next_cursor=next_cursor)
+
+
 @router.post("/estimate_fee", response_model=FeeEstimateResponse)
 async def estimate_fee(
     payload: FeeEstimateRequest,
@@ -167,10 +268,14 @@ async def estimate_fee(
     if wallet is None:
         raise HTTPException(status_code=404, detail="Wallet not found")
 
+    amount = str(payload.amount)
+    quote = fee_engine.quote(wallet.currency, amount, payload.destination_address)
+    if quote is not None:
+        return quote
     return await estimate_transaction_fee(
         wallet.vault_id,
         wallet.currency,
-        payload.amount,
+        amount,
         payload.destination_address,
     )
 
@@ -182,22 +287,34 @@ async def internal_transfer(
     payload: InternalTransferRequest,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
 ):
-    """Transfer funds to another user's wallet identified by privacy ID or username."""
+    """Transfer funds to another user's wallet identified by privacy ID or username.
 
-    result = await db.execute(
-        select(Wallet).where(
-            Wallet.id == wallet_id,
-            Wallet.user_id == current_user.id,
-        )
+    Retries carrying the same ``Idempotency-Key`` get the first response back.
+    """
+    # Provisioning commits, so it happens before the idempotency lock is taken
+    dest_user, dest_wallet = await _internal_destination(db, payload)
+    return await _idempotent(
+        db,
+        current_user,
+        idempotency_key,
+        ("internal_transfer", wallet_id, payload.asset, payload.amount, payload.destination_user_id),
+        lambda fingerprint: _internal_transfer(
+            wallet_id,
+            payload,
+            current_user,
+            dest_user,
+            dest_wallet,
+            db,
+            idempotency_key,
+            fingerprint,
+        ),
     )
-    wallet = result.scalar_one_or_none()
-    if wallet is None:
-        raise HTTPException(status_code=404, detail="Wallet not found")
 
-    if payload.asset != wallet.currency:
-        raise HTTPException(status_code=400, detail="Asset mismatch with wallet")
 
+async def _internal_destination(db: AsyncSession, payload: InternalTransferRequest):
+    """Destination user of ``payload`` and their wallet, created if missing."""
     # Locate destination user by privacy ID or username
     result = await db.execute(
         select(User).where(User.privacy_id == payload.destination_user_id)
@@ -214,107 +331,19 @@ async def internal_transfer(
         raise HTTPException(status_code=400, detail="Destination email not verified")
 
     # Find or create destination wallet for the requested asset
-    result = await db.execute(
-        select(Wallet).where(
-            Wallet.user_id == dest_user.id,
-            Wallet.currency == payload.asset,
-            Wallet.network == "FIREBLOCKS",
-        )
-    )
-    dest_wallet = result.scalar_one_or_none()
-
-    if dest_wallet is None:
-        result = await db.execute(select(Vault).where(Vault.user_id == dest_user.id))
-        dest_vault = result.scalar_one_or_none()
-        if dest_vault is None:
-            vault_data = await create_vault_account(str(dest_user.id))
-            dest_vault = Vault(vault_id=vault_data["vault_account_id"], user_id=dest_user.id)
-            dest_user.has_vault = True
-            db.add(dest_vault)
-            db.add(dest_user)
-            await db.commit()
-            await db.refresh(dest_vault)
-        try:
-            address = await create_asset_for_vault(dest_vault.vault_id, payload.asset)
-        except AssetAlreadyExistsError:
-            address = await generate_address_for_vault(dest_vault.vault_id, payload.asset)
-        dest_wallet = Wallet(
-            user_id=dest_user.id,
-            vault_id=dest_vault.vault_id,
-            address=address,
-            currency=payload.asset,
-            network="FIREBLOCKS",
-        )
-        db.add(dest_wallet)
-        await db.commit()
-        await db.refresh(dest_wallet)
-
-    # Retrieve current balances to calculate balance_after fields
-    sender_balance_data = await get_wallet_balance(wallet.vault_id, payload.asset)
-    dest_balance_data = await get_wallet_balance(dest_wallet.vault_id, payload.asset)
-
-    transfer = await transfer_between_vault_accounts(
-        wallet.vault_id, dest_wallet.vault_id, payload.asset, payload.amount
-    )
-
-    group_id = uuid4()
-    amount_dec = Decimal(payload.amount)
-    sender_balance = Decimal(sender_balance_data["balance"]) - amount_dec
-    dest_balance = Decimal(dest_balance_data["balance"]) + amount_dec
+    return dest_user, await ensure_wallet(db, dest_user, payload.asset)
 
-    tx_out = Transaction(
-        user_id=current_user.id,
-        wallet_id=wallet.id,
-        provider="fireblocks",
-        type=TxType.internal_out,
-        status=TxStatus.pending,
-        amount=payload.amount,
-        currency=payload.asset,
-        fee_amount=Decimal("0"),
-        fee_currency=payload.asset,
-        balance_after=sender_balance,
-        address_from=wallet.address,
-        address_to=dest_wallet.address,
-        counterparty_user=dest_user.id,
-        provider_ref_id=transfer.get("id"),
-        group_id=group_id,
-    )
-    tx_in = Transaction(
-        user_id=dest_user.id,
-        wallet_id=dest_wallet.id,
-        provider="fireblocks",
-        type=TxType.internal_in,
-        status=TxStatus.pending,
-        amount=payload.amount,
-        currency=payload.asset,
-        fee_amount=Decimal("0"),
-        fee_currency=payload.asset,
-        balance_after=dest_balance,
-        address_from=wallet.address,
-        address_to=dest_wallet.address,
-        counterparty_user=current_user.id,
-        provider_ref_id=transfer.get("id"),
-        group_id=group_id,
-    )
-
-    db.add_all([tx_out, tx_in])
-    await db.commit()
-    await db.refresh(tx_out)
-
-    return WithdrawalResponse(
-        transfer_id=transfer.get("id", ""),
-        status=transfer.get("status") or transfer.get("state", "pending"),
-    )
 
-@router.post("/{wallet_id}/donate", response_model=WithdrawalResponse)
-async def donate(
+async def _internal_transfer(
     wallet_id: UUID,
-    payload: DonationRequest,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    payload: InternalTransferRequest,
+    current_user: User,
+    dest_user: User,
+    dest_wallet: Wallet,
+    db: AsyncSession,
+    idempotency_key: str | None,
+    fingerprint: str | None,
 ):
-    """Donate funds from a user's wallet to the configured donation account."""
-
     result = await db.execute(
         select(Wallet).where(
             Wallet.id == wallet_id,
@@ -328,116 +357,81 @@ async def donate(
     if payload.asset != wallet.currency:
         raise HTTPException(status_code=400, detail="Asset mismatch with wallet")
 
-    if not settings.DONATION_PRIVACY_ID:
-        raise HTTPException(status_code=500, detail="Donation destination not configured")
-
-    result = await db.execute(
-        select(User).where(User.privacy_id == settings.DONATION_PRIVACY_ID)
-    )
-    dest_user = result.scalar_one_or_none()
-    if dest_user is None:
-        raise HTTPException(status_code=404, detail="Donation user not found")
+    async with _reserve_withdrawal(db, current_user.id, payload.asset, payload.amount):
+        # Retrieve current balances to calculate balance_after fields
+        sender_balance_data = await get_wallet_balance(wallet.vault_id, payload.asset)
+        dest_balance_data = await get_wallet_balance(dest_wallet.vault_id, payload.asset)
 
-    result = await db.execute(
-        select(Wallet).where(
-            Wallet.user_id == dest_user.id,
-            Wallet.currency == payload.asset,
-            Wallet.network == "FIREBLOCKS",
+        transfer = await transfer_between_vault_accounts(
+            wallet.vault_id,
+            dest_wallet.vault_id,
+            payload.asset,
+            str(payload.amount),
+            external_tx_id=_provider_key(current_user, idempotency_key),
         )
-    )
-    dest_wallet = result.scalar_one_or_none()
 
-    if dest_wallet is None:
-        result = await db.execute(select(Vault).where(Vault.user_id == dest_user.id))
-        dest_vault = result.scalar_one_or_none()
-        if dest_vault is None:
-            vault_data = await create_vault_account(str(dest_user.id))
-            dest_vault = Vault(vault_id=vault_data["vault_account_id"], user_id=dest_user.id)
-            dest_user.has_vault = True
-            db.add(dest_vault)
-            db.add(dest_user)
-            await db.commit()
-            await db.refresh(dest_vault)
-        try:
-            address = await create_asset_for_vault(dest_vault.vault_id, payload.asset)
-        except AssetAlreadyExistsError:
-            address = await generate_address_for_vault(dest_vault.vault_id, payload.asset)
-        dest_wallet = Wallet(
+        group_id = uuid4()
+        sender_balance = Amount.parse(sender_balance_data["balance"]) - payload.amount
+        dest_balance = Amount.parse(dest_balance_data["balance"]) + payload.amount
+
+        tx_out = Transaction(
+            user_id=current_user.id,
+            wallet_id=wallet.id,
+            provider="fireblocks",
+            type=TxType.internal_out,
+            status=TxStatus.pending,
+            amount=payload.amount.decimal,
+            currency=payload.asset,
+            fee_amount=Decimal("0"),
+            fee_currency=payload.asset,
+            balance_after=sender_balance.decimal,
+            address_from=wallet.address,
+            address_to=dest_wallet.address,
+            counterparty_user=dest_user.id,
+            provider_ref_id=transfer.get("id"),
+            group_id=group_id,
+            idempotency_key=idempotency_key,
+            meta=_request_meta(fingerprint),
+        )
+        tx_in = Transaction(
             user_id=dest_user.id,
-            vault_id=dest_vault.vault_id,
-            address=address,
+            wallet_id=dest_wallet.id,
+            provider="fireblocks",
+            type=TxType.internal_in,
+            status=TxStatus.pending,
+            amount=payload.amount.decimal,
             currency=payload.asset,
-            network="FIREBLOCKS",
+            fee_amount=Decimal("0"),
+            fee_currency=payload.asset,
+            balance_after=dest_balance.decimal,
+            address_from=wallet.address,
+            address_to=dest_wallet.address,
+            counterparty_user=current_user.id,
+            provider_ref_id=transfer.get("id"),
+            group_id=group_id,
         )
-        db.add(dest_wallet)
-        await db.commit()
-        await db.refresh(dest_wallet)
 
-    sender_balance_data = await get_wallet_balance(wallet.vault_id, payload.asset)
-    dest_balance_data = await get_wallet_balance(dest_wallet.vault_id, payload.asset)
-
-    transfer = await transfer_between_vault_accounts(
-        wallet.vault_id, dest_wallet.vault_id, payload.asset, payload.amount
-    )
-
-    group_id = uuid4()
-    amount_dec = Decimal(payload.amount)
-    sender_balance = Decimal(sender_balance_data["balance"]) - amount_dec
-    dest_balance = Decimal(dest_balance_data["balance"]) + amount_dec
-
-    tx_out = Transaction(
-        user_id=current_user.id,
-        wallet_id=wallet.id,
-        provider="fireblocks",
-        type=TxType.internal_out,
-        status=TxStatus.pending,
-        amount=payload.amount,
-        currency=payload.asset,
-        fee_amount=Decimal("0"),
-        fee_currency=payload.asset,
-        balance_after=sender_balance,
-        address_from=wallet.address,
-        address_to=dest_wallet.address,
-        counterparty_user=dest_user.id,
-        provider_ref_id=transfer.get("id"),
-        group_id=group_id,
-    )
-    tx_in = Transaction(
-        user_id=dest_user.id,
-        wallet_id=dest_wallet.id,
-        provider="fireblocks",
-        type=TxType.internal_in,
-        status=TxStatus.pending,
-        amount=payload.amount,
-        currency=payload.asset,
-        fee_amount=Decimal("0"),
-        fee_currency=payload.asset,
-        balance_after=dest_balance,
-        address_from=wallet.address,
-        address_to=dest_wallet.address,
-        counterparty_user=current_user.id,
-        provider_ref_id=transfer.get("id"),
-        group_id=group_id,
-    )
-
-    db.add_all([tx_out, tx_in])
-    await db.commit()
-    await db.refresh(tx_out)
+        db.add_all([tx_out, tx_in])
+        await db.commit()
+        await db.refresh(tx_out)
 
     return WithdrawalResponse(
         transfer_id=transfer.get("id", ""),
         status=transfer.get("status") or transfer.get("state", "pending"),
     )
 
-
-@router.post("/{wallet_id}/external_transfer", response_model=WithdrawalResponse)
-async def external_transfer(
+@router.post("/{wallet_id}/donate", response_model=WithdrawalResponse)
+async def donate(
     wallet_id: UUID,
-    payload: WithdrawalRequest,
+    payload: DonationRequest,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
 ):
-    """Transfer funds from a wallet to an external address or another user."""
+    """Donate funds from a user's wallet to the configured donation account.
+
+    Retries carrying the same ``Idempotency-Key`` get the first response back.
+    """
     result = await db.execute(
         select(Wallet).where(
             Wallet.id == wallet_id,
@@ -450,28 +444,54 @@ async def external_transfer(
 
     if payload.asset != wallet.currency:
         raise HTTPException(status_code=400, detail="Asset mismatch with wallet")
-    # Check if the destination address corresponds to an internal wallet
-    result = await db.execute(
-        select(Wallet).where(
-            Wallet.address == payload.address,
-            Wallet.currency == payload.asset,
-            Wallet.network == "FIREBLOCKS",
-        )
+
+    # Resolving may provision the donation wallet, which commits, so it
+    # happens before the idempotency lock is taken
+    try:
+        dest = await donation_destinations.get(db, payload.asset)
+    except DonationNotConfiguredError:
+        raise HTTPException(status_code=500, detail="Donation destination not configured")
+    except DonationUserNotFoundError:
+        raise HTTPException(status_code=404, detail="Donation user not found")
+    return await _idempotent(
+        db,
+        current_user,
+        idempotency_key,
+        ("donate", wallet_id, payload.asset, payload.amount, None),
+        lambda fingerprint: _donate(
+            wallet, payload, current_user, dest, db, idempotency_key, fingerprint
+        ),
     )
-    dest_wallet = result.scalar_one_or_none()
 
-    if dest_wallet:
-        sender_balance_data = await get_wallet_balance(wallet.vault_id, payload.asset)
-        dest_balance_data = await get_wallet_balance(dest_wallet.vault_id, payload.asset)
 
-        transfer = await transfer_between_vault_accounts(
-            wallet.vault_id, dest_wallet.vault_id, payload.asset, payload.amount
-        )
+async def _donate(
+    wallet: Wallet,
+    payload: DonationRequest,
+    current_user: User,
+    dest: DonationDestination,
+    db: AsyncSession,
+    idempotency_key: str | None,
+    fingerprint: str | None,
+):
+    async with _reserve_withdrawal(db, current_user.id, payload.asset, payload.amount):
+        sender_balance_data = await get_wallet_balance(wallet.vault_id, payload.asset)
+        try:
+            dest_balance_data = await get_wallet_balance(dest.vault_id, payload.asset)
+            transfer = await transfer_between_vault_accounts(
+                wallet.vault_id,
+                dest.vault_id,
+                payload.asset,
+                str(payload.amount),
+                external_tx_id=_provider_key(current_user, idempotency_key),
+            )
+        except Exception:
+            # The cached destination may be stale; resolve it again next time
+            donation_destinations.invalidate(payload.asset)
+            raise
 
         group_id = uuid4()
-        amount_dec = Decimal(payload.amount)
-        sender_balance = Decimal(sender_balance_data["balance"]) - amount_dec
-        dest_balance = Decimal(dest_balance_data["balance"]) + amount_dec
+        sender_balance = Amount.parse(sender_balance_data["balance"]) - payload.amount
+        dest_balance = Amount.parse(dest_balance_data["balance"]) + payload.amount
 
         tx_out = Transaction(
             user_id=current_user.id,
@@ -479,64 +499,216 @@ async def external_transfer(
             provider="fireblocks",
             type=TxType.internal_out,
             status=TxStatus.pending,
-            amount=payload.amount,
+            amount=payload.amount.decimal,
             currency=payload.asset,
             fee_amount=Decimal("0"),
             fee_currency=payload.asset,
-            balance_after=sender_balance,
+            balance_after=sender_balance.decimal,
             address_from=wallet.address,
-            address_to=dest_wallet.address,
-            counterparty_user=dest_wallet.user_id,
+            address_to=dest.address,
+            counterparty_user=dest.user_id,
             provider_ref_id=transfer.get("id"),
             group_id=group_id,
+            idempotency_key=idempotency_key,
+            meta=_request_meta(fingerprint),
         )
         tx_in = Transaction(
-            user_id=dest_wallet.user_id,
-            wallet_id=dest_wallet.id,
+            user_id=dest.user_id,
+            wallet_id=dest.wallet_id,
             provider="fireblocks",
             type=TxType.internal_in,
             status=TxStatus.pending,
-            amount=payload.amount,
+            amount=payload.amount.decimal,
             currency=payload.asset,
             fee_amount=Decimal("0"),
             fee_currency=payload.asset,
-            balance_after=dest_balance,
+            balance_after=dest_balance.decimal,
             address_from=wallet.address,
-            address_to=dest_wallet.address,
+            address_to=dest.address,
             counterparty_user=current_user.id,
             provider_ref_id=transfer.get("id"),
             group_id=group_id,
         )
+
         db.add_all([tx_out, tx_in])
         await db.commit()
         await db.refresh(tx_out)
-    else:
-        balance_data = await get_wallet_balance(wallet.vault_id, payload.asset)
-        transfer = await create_transfer(
-            wallet.vault_id, payload.asset, payload.amount, payload.address
+
+    return WithdrawalResponse(
+        transfer_id=transfer.get("id", ""),
+        status=transfer.get("status") or transfer.get("state", "pending"),
+    )
+
+
+@router.post("/{wallet_id}/external_transfer", response_model=WithdrawalResponse)
+async def external_transfer(
+    wallet_id: UUID,
+    payload: WithdrawalRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
+):
+    """Transfer funds from a wallet to an external address or another user.
+
+    Retries carrying the same ``Idempotency-Key`` get the first response back.
+    """
+    return await _idempotent(
+        db,
+        current_user,
+        idempotency_key,
+        ("external_transfer", wallet_id, payload.asset, payload.amount, payload.address),
+        lambda fingerprint: _external_transfer(
+            wallet_id, payload, current_user, db, idempotency_key, fingerprint
+        ),
+    )
+
+
+async def _external_transfer(
+    wallet_id: UUID,
+    payload: WithdrawalRequest,
+    current_user: User,
+    db: AsyncSession,
+    idempotency_key: str | None,
+    fingerprint: str | None,
+):
+    result = await db.execute(
+        select(Wallet).where(
+            Wallet.id == wallet_id,
+            Wallet.user_id == current_user.id,
         )
-        fee = Decimal(str(transfer.get("fee", "0")))
-        amount_dec = Decimal(payload.amount)
-        balance_after = Decimal(balance_data["balance"]) - amount_dec - fee
+    )
+    wallet = result.scalar_one_or_none()
+    if wallet is None:
+        raise HTTPException(status_code=404, detail="Wallet not found")
 
-        tx = Transaction(
-            user_id=current_user.id,
-            wallet_id=wallet.id,
-            provider="fireblocks",
-            type=TxType.crypto_out,
-            status=TxStatus.pending,
-            amount=payload.amount,
-            currency=payload.asset,
-            fee_amount=fee,
-            fee_currency=payload.asset,
-            balance_after=balance_after,
-            address_from=wallet.address,
-            address_to=payload.address,
-            provider_ref_id=transfer.get("id"),
+    if payload.asset != wallet.currency:
+        raise HTTPException(status_code=400, detail="Asset mismatch with wallet")
+    # Check if the destination address corresponds to an internal wallet
+    result = await db.execute(
+        select(Wallet).where(
+            Wallet.address == payload.address,
+            Wallet.currency == payload.asset,
+            Wallet.network == "FIREBLOCKS",
         )
-        db.add(tx)
-        await db.commit()
-        await db.refresh(tx)
+    )
+    dest_wallet = result.scalar_one_or_none()
+
+    async with _reserve_withdrawal(db, current_user.id, payload.asset, payload.amount):
+        if dest_wallet:
+            sender_balance_data = await get_wallet_balance(wallet.vault_id, payload.asset)
+            dest_balance_data = await get_wallet_balance(dest_wallet.vault_id, payload.asset)
+
+            transfer = await transfer_between_vault_accounts(
+                wallet.vault_id,
+                dest_wallet.vault_id,
+                payload.asset,
+                str(payload.amount),
+                external_tx_id=_provider_key(current_user, idempotency_key),
+            )
+
+            group_id = uuid4()
+            sender_balance = Amount.parse(sender_balance_data["balance"]) - payload.amount
+            dest_balance = Amount.parse(dest_balance_data["balance"]) + payload.amount
+
+            tx_out = Transaction(
+                user_id=current_user.id,
+                wallet_id=wallet.id,
+                provider="fireblocks",
+                type=TxType.internal_out,
+                status=TxStatus.pending,
+                amount=payload.amount.decimal,
+                currency=payload.asset,
+                fee_amount=Decimal("0"),
+                fee_currency=payload.asset,
+                balance_after=sender_balance.decimal,
+                address_from=wallet.address,
+                address_to=dest_wallet.address,
+                counterparty_user=dest_wallet.user_id,
+                provider_ref_id=transfer.get("id"),
+                group_id=group_id,
+                idempotency_key=idempotency_key,
+                meta=_request_meta(fingerprint),
+            )
+            tx_in = Transaction(
+                user_id=dest_wallet.user_id,
+                wallet_id=dest_wallet.id,
+                provider="fireblocks",
+                type=TxType.internal_in,
+                status=TxStatus.pending,
+                amount=payload.amount.decimal,
+                currency=payload.asset,
+                fee_amount=Decimal("0"),
+                fee_currency=payload.asset,
+                balance_after=dest_balance.decimal,
+                address_from=wallet.address,
+                address_to=dest_wallet.address,
+                counterparty_user=current_user.id,
+                provider_ref_id=transfer.get("id"),
+                group_id=group_id,
+            )
+            db.add_all([tx_out, tx_in])
+            await db.commit()
+            await db.refresh(tx_out)
+        elif supports_batching(payload.asset):
+            # Serialise withdrawals per wallet so queued amounts are not double spent
+            await advisory_xact_lock(db, f"withdraw:{wallet.id}")
+            balance_data = await get_wallet_balance(wallet.vault_id, payload.asset)
+            available = Amount.parse(balance_data["balance"]) - await queued_amount(db, wallet.id)
+            if payload.amount > available:
+                raise HTTPException(status_code=400, detail="Insufficient balance")
+
+            tx = Transaction(
+                user_id=current_user.id,
+                wallet_id=wallet.id,
+                provider="fireblocks",
+                type=TxType.crypto_out,
+                status=TxStatus.pending,
+                amount=payload.amount.decimal,
+                currency=payload.asset,
+                fee_amount=Decimal("0"),
+                fee_currency=payload.asset,
+                balance_after=(available - payload.amount).decimal,
+                address_from=wallet.address,
+                address_to=payload.address,
+                meta=_request_meta(fingerprint, batch=QUEUED),
+                idempotency_key=idempotency_key,
+            )
+            db.add(tx)
+            await db.commit()
+            await db.refresh(tx)
+            return WithdrawalResponse(transfer_id="", status=QUEUED, transaction_id=tx.id)
+        else:
+            balance_data = await get_wallet_balance(wallet.vault_id, payload.asset)
+            transfer = await create_transfer(
+                wallet.vault_id,
+                payload.asset,
+                str(payload.amount),
+                payload.address,
+                external_tx_id=_provider_key(current_user, idempotency_key),
+            )
+            fee = Amount.parse(transfer.get("fee") or "0")
+            balance_after = Amount.parse(balance_data["balance"]) - payload.amount - fee
+
+            tx = Transaction(
+                user_id=current_user.id,
+                wallet_id=wallet.id,
+                provider="fireblocks",
+                type=TxType.crypto_out,
+                status=TxStatus.pending,
+                amount=payload.amount.decimal,
+                currency=payload.asset,
+                fee_amount=fee.decimal,
+                fee_currency=payload.asset,
+                balance_after=balance_after.decimal,
+                address_from=wallet.address,
+                address_to=payload.address,
+                provider_ref_id=transfer.get("id"),
+                idempotency_key=idempotency_key,
+                meta=_request_meta(fingerprint),
+            )
+            db.add(tx)
+            await db.commit()
+            await db.refresh(tx)
 
     return WithdrawalResponse(
         transfer_id=transfer.get("id", ""),
@@ -0,0 +1,34 @@
+import json
+
+from fastapi import APIRouter, HTTPException, Request
+
+from app.services.webhook_ingest import (
+    webhook_ingestor,
+    verify_signature,
+    WebhookQueueFullError,
+)
+
+router = APIRouter(prefix="/webhooks", tags=["Webhooks"])
+
+
+@router.post("/fireblocks", status_code=202)
+async def fireblocks_webhook(request: Request):
+    """Acknowledge a Fireblocks event once it is verified and queued.
+
+    Persisting and processing happen off the request path; a full queue
+    answers 503 so Fireblocks retries the delivery later.
+    """
+    body = await request.body()
+    if not verify_signature(body, request.headers.get("fireblocks-signature")):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    try:
+        webhook_ingestor.submit(body, payload)
+    except WebhookQueueFullError:
+        raise HTTPException(status_code=503, detail="Webhook queue full, retry later")
+    return {"status": "accepted"}
@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+
+
+class AddressValidationRequest(BaseModel):
+    asset: str
+    addresses: list[str]
+
+
+class AddressValidationResponse(BaseModel):
+    asset: str
+    total: int
+    # Positions in the request of the addresses that failed validation
+    invalid: list[int]
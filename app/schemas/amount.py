@@ -0,0 +1,24 @@
+from pydantic import BaseModel, model_validator
+
+from app.core.amounts import Amount
+from app.core.assets import ASSETS
+
+
+class AssetAmount(BaseModel):
+    """Request fields ``amount`` and ``asset``, with ``amount`` parsed exactly.
+
+    The amount is rescaled to the asset's decimals, so more precision than
+    the asset supports is rejected here rather than by the provider.
+    """
+
+    amount: Amount
+    asset: str
+
+    @model_validator(mode="after")
+    def _amount_in_asset_decimals(self):
+        meta = ASSETS.get(self.asset)
+        if meta is not None:
+            self.amount = self.amount.rescale(meta.decimals)
+        if self.amount <= 0:
+            raise ValueError("amount must be positive")
+        return self
@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+
+
+class AssetInfo(BaseModel):
+    asset: str
+    symbol: str
+    network: str
+    decimals: int
+    native: bool
+
+
+class AssetReloadResponse(BaseModel):
+    assets: int
@@ -1,9 +1,10 @@
 ﻿from pydantic import BaseModel, Field, validator
+from app.core.amounts import Amount
 from app.core.assets import get_asset, validate_destination
 
 class FeeEstimateRequest(BaseModel):
     asset: str = Field(..., description="e.g., BTC_TEST, ETH, USDT_ERC20")
-    amount: float = Field(..., gt=0, description="Human-readable amount, e.g., 0.01")
+    amount: Amount = Field(..., description="Human-readable amount, e.g., \"0.01\"")
     destination_address: str = Field(...)
 
     @validator("asset")
@@ -11,6 +12,12 @@ class FeeEstimateRequest(BaseModel):
         get_asset(v)
         return v
 
+    @validator("amount")
+    def _amount_positive(cls, v):
+        if v <= 0:
+            raise ValueError("amount must be positive")
+        return v
+
     @validator("destination_address")
     def _addr_ok(cls, v, values):
         asset = values.get("asset")
@@ -20,7 +27,7 @@ class FeeEstimateRequest(BaseModel):
 
 class FeeQuote(BaseModel):
     units: str
-    low: float
-    medium: float
-    high: float
+    low: Amount
+    medium: Amount
+    high: Amount
     eta_seconds: int
@@ -0,0 +1,37 @@
+from datetime import datetime
+from uuid import UUID
+from pydantic import BaseModel
+
+from app.core.amounts import Amount
+
+
+class PayoutItem(BaseModel):
+    # Exactly one of an external address or a privacy ID / username
+    address: str | None = None
+    destination_user_id: str | None = None
+    amount: Amount
+
+
+class PayoutRequest(BaseModel):
+    wallet_id: UUID
+    asset: str
+    items: list[PayoutItem]
+
+
+class PayoutItemStatus(BaseModel):
+    index: int
+    transaction_id: UUID
+    address_to: str | None = None
+    amount: str
+    status: str  # 'queued' until submitted, then the transaction status
+    transfer_id: str | None = None
+    error: str | None = None
+    updated_at: datetime
+
+
+class PayoutBatch(BaseModel):
+    batch_id: UUID
+    counts: dict[str, int]
+    items: list[PayoutItemStatus]
+    # Pass back as ``since`` to receive items changed afterwards (and recent repeats)
+    cursor: datetime | None = None
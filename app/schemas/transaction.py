@@ -0,0 +1,17 @@
+from datetime import datetime
+from uuid import UUID
+from pydantic import BaseModel
+
+
+class TransferStatus(BaseModel):
+    transfer_id: str
+    transaction_id: UUID
+    status: str
+    tx_hash: str | None = None
+    updated_at: datetime
+    changed: bool = False  # whether the status changed while waiting
+
+
+class TransactionPage(BaseModel):
+    items: list[dict]
+    next_cursor: str | None = None
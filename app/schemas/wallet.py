@@ -2,6 +2,8 @@ from datetime import datetime
 from uuid import UUID
 from pydantic import BaseModel
 
+from app.schemas.amount import AssetAmount
+
 class WalletOut(BaseModel):
     id: UUID
     vault_id: str
@@ -13,6 +15,20 @@ class WalletOut(BaseModel):
     class Config:
         from_attributes = True
 
+class BulkWalletRequest(BaseModel):
+    assets: list[str]
+
+
+class BulkWalletResult(BaseModel):
+    asset: str
+    status: str  # 'created' | 'existing' | 'failed'
+    wallet: WalletOut | None = None
+    error: str | None = None
+
+
+class BulkWalletResponse(BaseModel):
+    results: list[BulkWalletResult]
+
 class WalletBalance(BaseModel):
     wallet_id: UUID
     balance: str
@@ -20,31 +36,26 @@ class WalletBalance(BaseModel):
     pending_balance: str | None = None
     available_balance: str | None = None
 
-class WithdrawalRequest(BaseModel):
+class WithdrawalRequest(AssetAmount):
     address: str
-    amount: str
-    asset: str
 
 
-class InternalTransferRequest(BaseModel):
+class InternalTransferRequest(AssetAmount):
     destination_user_id: str
-    amount: str
-    asset: str
 
 
-class DonationRequest(BaseModel):
-    amount: str
-    asset: str
+class DonationRequest(AssetAmount):
+    pass
 
 class WithdrawalResponse(BaseModel):
     transfer_id: str
     status: str
+    # Set for queued (batched) withdrawals, which have no transfer id yet
+    transaction_id: UUID | None = None
 
 
-class FeeEstimateRequest(BaseModel):
+class FeeEstimateRequest(AssetAmount):
     wallet_id: UUID
-    asset: str
-    amount: str
     destination_address: str
 
 
@@ -0,0 +1,372 @@
+"""Cold archive of old ``transactions`` and ``webhook_events`` rows.
+
+Rows older than the retention window are written to compressed NDJSON files
+under ``ARCHIVE_DIR`` and then deleted from the live table in batches.  Each
+file is a sequence of independently compressed blocks (zstd frames when the
+``zstandard`` package is installed, gzip members otherwise).  Next to it are
+an id index (every record id with its block number, sorted, fixed-width), an
+owner index in the same format (each user id with the blocks holding their
+records) and a JSON manifest listing every block's byte range and time
+range.  Lookups read the manifests, binary-search the ``mmap``-ed indexes and
+decompress only the blocks that can contain the requested records, so memory
+use does not grow with the number of archived rows, and listing one user's
+records does not decompress everyone else's.
+"""
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete
+from sqlalchemy.future import select
+
+from app.config import settings
+from app.core import metrics
+from app.models.transaction import Transaction
+from app.models.webhook_event import WebhookEvent
+from app.services.history import jsonable
+
+try:
+    import zstandard
+except ModuleNotFoundError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_SUFFIX = ".manifest.json"
+ID_INDEX_SUFFIX = ".ids"
+OWNER_INDEX_SUFFIX = ".owners"
+
+# One index entry: a UUID's bytes and the number of a block it appears in
+_ID_ENTRY = struct.Struct(">16sI")
+
+
+@dataclass(frozen=True)
+class ArchiveSource:
+    """A table that can be archived and the column its retention applies to."""
+
+    name: str
+    model: type
+    time_column: str
+    retention_days_setting: str
+    # Column of the user a record belongs to, indexed for per-user scans
+    owner_column: str | None = None
+
+
+SOURCES = {
+    "transactions": ArchiveSource(
+        "transactions", Transaction, "created_at", "TX_ARCHIVE_RETENTION_DAYS", "user_id"
+    ),
+    "webhook_events": ArchiveSource(
+        "webhook_events", WebhookEvent, "received_at", "WEBHOOK_ARCHIVE_RETENTION_DAYS"
+    ),
+}
+
+
+def _compressor():
+    """Return the codec name and compress function used for new files."""
+    if zstandard is not None:
+        return "zst", zstandard.ZstdCompressor(level=10).compress
+    return "gz", gzip.compress
+
+
+def _decompressor(codec: str):
+    if codec == "zst":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read .zst archives")
+        # Frames are written with their content size, so no max size is needed
+        return zstandard.ZstdDecompressor().decompress
+    return gzip.decompress
+
+
+def _row_dict(source: ArchiveSource, row) -> dict:
+    return {c.name: jsonable(getattr(row, c.key)) for c in source.model.__table__.columns}
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """``value`` as a naive UTC datetime, the form the archive stores."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _parse_time(value: str) -> datetime:
+    return _naive_utc(datetime.fromisoformat(value))
+
+
+def _write_synced(path: str, data: bytes) -> None:
+    with open(path + ".tmp", "wb") as fh:
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(path + ".tmp", path)
+
+
+def _write_index(path: str, block_keys: list[list[str | None]]) -> None:
+    """Write the sorted ``(key, block number)`` pairs of ``block_keys``."""
+    entries = sorted(
+        {
+            (uuid.UUID(key).bytes, number)
+            for number, keys in enumerate(block_keys)
+            for key in keys
+            if key is not None
+        }
+    )
+    _write_synced(path, b"".join(_ID_ENTRY.pack(*entry) for entry in entries))
+
+
+def _lookup_blocks(path: str, key: uuid.UUID) -> list[int]:
+    """Numbers of the blocks listed for ``key`` in the index at ``path``."""
+    key_bytes = key.bytes
+    numbers = []
+    with open(path, "rb") as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return numbers
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            count = len(mm) // _ID_ENTRY.size
+            lo, hi = 0, count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if _ID_ENTRY.unpack_from(mm, mid * _ID_ENTRY.size)[0] < key_bytes:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            while lo < count:
+                entry_key, number = _ID_ENTRY.unpack_from(mm, lo * _ID_ENTRY.size)
+                if entry_key != key_bytes:
+                    break
+                numbers.append(number)
+                lo += 1
+    return numbers
+
+
+def write_archive(directory: str, source: ArchiveSource, records: list[dict]) -> str:
+    """Write ``records`` (already JSON-ready, ordered by time), their id index and manifest.
+
+    The data file and indexes are fsynced and renamed into place before the
+    manifest, and the manifest before the caller deletes anything, so a crash
+    never leaves rows that exist in neither place.  Returns the data file path.
+    """
+    codec, compress = _compressor()
+    os.makedirs(directory, exist_ok=True)
+    first, last = records[0], records[-1]
+    stem = f"{source.name}-{first[source.time_column][:19]}-{first['id']}".replace(":", "")
+    path = os.path.join(directory, f"{stem}.ndjson.{codec}")
+
+    blocks = []
+    block_ids = []
+    block_owners = []
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fh:
+        size = max(settings.ARCHIVE_BLOCK_RECORDS, 1)
+        for start in range(0, len(records), size):
+            block = records[start : start + size]
+            data = compress("".join(json.dumps(r) + "\n" for r in block).encode())
+            blocks.append(
+                {
+                    "offset": fh.tell(),
+                    "length": len(data),
+                    "count": len(block),
+                    "min_time": block[0][source.time_column],
+                    "max_time": block[-1][source.time_column],
+                }
+            )
+            block_ids.append([r["id"] for r in block])
+            if source.owner_column is not None:
+                block_owners.append([r[source.owner_column] for r in block])
+            fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+    _write_index(path + ID_INDEX_SUFFIX, block_ids)
+    if source.owner_column is not None:
+        _write_index(path + OWNER_INDEX_SUFFIX, block_owners)
+
+    manifest = {
+        "table": source.name,
+        "file": os.path.basename(path),
+        "codec": codec,
+        "time_column": source.time_column,
+        "owner_column": source.owner_column,
+        "count": len(records),
+        "min_time": first[source.time_column],
+        "max_time": last[source.time_column],
+        "created_at": datetime.utcnow().isoformat(),
+        "blocks": blocks,
+    }
+    _write_synced(path + MANIFEST_SUFFIX, json.dumps(manifest).encode())
+    return path
+
+
+async def archive_batch(db, source: ArchiveSource, cutoff: datetime, limit: int) -> int:
+    """Archive and delete up to ``limit`` rows older than ``cutoff``."""
+    model = source.model
+    time_column = getattr(model, source.time_column)
+    stmt = select(model.__table__).where(time_column < cutoff)
+    if model is WebhookEvent:
+        stmt = stmt.where(WebhookEvent.processed_at.is_not(None))
+    result = await db.execute(stmt.order_by(time_column, model.id).limit(limit))
+    rows = result.all()
+    if not rows:
+        return 0
+
+    records = [_row_dict(source, row) for row in rows]
+    path = await asyncio.to_thread(write_archive, settings.ARCHIVE_DIR, source, records)
+    await db.execute(
+        delete(model)
+        .where(model.id.in_([row.id for row in rows]), time_column < cutoff)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    archive_index.invalidate()
+    metrics.inc(f"{source.name}_archived_total", len(rows))
+    logger.info("Archived %d %s rows to %s", len(rows), source.name, path)
+    return len(rows)
+
+
+async def archive_old_rows(session_factory) -> dict[str, int]:
+    """Archive every source whose retention is enabled, batch by batch."""
+    archived = {}
+    for source in SOURCES.values():
+        days = getattr(settings, source.retention_days_setting)
+        if days <= 0:
+            continue
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        total = 0
+        async with session_factory() as db:
+            while True:
+                count = await archive_batch(db, source, cutoff, settings.ARCHIVE_BATCH_SIZE)
+                total += count
+                if count < settings.ARCHIVE_BATCH_SIZE:
+                    break
+        archived[source.name] = total
+    return archived
+
+
+class ArchiveIndex:
+    """Cached view of the manifests under ``ARCHIVE_DIR``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._manifests: list[dict] | None = None
+        self._key: tuple | None = None
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._manifests = None
+
+    def manifests(self, table: str) -> list[dict]:
+        directory = settings.ARCHIVE_DIR
+        try:
+            # Files added by other workers change the directory mtime
+            key = (directory, os.stat(directory).st_mtime_ns)
+        except FileNotFoundError:
+            return []
+        with self._lock:
+            if self._manifests is None or self._key != key:
+                self._manifests = self._load(directory)
+                self._key = key
+            return [m for m in self._manifests if m["table"] == table]
+
+    @staticmethod
+    def _load(directory: str) -> list[dict]:
+        manifests = []
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(MANIFEST_SUFFIX):
+                continue
+            with open(os.path.join(directory, name), encoding="utf-8") as fh:
+                manifest = json.load(fh)
+            manifest["path"] = os.path.join(directory, manifest["file"])
+            manifest["id_index"] = manifest["path"] + ID_INDEX_SUFFIX
+            manifest["owner_index"] = (
+                manifest["path"] + OWNER_INDEX_SUFFIX if manifest.get("owner_column") else None
+            )
+            manifest["min_time"] = _parse_time(manifest["min_time"])
+            manifest["max_time"] = _parse_time(manifest["max_time"])
+            for block in manifest["blocks"]:
+                block["min_time"] = _parse_time(block["min_time"])
+                block["max_time"] = _parse_time(block["max_time"])
+            manifests.append(manifest)
+        return manifests
+
+
+archive_index = ArchiveIndex()
+
+
+def _read_blocks(manifest: dict, blocks: list[dict]):
+    decompress = _decompressor(manifest["codec"])
+    with open(manifest["path"], "rb") as fh, mmap.mmap(
+        fh.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mm:
+        for block in blocks:
+            data = decompress(mm[block["offset"] : block["offset"] + block["length"]])
+            for line in data.splitlines():
+                yield json.loads(line)
+
+
+def find_archived(table: str, record_id) -> dict | None:
+    """Return the archived record with ``record_id``, or ``None``."""
+    record_id = uuid.UUID(str(record_id))
+    for manifest in archive_index.manifests(table):
+        numbers = _lookup_blocks(manifest["id_index"], record_id)
+        if not numbers:
+            continue
+        for record in _read_blocks(manifest, [manifest["blocks"][numbers[0]]]):
+            if record["id"] == str(record_id):
+                return record
+    return None
+
+
+def scan_archived(
+    table: str,
+    start: datetime,
+    end: datetime,
+    predicate=None,
+    limit: int | None = None,
+    owner=None,
+) -> list[dict]:
+    """Return archived records with ``start <= time < end``, oldest first.
+
+    With ``owner``, only that user's records are returned and only the blocks
+    the owner index lists for them are read.  Aware bounds are converted to
+    UTC; naive ones are taken to be UTC already.
+    """
+    start, end = _naive_utc(start), _naive_utc(end)
+    owner_key = uuid.UUID(str(owner)) if owner is not None else None
+    found = []
+    for manifest in sorted(archive_index.manifests(table), key=lambda m: m["min_time"]):
+        if manifest["max_time"] < start or manifest["min_time"] >= end:
+            continue
+        numbers = range(len(manifest["blocks"]))
+        if owner_key is not None:
+            if manifest["owner_index"] is None:
+                raise ValueError(f"{table} archives have no owner index")
+            numbers = _lookup_blocks(manifest["owner_index"], owner_key)
+        blocks = [
+            manifest["blocks"][number]
+            for number in numbers
+            if manifest["blocks"][number]["max_time"] >= start
+            and manifest["blocks"][number]["min_time"] < end
+        ]
+        time_column = manifest["time_column"]
+        owner_column = manifest.get("owner_column")
+        for record in _read_blocks(manifest, blocks):
+            if not start <= _parse_time(record[time_column]) < end:
+                continue
+            if owner_key is not None and record[owner_column] != str(owner_key):
+                continue
+            if predicate is not None and not predicate(record):
+                continue
+            found.append(record)
+            if limit is not None and len(found) >= limit:
+                return found
+    return found
@@ -0,0 +1,171 @@
+"""Turn inbound Fireblocks transfers into ``crypto_in`` transactions.
+
+Deposits arrive as ``TRANSACTION_*`` webhooks whose destination is one of our
+vault accounts and whose source is outside the workspace.  They are matched to
+a ``Wallet`` by ``(vault_id, asset)`` and written in one multi-row insert.  A
+deposit is recorded once per Fireblocks id: later events for the same id only
+update the row through :mod:`app.services.webhook_processor`.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import insert, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core import metrics
+from app.database import advisory_xact_lock
+from app.models.transaction import Transaction, TxStatus, TxType
+from app.models.wallet import Wallet
+from app.services.notifications import CHANGE_COLUMNS
+from app.services.partitions import lookup_bound, provider_created_at
+
+PROVIDER = "fireblocks"
+
+# Transfers between vault accounts are recorded by the route that made them
+INTERNAL_SOURCES = {"VAULT_ACCOUNT"}
+
+
+@dataclass
+class Deposit:
+    """An inbound transfer into one of our vault accounts."""
+
+    provider_ref_id: str
+    vault_id: str
+    asset: str
+    amount: Decimal
+    status: TxStatus | None
+    tx_hash: str | None = None
+    address_from: str | None = None
+    address_to: str | None = None
+    created_at: datetime | None = None  # Fireblocks creation time
+
+
+def parse_deposit_event(data: dict, status: TxStatus | None = None) -> Deposit | None:
+    """Return the deposit described by a transaction event, if it is one.
+
+    ``status`` is the event's Fireblocks status already mapped to ours.
+    """
+    source = data.get("source") or {}
+    destination = data.get("destination") or {}
+    if destination.get("type") != "VAULT_ACCOUNT" or source.get("type") in INTERNAL_SOURCES:
+        return None
+    ref, vault_id, asset = data.get("id"), destination.get("id"), data.get("assetId")
+    if not ref or vault_id is None or not asset:
+        raise ValueError("deposit event without id, destination or asset")
+    amount = (data.get("amountInfo") or {}).get("amount", data.get("amount"))
+    try:
+        amount = Decimal(str(amount))
+    except InvalidOperation:
+        raise ValueError(f"invalid deposit amount {amount!r}") from None
+    return Deposit(
+        provider_ref_id=str(ref),
+        vault_id=str(vault_id),
+        asset=asset,
+        amount=amount,
+        status=status,
+        tx_hash=data.get("txHash") or None,
+        address_from=data.get("sourceAddress") or None,
+        address_to=data.get("destinationAddress") or None,
+        created_at=provider_created_at(data),
+    )
+
+
+def merge_deposit(old: Deposit | None, new: Deposit) -> Deposit:
+    """Combine two events of the same deposit, keeping a final status."""
+    if old is None:
+        return new
+    return replace(
+        new,
+        status=new.status or old.status,
+        tx_hash=new.tx_hash or old.tx_hash,
+        address_from=new.address_from or old.address_from,
+        address_to=new.address_to or old.address_to,
+        created_at=new.created_at or old.created_at,
+    )
+
+
+async def latest_balances(db: AsyncSession, wallet_ids) -> dict:
+    """``balance_after`` of each wallet's most recent transaction."""
+    result = await db.execute(
+        select(Transaction.wallet_id, Transaction.balance_after)
+        .where(Transaction.wallet_id.in_(wallet_ids))
+        .order_by(Transaction.wallet_id, Transaction.created_at.desc())
+        .distinct(Transaction.wallet_id)
+    )
+    return {row.wallet_id: row.balance_after for row in result.all()}
+
+
+async def record_deposits(db: AsyncSession, deposits: list[Deposit]) -> list:
+    """Insert ``crypto_in`` rows for deposits not seen before; the caller commits.
+
+    ``balance_after`` continues from the wallet's latest transaction.  Returns
+    the inserted rows.
+    """
+    if not deposits:
+        return []
+    deposits = sorted(deposits, key=lambda d: d.provider_ref_id)
+    # Two processors may hold different events of the same deposit
+    for deposit in deposits:
+        await advisory_xact_lock(db, f"deposit:{deposit.provider_ref_id}")
+
+    refs = [d.provider_ref_id for d in deposits]
+    stmt = select(Transaction.provider_ref_id).where(
+        Transaction.provider == PROVIDER,
+        Transaction.type == TxType.crypto_in,
+        Transaction.provider_ref_id.in_(refs),
+    )
+    since = lookup_bound(d.created_at for d in deposits)
+    if since is not None:
+        stmt = stmt.where(Transaction.created_at >= since)
+    result = await db.execute(stmt)
+    seen = set(result.scalars().all())
+    new = [d for d in deposits if d.provider_ref_id not in seen]
+    if not new:
+        return []
+
+    result = await db.execute(
+        select(Wallet).where(
+            Wallet.network == "FIREBLOCKS",
+            tuple_(Wallet.vault_id, Wallet.currency).in_(
+                sorted({(d.vault_id, d.asset) for d in new})
+            ),
+        )
+    )
+    wallets = {(w.vault_id, w.currency): w for w in result.scalars().all()}
+    balances = await latest_balances(db, [w.id for w in wallets.values()])
+
+    rows = []
+    for deposit in new:
+        wallet = wallets.get((deposit.vault_id, deposit.asset))
+        if wallet is None:
+            metrics.inc("deposits_unmatched_total")
+            continue
+        balance = balances.get(wallet.id)
+        if balance is not None:
+            balance += deposit.amount
+            balances[wallet.id] = balance
+        rows.append(
+            {
+                "user_id": wallet.user_id,
+                "wallet_id": wallet.id,
+                "provider": PROVIDER,
+                "type": TxType.crypto_in,
+                "status": deposit.status or TxStatus.pending,
+                "amount": deposit.amount,
+                "currency": deposit.asset,
+                "balance_after": balance,
+                "provider_ref_id": deposit.provider_ref_id,
+                "tx_hash": deposit.tx_hash,
+                "address_from": deposit.address_from,
+                "address_to": deposit.address_to or wallet.address,
+            }
+        )
+    if not rows:
+        return []
+    result = await db.execute(insert(Transaction).returning(*CHANGE_COLUMNS), rows)
+    metrics.inc("deposits_recorded_total", len(rows))
+    return result.all()
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import settings
+from app.core.assets import ASSETS
+from app.models.user import User
+from app.services.provisioning import ensure_wallet
+
+logger = logging.getLogger(__name__)
+
+
+class DonationNotConfiguredError(Exception):
+    """Raised when ``DONATION_PRIVACY_ID`` is not set."""
+
+
+class DonationUserNotFoundError(Exception):
+    """Raised when no user matches ``DONATION_PRIVACY_ID``."""
+
+
+@dataclass(frozen=True)
+class DonationDestination:
+    """Everything the donate route needs to credit the donation account."""
+
+    user_id: UUID
+    vault_id: str
+    wallet_id: UUID
+    address: str
+
+
+class DonationDestinations:
+    """In-memory map of asset -> donation wallet.
+
+    Destinations are resolved (and provisioned on Fireblocks when missing) the
+    first time an asset is requested or during :meth:`warm_up`.  An asset's
+    entry is dropped with :meth:`invalidate` when a donation to it fails, and
+    the whole map on ``SIGHUP``, so a re-provisioned donation wallet is found
+    again without a restart.  ``DONATION_PRIVACY_ID`` itself is read at
+    startup.
+    """
+
+    def __init__(self):
+        self._privacy_id: str | None = None
+        self._by_asset: dict[str, DonationDestination] = {}
+        self._lock = asyncio.Lock()
+
+    def invalidate(self, asset: str | None = None) -> None:
+        """Forget the destination of ``asset``, or of every asset."""
+        if asset is None:
+            self._by_asset.clear()
+        else:
+            self._by_asset.pop(asset, None)
+
+    def _current_privacy_id(self) -> str:
+        privacy_id = settings.DONATION_PRIVACY_ID
+        if not privacy_id:
+            raise DonationNotConfiguredError("Donation destination not configured")
+        if privacy_id != self._privacy_id:
+            self._by_asset.clear()
+            self._privacy_id = privacy_id
+        return privacy_id
+
+    async def get(self, db: AsyncSession, asset: str) -> DonationDestination:
+        """Return the donation destination for ``asset``, resolving it once."""
+        privacy_id = self._current_privacy_id()
+        dest = self._by_asset.get(asset)
+        if dest is not None:
+            return dest
+
+        async with self._lock:
+            dest = self._by_asset.get(asset)
+            if dest is None:
+                dest = await self._resolve(db, privacy_id, asset)
+                self._by_asset[asset] = dest
+        return dest
+
+    async def _resolve(
+        self, db: AsyncSession, privacy_id: str, asset: str
+    ) -> DonationDestination:
+        result = await db.execute(select(User).where(User.privacy_id == privacy_id))
+        user = result.scalar_one_or_none()
+        if user is None:
+            raise DonationUserNotFoundError("Donation user not found")
+
+        wallet = await ensure_wallet(db, user, asset)
+        return DonationDestination(
+            user_id=user.id,
+            vault_id=wallet.vault_id,
+            wallet_id=wallet.id,
+            address=wallet.address,
+        )
+
+    async def warm_up(self, session_factory) -> None:
+        """Resolve the destination of every supported asset ahead of traffic."""
+        if not settings.DONATION_PRIVACY_ID:
+            return
+        async with session_factory() as db:
+            for asset in ASSETS:
+                try:
+                    await self.get(db, asset)
+                except Exception as exc:
+                    logger.warning("Could not resolve donation wallet for %s: %s", asset, exc)
+                    await db.rollback()
+
+
+donation_destinations = DonationDestinations()
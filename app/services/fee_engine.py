@@ -0,0 +1,219 @@
+"""Precomputed network fee table.
+
+A background job asks Fireblocks for the low/medium/high network fee of every
+asset in :data:`app.core.assets.ASSETS` every ``FEE_REFRESH_INTERVAL``
+seconds.  Quotes are then computed from that table in memory: the reference
+fee is scaled by the asset's size model (extra UTXO inputs for large BTC
+amounts and larger outputs for script destinations, a fixed size for
+account-based chains; see :mod:`app.core.size_models`).  Fees are in the
+asset that pays them (ETH for ERC-20 tokens, TRX for TRC-20) and rounded to
+its decimals.  ``quote`` returns ``None`` when the table is older than
+``FEE_TABLE_MAX_AGE`` or the request is unusual (an address that does not
+match the asset, an amount needing more inputs than the model covers), and
+the caller falls back to a live estimate.
+
+Every set of levels fetched is also recorded in
+:data:`app.core.fee_history.fee_history`; :meth:`FeeEngine.suggested` turns
+the p25/p50/p90 of the last ``FEE_HISTORY_WINDOW_MINUTES`` into stable
+low/medium/high levels.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+
+from app.config import settings
+from app.core import metrics
+from app.core.assets import ASSETS, AssetMeta, validate_destination
+from app.core.fee_history import fee_history
+from app.core.size_models import SizeModel
+from app.services.fireblocks import estimate_network_fee
+
+logger = logging.getLogger(__name__)
+
+LEVELS = ("low", "medium", "high")
+
+# Percentile of the recent medium fee suggested for each level
+SUGGESTION_PERCENTILES = {"low": 25, "medium": 50, "high": 90}
+
+
+def address_kind(meta: AssetMeta, address: str) -> str:
+    """Classify a destination by what its address format reveals.
+
+    BTC addresses paying to a script (P2SH, P2WSH, P2TR) are ``"script"``,
+    the contract-like case, and key hashes are ``"key"``.  Account-based
+    addresses look the same for contracts and plain accounts, so they are
+    ``"account"``.
+    """
+    if meta.network != "BTC":
+        return "account"
+    address = (address or "").strip()
+    if address[:1] in ("3", "2"):
+        return "script"
+    if address.lower().startswith(("bc1", "tb1")) and len(address) > 50:
+        return "script"
+    return "key"
+
+
+@dataclass(frozen=True)
+class FeeLevels:
+    """Reference fees for one asset as fetched at ``refreshed_at`` (monotonic)."""
+
+    fees: dict[str, Decimal]
+    fee_per_byte: dict[str, Decimal]
+    refreshed_at: float
+
+
+def _decimal(value) -> Decimal | None:
+    try:
+        return Decimal(value) if value is not None else None
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+
+
+def parse_levels(data: dict, refreshed_at: float) -> FeeLevels | None:
+    """Build :class:`FeeLevels` from :func:`estimate_network_fee` output."""
+    fees, per_byte = {}, {}
+    for level in LEVELS:
+        entry = data.get(level) or {}
+        fee = _decimal(entry.get("networkFee"))
+        rate = _decimal(entry.get("feePerByte"))
+        if fee is not None and fee > 0:
+            fees[level] = fee
+        if rate is not None and rate > 0:
+            per_byte[level] = rate
+    if all(level in fees or level in per_byte for level in LEVELS):
+        return FeeLevels(fees, per_byte, refreshed_at)
+    return None
+
+
+def fee_decimals(meta: AssetMeta) -> int:
+    """Decimals of the asset ``meta``'s network fees are paid in (ETH for ERC-20 tokens)."""
+    fee_meta = ASSETS.get(meta.fee_asset) if meta.fee_asset else None
+    return fee_meta.decimals if fee_meta is not None else meta.decimals
+
+
+def scaled_fee(
+    levels: FeeLevels, level: str, meta: AssetMeta, model: SizeModel, size: int
+) -> Decimal:
+    """Fee of ``level`` for a transfer of ``size`` under ``model``, in the fee asset."""
+    decimals = fee_decimals(meta)
+    rate = levels.fee_per_byte.get(level)
+    if rate is not None:
+        # Fireblocks quotes UTXO rates in base units (sat) per byte
+        fee = rate * size / (Decimal(10) ** decimals)
+    else:
+        fee = levels.fees[level] * size / model.base_size
+    return fee.quantize(Decimal(1).scaleb(-decimals)).normalize()
+
+
+def scaled_fees(levels: FeeLevels, meta: AssetMeta, model: SizeModel, size: int) -> dict:
+    return {
+        level: format(scaled_fee(levels, level, meta, model, size), "f") for level in LEVELS
+    }
+
+
+class FeeEngine:
+    """In-memory fee table refreshed in the background."""
+
+    def __init__(self):
+        self._table: dict[str, FeeLevels] = {}
+
+    def fresh(self, asset: str) -> FeeLevels | None:
+        """Table entry of ``asset`` if it is within ``FEE_TABLE_MAX_AGE``."""
+        levels = self._table.get(asset)
+        if levels is None or time.monotonic() - levels.refreshed_at > settings.FEE_TABLE_MAX_AGE:
+            return None
+        return levels
+
+    async def levels(self, asset: str) -> FeeLevels | None:
+        """Fresh table entry of ``asset``, fetched from the provider when missing.
+
+        Provider errors propagate to the caller.
+        """
+        levels = self.fresh(asset)
+        if levels is None:
+            levels = parse_levels(await estimate_network_fee(asset), time.monotonic())
+            if levels is not None:
+                self._store(asset, levels)
+        return levels
+
+    def suggested(self, asset: str) -> FeeLevels | None:
+        """Levels from recent fee percentiles, or ``None`` without enough history."""
+        meta = ASSETS.get(asset)
+        if meta is None:
+            return None
+        start = time.time() - settings.FEE_HISTORY_WINDOW_MINUTES * 60
+        values = fee_history.percentiles(
+            asset,
+            start,
+            list(SUGGESTION_PERCENTILES.values()),
+            min_samples=settings.FEE_HISTORY_MIN_SAMPLES,
+        )
+        if values is None:
+            return None
+        unit = Decimal(10) ** fee_decimals(meta)
+        fees = {
+            level: Decimal(round(value)) / unit
+            for level, value in zip(SUGGESTION_PERCENTILES, values)
+        }
+        return FeeLevels(fees, {}, time.monotonic())
+
+    def _store(self, asset: str, levels: FeeLevels) -> None:
+        self._table[asset] = levels
+        meta = ASSETS.get(asset)
+        model = meta.size_model if meta else None
+        if model is None:
+            return
+        unit = Decimal(10) ** fee_decimals(meta)
+        fees = tuple(
+            int(scaled_fee(levels, level, meta, model, model.base_size) * unit)
+            for level in LEVELS
+        )
+        fee_history.record(asset, time.time(), fees)
+
+    async def _refresh_asset(self, asset: str) -> bool:
+        try:
+            data = await estimate_network_fee(asset)
+        except Exception:
+            logger.warning("Fee refresh failed for %s", asset, exc_info=True)
+            return False
+        levels = parse_levels(data, time.monotonic())
+        if levels is None:
+            return False
+        self._store(asset, levels)
+        return True
+
+    async def refresh(self) -> None:
+        """Fetch the current fee levels of every asset; failures keep the old entry."""
+        results = await asyncio.gather(*(self._refresh_asset(asset) for asset in ASSETS))
+        failed = results.count(False)
+        if failed:
+            metrics.inc("fee_refresh_errors_total", failed)
+        metrics.set_gauge("fee_table_assets", len(self._table))
+
+    def quote(self, asset: str, amount, destination_address: str) -> dict | None:
+        """Return ``{"low", "medium", "high"}`` fee strings, or ``None`` to go live."""
+        quote = self._quote(asset, amount, destination_address)
+        metrics.inc("fee_table_hits_total" if quote else "fee_table_fallbacks_total")
+        return quote
+
+    def _quote(self, asset: str, amount, destination_address: str) -> dict | None:
+        meta = ASSETS.get(asset)
+        levels = self.fresh(asset)
+        model = meta.size_model if meta else None
+        if levels is None or model is None:
+            return None
+        amount = _decimal(str(amount))
+        if amount is None or amount <= 0 or model.inputs(amount) > model.max_inputs:
+            return None
+        if not validate_destination(asset, destination_address or ""):
+            return None
+        size = model.size(amount, address_kind(meta, destination_address))
+        return scaled_fees(levels, meta, model, size)
+
+
+fee_engine = FeeEngine()
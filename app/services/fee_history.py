@@ -0,0 +1,71 @@
+"""Persistence of the in-memory fee history.
+
+Observations recorded in :data:`app.core.fee_history.fee_history` are
+appended to ``fee_observations`` every ``FEE_HISTORY_FLUSH_INTERVAL``
+seconds, and the last window is loaded back at startup so percentile quotes
+are available right after a restart.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert
+from sqlalchemy.future import select
+
+from app.config import settings
+from app.core import metrics
+from app.core.fee_history import LEVELS, fee_history
+from app.models.fee_observation import FeeObservation
+
+logger = logging.getLogger(__name__)
+
+
+def _utc(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+def _timestamp(observed_at: datetime) -> float:
+    return observed_at.replace(tzinfo=timezone.utc).timestamp()
+
+
+async def flush_fee_history(session_factory) -> int:
+    """Insert the observations recorded since the last flush."""
+    pending = fee_history.pending()
+    rows = [
+        {"asset": asset, "observed_at": _utc(timestamp), **dict(zip(LEVELS, fees))}
+        for asset, (_, observations) in pending.items()
+        for timestamp, fees in observations
+    ]
+    if not rows:
+        return 0
+    async with session_factory() as db:
+        await db.execute(insert(FeeObservation), rows)
+        await db.commit()
+    for asset, (position, _) in pending.items():
+        fee_history.mark_flushed(asset, position)
+    metrics.inc("fee_observations_flushed_total", len(rows))
+    return len(rows)
+
+
+async def load_fee_history(session_factory) -> int:
+    """Seed the ring buffers with the last ``FEE_HISTORY_WINDOW_MINUTES`` of rows."""
+    since = datetime.utcnow() - timedelta(minutes=settings.FEE_HISTORY_WINDOW_MINUTES)
+    async with session_factory() as db:
+        result = await db.execute(
+            select(
+                FeeObservation.asset,
+                FeeObservation.observed_at,
+                *(getattr(FeeObservation, level) for level in LEVELS),
+            )
+            .where(FeeObservation.observed_at >= since)
+            .order_by(FeeObservation.observed_at)
+        )
+        rows = result.all()
+    by_asset: dict[str, list] = {}
+    for asset, observed_at, *fees in rows:
+        by_asset.setdefault(asset, []).append((_timestamp(observed_at), tuple(fees)))
+    for asset, observations in by_asset.items():
+        fee_history.load(asset, observations)
+    logger.info("Loaded %d fee observations", len(rows))
+    return len(rows)
@@ -1,7 +1,36 @@
-﻿from typing import Tuple
-from app.core.assets import get_asset, human_amount_from_base
+﻿"""Fee quotes for ``POST /fees/estimate``.
+
+Quotes are the provider's network fee levels (kept fresh by
+:mod:`app.services.fee_engine`) scaled for the transfer, cached in
+``fee_cache`` under ``(asset, amount bucket, destination class)``.  The
+bucket is the number of inputs the size model expects, so every amount in a
+bucket costs the same; the class separates our own wallets from external
+addresses and script from key destinations.  Destinations that are one of
+the caller's own wallets are settled as internal transfers and quoted at
+zero; every other address, including other users' wallets, is quoted as
+external so the quote never reveals whether an address belongs to us.
+External quotes use the p25/p50/p90 of recent provider fees once enough
+history is recorded, and the current provider levels until then.
+"""
+from decimal import Decimal
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core import metrics
+from app.core.amounts import Amount
+from app.core.assets import AssetMeta, get_asset
 from app.core.limits import fee_cache, fee_cache_key
+from app.core.singleflight import SingleFlight
+from app.models.wallet import Wallet
 from app.schemas.fees import FeeEstimateRequest, FeeQuote
+from app.services.fee_engine import LEVELS, address_kind, fee_engine, scaled_fees
+
+# Typical confirmation time at medium priority, per network
+ETA_SECONDS = {"BTC": 1800, "ETH": 60, "TRON": 60}
+
+# Concurrent misses on one key share a single provider call
+_flights = SingleFlight()
 
 class FireblocksError(Exception):
     def __init__(self, code: str, message: str):
@@ -9,29 +38,69 @@ class FireblocksError(Exception):
         self.code = code
         self.message = message
 
-def _call_fireblocks_estimate(req: FeeEstimateRequest) -> Tuple[int,int,int,int]:
-    # TODO: Înlocuiește cu apelul real la Fireblocks (operation=TRANSFER + destination)
-    base_low = 1000
-    base_med = 2000
-    base_high = 3000
-    eta = 60
-    return base_low, base_med, base_high, eta
-
-def estimate_fee(req: FeeEstimateRequest) -> FeeQuote:
-    meta = get_asset(req.asset)
-    ck = fee_cache_key(req.asset, req.amount, req.destination_address)
+async def is_internal_address(db: AsyncSession, asset: str, address: str, user_id) -> bool:
+    """Whether ``address`` is one of ``user_id``'s wallets, i.e. an internal transfer."""
+    result = await db.execute(
+        select(Wallet.id)
+        .where(
+            Wallet.address == address,
+            Wallet.currency == asset,
+            Wallet.network == "FIREBLOCKS",
+            Wallet.user_id == user_id,
+        )
+        .limit(1)
+    )
+    return result.scalar_one_or_none() is not None
 
-    if ck in fee_cache:
-        return fee_cache[ck]
+async def destination_class(db: AsyncSession, meta: AssetMeta, asset: str, address: str, user_id) -> str:
+    scope = "internal" if await is_internal_address(db, asset, address, user_id) else "external"
+    return f"{scope}:{address_kind(meta, address)}"
 
-    base_low, base_med, base_high, eta = _call_fireblocks_estimate(req)
+async def _provider_fees(meta: AssetMeta, asset: str, amount: Decimal, kind: str) -> dict:
+    model = meta.size_model
+    # Recent percentiles give stable quotes; the live table is the fallback
+    levels = fee_engine.suggested(asset)
+    if levels is not None:
+        return scaled_fees(levels, meta, model, model.size(amount, kind))
+    try:
+        levels = await fee_engine.levels(asset)
+    except Exception as exc:
+        code = "rate_limited" if getattr(exc, "status", None) == 429 else "upstream_error"
+        raise FireblocksError(code, str(exc)) from exc
+    if levels is None:
+        raise FireblocksError("asset_not_supported", f"No fee data for {asset}")
+    return scaled_fees(levels, meta, model, model.size(amount, kind))
 
-    quote = FeeQuote(
+async def _build_quote(meta: AssetMeta, req: FeeEstimateRequest, amount: Decimal, dest: str) -> FeeQuote:
+    scope, kind = dest.split(":")
+    if scope == "internal":
+        fees = dict.fromkeys(LEVELS, "0")
+    else:
+        fees = await _provider_fees(meta, req.asset, amount, kind)
+    return FeeQuote(
         units=meta.symbol,
-        low=human_amount_from_base(base_low, meta.decimals),
-        medium=human_amount_from_base(base_med, meta.decimals),
-        high=human_amount_from_base(base_high, meta.decimals),
-        eta_seconds=eta,
+        low=Amount.parse(fees["low"]),
+        medium=Amount.parse(fees["medium"]),
+        high=Amount.parse(fees["high"]),
+        eta_seconds=0 if scope == "internal" else ETA_SECONDS.get(meta.network, 60),
     )
-    fee_cache[ck] = quote
+
+async def estimate_fee(db: AsyncSession, req: FeeEstimateRequest, user_id) -> FeeQuote:
+    meta = get_asset(req.asset)
+    model = meta.size_model
+    if model is None:
+        raise ValueError(f"No fee model for asset {req.asset}")
+    amount = req.amount.decimal
+    dest = await destination_class(db, meta, req.asset, req.destination_address, user_id)
+    ck = fee_cache_key(req.asset, model.inputs(amount), dest)
+
+    quote = fee_cache.get(ck)
+    if quote is None:
+        async with _flights.hold(ck):
+            quote = fee_cache.get(ck)
+            if quote is None:
+                metrics.inc("fee_cache_misses_total")
+                quote = fee_cache[ck] = await _build_quote(meta, req, amount, dest)
+                return quote
+    metrics.inc("fee_cache_hits_total")
     return quote
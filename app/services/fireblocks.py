@@ -92,6 +92,56 @@ async def generate_address_for_vault(vault_account_id: str, asset: str) -> str:
     return await asyncio.to_thread(sync_call)
 
 
+async def get_vault_asset_ids(vault_account_id: str) -> set[str]:
+    """Return the ids of the assets already activated in a vault."""
+
+    def sync_call() -> set[str]:
+        with get_fireblocks_client() as client:
+            account = client.vaults.get_vault_account(vault_account_id).result()
+            assets = getattr(account.data, "assets", []) or []
+            return {getattr(a, "id", None) for a in assets} - {None}
+
+    return await asyncio.to_thread(sync_call)
+
+
+async def get_vault_accounts_page(
+    after: str | None = None, limit: int = 200
+) -> tuple[dict[str, set[str]], str | None]:
+    """Return one page of vault accounts as ``{vault_id: asset_ids}`` plus the next cursor."""
+
+    def sync_call():
+        with get_fireblocks_client() as client:
+            future = client.vaults.get_paged_vault_accounts(limit=limit, after=after)
+            data = getattr(future.result(), "data", None)
+            accounts = getattr(data, "accounts", []) or []
+            page = {
+                str(getattr(account, "id")): {
+                    getattr(a, "id", None) for a in (getattr(account, "assets", []) or [])
+                } - {None}
+                for account in accounts
+            }
+            next_after = _safe_get(data, "paging", "after")
+            return page, next_after
+
+    return await asyncio.to_thread(sync_call)
+
+
+async def activate_vault_asset(vault_account_id: str, asset: str) -> str:
+    """Activate ``asset`` in a vault without checking for it first.
+
+    Callers that already know the vault's assets (see
+    :func:`get_vault_asset_ids`) use this to skip the extra provider read done
+    by :func:`create_asset_for_vault`.
+    """
+
+    def sync_call() -> str:
+        with get_fireblocks_client() as client:
+            future = client.vaults.create_vault_account_asset(vault_account_id, asset)
+            return future.result().data.address
+
+    return await asyncio.to_thread(sync_call)
+
+
 async def create_asset_for_vault(vault_account_id: str, asset: str) -> str:
     """Create ``asset`` in an existing vault and return its deposit address.
 
@@ -238,6 +288,42 @@ async def estimate_transaction_fee(
     return await asyncio.to_thread(sync_call)
 
 
+async def estimate_network_fee(asset: str) -> dict:
+    """Return the current low/medium/high network fee levels for ``asset``.
+
+    Unlike :func:`estimate_transaction_fee` this needs no source or
+    destination; each level is a dict with ``networkFee`` (for a standard
+    transfer) and, depending on the chain, ``feePerByte`` or ``gasPrice``.
+    """
+
+    def sync_call() -> dict:
+        with get_fireblocks_client() as client:
+            future = client.transactions.estimate_network_fee(asset)
+            response = future.result()
+            data = getattr(response, "data", response)
+
+            def extract(level: str) -> dict | None:
+                obj = getattr(data, level, None)
+                if obj is None:
+                    return None
+                return {
+                    key: _as_decimal_str(value) if value is not None else None
+                    for key, value in (
+                        ("networkFee", _safe_get(obj, "network_fee")),
+                        ("feePerByte", _safe_get(obj, "fee_per_byte")),
+                        ("gasPrice", _safe_get(obj, "gas_price")),
+                    )
+                }
+
+            return {
+                "low": extract("low"),
+                "medium": extract("medium"),
+                "high": extract("high"),
+            }
+
+    return await asyncio.to_thread(sync_call)
+
+
 # -------------------
 # Transfers
 # -------------------
@@ -247,8 +333,12 @@ async def create_transfer(
     asset: str,
     _amount: str,
     destination_address: str,
+    external_tx_id: str | None = None,
 ):
-    """Create a transfer from a vault account to an external address."""
+    """Create a transfer from a vault account to an external address.
+
+    With ``external_tx_id`` Fireblocks accepts the transfer only once.
+    """
 
     def sync_call() -> dict:
         with get_fireblocks_client() as client:
@@ -262,8 +352,12 @@ async def create_transfer(
                 # SDK-ul așteaptă TransactionRequestAmount aici
                 "amount": TransactionRequestAmount(_amount),
             }
+            kwargs = {}
+            if external_tx_id is not None:
+                tx_request["externalTxId"] = external_tx_id
+                kwargs["idempotency_key"] = external_tx_id
             future = client.transactions.create_transaction(
-                transaction_request=tx_request
+                transaction_request=tx_request, **kwargs
             )
             response = future.result()
             data = getattr(response, "data", response)
@@ -283,13 +377,65 @@ async def create_transfer(
     return await asyncio.to_thread(sync_call)
 
 
+async def create_batch_transfer(
+    vault_account_id: str,
+    asset: str,
+    outputs: list[tuple[str, str]],
+    external_tx_id: str,
+) -> dict:
+    """Pay several ``(address, amount)`` outputs in one UTXO transaction.
+
+    ``external_tx_id`` makes Fireblocks reject a second submission of the
+    same batch, so retrying after an unclear failure cannot pay twice.
+    """
+
+    def sync_call() -> dict:
+        with get_fireblocks_client() as client:
+            total = sum((Decimal(amount) for _, amount in outputs), Decimal("0"))
+            tx_request = {
+                "assetId": asset,
+                "source": {"type": "VAULT_ACCOUNT", "id": vault_account_id},
+                "destinations": [
+                    {
+                        "amount": amount,
+                        "destination": {
+                            "type": "ONE_TIME_ADDRESS",
+                            "oneTimeAddress": {"address": address},
+                        },
+                    }
+                    for address, amount in outputs
+                ],
+                "amount": TransactionRequestAmount(str(total)),
+                "externalTxId": external_tx_id,
+            }
+            future = client.transactions.create_transaction(
+                transaction_request=tx_request,
+                idempotency_key=external_tx_id,
+            )
+            response = future.result()
+            data = getattr(response, "data", response)
+            fee_info = _safe_get(data, "fee_info") or _safe_get(data, "feeInfo")
+            raw_fee = getattr(fee_info, "fee", None) if fee_info else getattr(data, "fee", None)
+            return {
+                "id": getattr(data, "id", None),
+                "status": getattr(data, "status", None),
+                "fee": _as_decimal_str(raw_fee, "0"),
+            }
+
+    return await asyncio.to_thread(sync_call)
+
+
 async def transfer_between_vault_accounts(
     source_vault_id: str,
     destination_vault_id: str,
     asset: str,
     _amount: str,
+    external_tx_id: str | None = None,
 ):
-    """Transfer assets between two Fireblocks vault accounts."""
+    """Transfer assets between two Fireblocks vault accounts.
+
+    With ``external_tx_id`` Fireblocks accepts the transfer only once.
+    """
 
     def sync_call() -> dict:
         with get_fireblocks_client() as client:
@@ -300,7 +446,9 @@ async def transfer_between_vault_accounts(
                 # SDK-ul așteaptă TransactionRequestAmount aici
                 "amount": TransactionRequestAmount(_amount),
             }
-            idempotency_key = uuid.uuid4().hex
+            if external_tx_id is not None:
+                tx_request["externalTxId"] = external_tx_id
+            idempotency_key = external_tx_id or uuid.uuid4().hex
             future = client.transactions.create_transaction(
                 idempotency_key=idempotency_key,
                 transaction_request=tx_request,
@@ -314,3 +462,50 @@ async def transfer_between_vault_accounts(
             }
 
     return await asyncio.to_thread(sync_call)
+
+
+async def find_transaction_by_external_id(external_tx_id: str) -> dict | None:
+    """Return the transaction created with ``external_tx_id``, or ``None``."""
+
+    def sync_call() -> dict | None:
+        with get_fireblocks_client() as client:
+            try:
+                future = client.transactions.get_transaction_by_external_id(external_tx_id)
+                response = future.result()
+            except Exception as exc:
+                if getattr(exc, "status", None) == 404:
+                    return None
+                raise
+            data = getattr(response, "data", response)
+            status = getattr(data, "status", None)
+            return {
+                "id": getattr(data, "id", None),
+                "status": getattr(status, "value", status),
+            }
+
+    return await asyncio.to_thread(sync_call)
+
+
+async def get_transaction(tx_id: str) -> dict:
+    """Return the current state of a Fireblocks transaction.
+
+    The keys mirror the ``data`` object of ``TRANSACTION_*`` webhooks so both
+    can be handled by the same code.
+    """
+
+    def sync_call() -> dict:
+        with get_fireblocks_client() as client:
+            future = client.transactions.get_transaction(tx_id)
+            response = future.result()
+            data = getattr(response, "data", response)
+            fee = _safe_get(data, "network_fee") or _safe_get(data, "fee_info", "network_fee")
+            status = getattr(data, "status", None)
+            return {
+                "id": getattr(data, "id", tx_id),
+                "status": getattr(status, "value", status),
+                "txHash": getattr(data, "tx_hash", None),
+                "networkFee": _as_decimal_str(fee) if fee is not None else None,
+                "createdAt": getattr(data, "created_at", None),
+            }
+
+    return await asyncio.to_thread(sync_call)
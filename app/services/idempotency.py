@@ -0,0 +1,156 @@
+"""``Idempotency-Key`` handling for the mutating wallet routes.
+
+The first request with a key runs and its response is kept in memory for
+``IDEMPOTENCY_TTL`` seconds, so a retry gets it back without touching the
+database or Fireblocks.  Concurrent duplicates in the same process wait for
+the first request and share its outcome.  Duplicates in other processes (or
+after a restart) wait on a transaction-scoped advisory lock and then find the
+transaction written by the first request through
+``Transaction.idempotency_key``, whose ``meta`` keeps the first request's
+fingerprint.  The key is also turned into a Fireblocks external id (see
+:func:`provider_key`), so the provider itself accepts the transfer only once.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable
+
+from sqlalchemy.future import select
+
+from app.config import settings
+from app.core import metrics
+from app.database import advisory_xact_lock
+from app.models.transaction import Transaction
+
+# Namespace of the Fireblocks external ids derived from client keys
+_PROVIDER_NAMESPACE = uuid.UUID("ff28b8b5-17f6-476e-a723-20627e6e03a0")
+
+# Key of the request fingerprint in the ``meta`` of a keyed transaction
+FINGERPRINT_META = "request_fingerprint"
+
+
+class IdempotencyKeyReused(Exception):
+    """Raised when a key comes back with a different request."""
+
+
+def provider_key(user_id, key: str) -> str:
+    """Fireblocks external id for the user's ``key``, the same on every retry."""
+    return str(uuid.uuid5(_PROVIDER_NAMESPACE, f"{user_id}:{key}"))
+
+
+def request_fingerprint(*parts) -> str:
+    """Digest of what a request asks for, to tell a retry from a reused key."""
+    return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Responses of recent keyed requests and the requests still running."""
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # (expires_at, fingerprint, response) in insertion order, which with
+        # a fixed TTL is also expiry order
+        self._responses: OrderedDict[Hashable, tuple] = OrderedDict()
+        self._in_flight: dict[Hashable, tuple[str, asyncio.Future]] = {}
+
+    def _stored(self, ident: Hashable) -> tuple | None:
+        now = time.monotonic()
+        while self._responses:
+            oldest = next(iter(self._responses.values()))
+            if oldest[0] > now:
+                break
+            self._responses.popitem(last=False)
+        return self._responses.get(ident)
+
+    def _store(self, ident: Hashable, fingerprint: str, response) -> None:
+        self._responses[ident] = (time.monotonic() + self.ttl, fingerprint, response)
+        self._responses.move_to_end(ident)
+        while len(self._responses) > self.maxsize:
+            self._responses.popitem(last=False)
+
+    @staticmethod
+    def _check(stored: str, fingerprint: str) -> None:
+        if stored != fingerprint:
+            raise IdempotencyKeyReused()
+
+    async def run(
+        self,
+        db,
+        user_id,
+        key: str | None,
+        fingerprint: str,
+        handler: Callable[[], Awaitable],
+        replay: Callable[[Transaction], object],
+    ):
+        """Return ``await handler()``, running it once per ``(user_id, key)``.
+
+        ``handler`` must commit a transaction carrying ``key`` as its
+        ``idempotency_key`` and ``fingerprint`` under ``meta[FINGERPRINT_META]``,
+        and must not commit anything before it, which would release the lock
+        taken here.  ``replay`` rebuilds the response from that transaction
+        when it is no longer in memory.  Failures are not stored, so a retry
+        after an error runs again.  Raises :class:`IdempotencyKeyReused` when
+        ``fingerprint`` differs from the first request's.
+        """
+        if key is None:
+            return await handler()
+        ident = (user_id, key)
+        while True:
+            stored = self._stored(ident)
+            if stored is not None:
+                self._check(stored[1], fingerprint)
+                metrics.inc("idempotent_replays_total")
+                return stored[2]
+            pending = self._in_flight.get(ident)
+            if pending is None:
+                break
+            self._check(pending[0], fingerprint)
+            try:
+                return await asyncio.shield(pending[1])
+            except asyncio.CancelledError:
+                if not pending[1].cancelled():
+                    raise
+                # The first request was abandoned; run this one instead
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark failures as retrieved even when no duplicate waits for them
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._in_flight[ident] = (fingerprint, future)
+        try:
+            # Held until the handler commits, so a duplicate in another
+            # process blocks here and then finds the transaction
+            await advisory_xact_lock(db, f"idempotency:{user_id}:{key}")
+            result = await db.execute(
+                select(Transaction)
+                .where(Transaction.user_id == user_id, Transaction.idempotency_key == key)
+                .limit(1)
+            )
+            tx = result.scalar_one_or_none()
+            if tx is not None:
+                # Transactions written before fingerprints were stored lack one
+                self._check((tx.meta or {}).get(FINGERPRINT_META, fingerprint), fingerprint)
+                metrics.inc("idempotent_replays_total")
+                response = replay(tx)
+            else:
+                response = await handler()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            self._store(ident, fingerprint, response)
+            future.set_result(response)
+            return response
+        finally:
+            del self._in_flight[ident]
+
+
+idempotency_store = IdempotencyStore(settings.IDEMPOTENCY_TTL, settings.IDEMPOTENCY_CACHE_SIZE)
@@ -0,0 +1,173 @@
+"""Push transaction and balance changes to connected clients.
+
+Changes are published on :data:`app.core.pubsub.broker` once they are
+committed: under ``("user", user_id)`` for the streaming endpoint and under
+``("transfer", provider_ref_id)`` for clients waiting on one transfer.
+
+A change is usually committed by a different worker than the one holding the
+client's stream (webhook events are processed by whichever worker claims
+them), so :class:`ChangeRelay` sends every change through Postgres
+``NOTIFY``.  Each worker listens on one connection and publishes what it
+receives on its own broker.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+
+from app.core import metrics
+from app.core.pubsub import broker
+from app.models.transaction import Transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "transaction_changes"
+
+# Seconds before a lost listener connection is opened again
+_RECONNECT_DELAY = 5
+
+# Columns returned by bulk writes so committed changes can be published
+CHANGE_COLUMNS = (
+    Transaction.id,
+    Transaction.user_id,
+    Transaction.wallet_id,
+    Transaction.type,
+    Transaction.status,
+    Transaction.amount,
+    Transaction.currency,
+    Transaction.balance_after,
+    Transaction.provider_ref_id,
+    Transaction.tx_hash,
+    Transaction.updated_at,
+)
+
+
+def user_topic(user_id) -> tuple:
+    return ("user", str(user_id))
+
+
+def transfer_topic(transfer_id) -> tuple:
+    return ("transfer", str(transfer_id))
+
+
+def transaction_message(row) -> dict:
+    """Serialise a ``transactions`` row (or ``RETURNING`` row) for clients."""
+    status = getattr(row.status, "value", row.status)
+    tx_type = getattr(row.type, "value", row.type)
+    return {
+        "event": "transaction",
+        "id": str(row.id),
+        "wallet_id": str(row.wallet_id) if row.wallet_id else None,
+        "type": tx_type,
+        "status": status,
+        "amount": str(row.amount),
+        "currency": row.currency,
+        "transfer_id": row.provider_ref_id,
+        "tx_hash": row.tx_hash,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+    }
+
+
+def balance_message(row) -> dict:
+    return {
+        "event": "balance",
+        "wallet_id": str(row.wallet_id),
+        "currency": row.currency,
+        "balance": str(row.balance_after),
+    }
+
+
+def _change(row) -> dict:
+    """What a committed ``row`` means for clients, small enough for one NOTIFY."""
+    has_balance = row.wallet_id and row.balance_after is not None
+    return {
+        "user_id": str(row.user_id),
+        "transaction": transaction_message(row),
+        "balance": balance_message(row) if has_balance else None,
+    }
+
+
+def deliver_change(change: dict) -> None:
+    """Publish ``change`` to the subscribers in this process."""
+    message = change["transaction"]
+    topic = user_topic(change["user_id"])
+    broker.publish(topic, message)
+    if change["balance"] is not None:
+        broker.publish(topic, change["balance"])
+    if message["transfer_id"]:
+        broker.publish(transfer_topic(message["transfer_id"]), message)
+
+
+class ChangeRelay:
+    """Carries committed changes to the broker of every worker.
+
+    :meth:`run` holds one connection per worker that ``LISTEN``s on
+    :data:`CHANNEL` and sends the changes queued by :meth:`send` with
+    ``pg_notify``, so they come back to every listening worker, this one
+    included.  Until it is connected (and in tests) changes only reach this
+    process.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._outbox: asyncio.Queue | None = None
+
+    def send(self, changes: list[dict]) -> None:
+        if self._outbox is not None:
+            try:
+                self._outbox.put_nowait(changes)
+                return
+            except asyncio.QueueFull:
+                metrics.inc("change_relay_overflow_total")
+        for change in changes:
+            deliver_change(change)
+
+    async def run(self, engine) -> None:
+        """Relay changes through ``engine``'s database until cancelled."""
+        while True:
+            try:
+                await self._relay(engine)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Change relay connection lost")
+            await asyncio.sleep(_RECONNECT_DELAY)
+
+    async def _relay(self, engine) -> None:
+        async with engine.connect() as conn:
+            raw = (await conn.get_raw_connection()).driver_connection
+            await raw.add_listener(CHANNEL, self._on_notify)
+            self._outbox = outbox = asyncio.Queue(self.maxsize)
+            try:
+                while True:
+                    changes = await outbox.get()
+                    while not outbox.empty():
+                        changes = changes + outbox.get_nowait()
+                    try:
+                        await raw.execute(
+                            "SELECT pg_notify($1, payload) FROM unnest($2::text[]) AS payload",
+                            CHANNEL,
+                            [json.dumps(change) for change in changes],
+                        )
+                    except BaseException:
+                        for change in changes:
+                            deliver_change(change)
+                        raise
+            finally:
+                self._outbox = None
+                while not outbox.empty():
+                    for change in outbox.get_nowait():
+                        deliver_change(change)
+
+    @staticmethod
+    def _on_notify(connection, pid, channel, payload) -> None:
+        deliver_change(json.loads(payload))
+
+
+change_relay = ChangeRelay()
+
+
+def publish_transaction_changes(rows) -> None:
+    """Notify the owners of ``rows`` about their new state and balances."""
+    change_relay.send([_change(row) for row in rows])
@@ -0,0 +1,133 @@
+"""Monthly partitions of ``transactions``.
+
+``transactions`` is range-partitioned on ``created_at`` with one partition per
+month named ``transactions_yYYYYmMM``.  A daily job keeps
+``TX_PARTITION_MONTHS_AHEAD`` future partitions in place, so inserts never hit
+a missing range, and detaches partitions older than
+``TX_PARTITION_RETENTION_MONTHS`` into the ``archive`` schema.  Detached
+tables keep their data and indexes but no longer weigh on the live table's
+planning, vacuum or index maintenance.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+PARENT = "transactions"
+ARCHIVE_SCHEMA = "archive"
+_NAME = re.compile(r"^transactions_y(\d{4})m(\d{2})$")
+
+# Our rows are written after Fireblocks creates the transaction; the slack
+# only absorbs clock skew.
+LOOKUP_SLACK = timedelta(days=1)
+
+
+def provider_created_at(data: dict) -> datetime | None:
+    """Creation time of a Fireblocks transaction payload (``createdAt`` in ms)."""
+    created = data.get("createdAt")
+    try:
+        return datetime.utcfromtimestamp(int(created) / 1000) if created else None
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def lookup_bound(times) -> datetime | None:
+    """Lower ``created_at`` bound covering every row created at or after ``times``.
+
+    Used as a literal predicate so lookups by provider id prune partitions;
+    ``None`` (no pruning) when any time is unknown.
+    """
+    times = list(times)
+    if not times or any(t is None for t in times):
+        return None
+    return min(times) - LOOKUP_SLACK
+
+
+def month_start(day: date, offset: int = 0) -> date:
+    """First day of the month ``offset`` months after the month of ``day``."""
+    index = day.year * 12 + day.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_month(name: str) -> date | None:
+    match = _NAME.match(name)
+    if match is None:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+async def list_partitions(db) -> list[str]:
+    result = await db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :parent"
+        ),
+        {"parent": PARENT},
+    )
+    return sorted(result.scalars().all())
+
+
+async def ensure_partitions(db, today: date | None = None) -> list[str]:
+    """Create the partitions from this month to ``TX_PARTITION_MONTHS_AHEAD`` ahead."""
+    today = today or datetime.utcnow().date()
+    existing = set(await list_partitions(db))
+    created = []
+    for offset in range(settings.TX_PARTITION_MONTHS_AHEAD + 1):
+        month = month_start(today, offset)
+        name = partition_name(month)
+        if name in existing:
+            continue
+        await db.execute(
+            text(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {PARENT} '
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{month_start(month, 1).isoformat()}')"
+            )
+        )
+        created.append(name)
+    return created
+
+
+async def detach_old_partitions(db, today: date | None = None) -> list[str]:
+    """Detach partitions wholly older than the retention window into ``archive``."""
+    if settings.TX_PARTITION_RETENTION_MONTHS <= 0:
+        return []
+    today = today or datetime.utcnow().date()
+    cutoff = month_start(today, -settings.TX_PARTITION_RETENTION_MONTHS)
+    detached = []
+    for name in await list_partitions(db):
+        month = partition_month(name)
+        if month is None or month >= cutoff:
+            continue
+        await db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+        await db.execute(text(f'ALTER TABLE {PARENT} DETACH PARTITION "{name}"'))
+        await db.execute(text(f'ALTER TABLE "{name}" SET SCHEMA {ARCHIVE_SCHEMA}'))
+        detached.append(name)
+    return detached
+
+
+async def maintain_partitions(session_factory) -> None:
+    """Create upcoming partitions and detach expired ones."""
+    async with session_factory() as db:
+        created = await ensure_partitions(db)
+        detached = await detach_old_partitions(db)
+        await db.commit()
+        partitions = await list_partitions(db)
+    metrics.set_gauge("transaction_partitions", len(partitions))
+    metrics.inc("transaction_partitions_created_total", len(created))
+    metrics.inc("transaction_partitions_detached_total", len(detached))
+    if created or detached:
+        logger.info("Transaction partitions created %s, detached %s", created, detached)
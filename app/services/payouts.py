@@ -0,0 +1,534 @@
+"""Bulk payouts from one wallet.
+
+``POST /payouts`` pays many destinations in one request.  All items are
+validated in one pass (addresses including their checksums), internal
+destinations (privacy IDs, usernames and addresses of our own wallets) are
+resolved with one query, and every ``Transaction`` row is written with one
+bulk insert under a new ``group_id``, which is the batch id.  The transfers
+are then submitted in the background, at most ``PAYOUT_CONCURRENCY`` at a
+time, and results are written back in bulk as they arrive so
+``GET /payouts/{batch_id}?since=`` can report per-item progress.
+
+Each transfer carries its outgoing transaction id as Fireblocks external id,
+so an item can never be paid twice.  Items still queued when the process
+stops, or after a failure with an unclear outcome, are picked up by
+:func:`resume_payouts`, which first looks each one up by its external id and
+only resubmits those Fireblocks has never seen.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from sqlalchemy import and_, func, insert, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import settings
+from app.core import metrics
+from app.core.amounts import Amount
+from app.core.assets import get_asset, validate_destinations
+from app.core.velocity import VelocityLimitExceeded, velocity_limits
+from app.database import advisory_xact_lock
+from app.models.transaction import Transaction, TxStatus, TxType
+from app.models.user import User
+from app.models.wallet import Wallet
+from app.services.deposits import latest_balances
+from app.services.fireblocks import (
+    create_transfer,
+    find_transaction_by_external_id,
+    get_wallet_balance,
+    transfer_between_vault_accounts,
+)
+from app.services.notifications import CHANGE_COLUMNS, publish_transaction_changes
+from app.services.provisioning import ensure_wallet
+from app.services.velocity import recent_withdrawals
+from app.services.withdrawal_batches import queued_amount
+
+logger = logging.getLogger(__name__)
+
+# ``meta`` key holding the item's position in the request
+PAYOUT_KEY = "payout"
+QUEUED = "queued"
+
+
+class PayoutError(Exception):
+    """Raised with every invalid item when a payout request is rejected."""
+
+    def __init__(self, errors: list[dict]):
+        super().__init__(f"{len(errors)} invalid payout items")
+        self.errors = errors
+
+
+class InsufficientBalanceError(Exception):
+    """Raised when the wallet cannot cover the payout total."""
+
+
+@dataclass(frozen=True)
+class Destination:
+    """An internal payee: the user and their wallet for the asset."""
+
+    user: User
+    wallet: Wallet | None
+
+
+@dataclass(frozen=True)
+class PayoutJob:
+    """One transfer for the submission pipeline."""
+
+    out_id: uuid.UUID
+    in_id: uuid.UUID | None
+    created_at: datetime
+    amount: str
+    address: str | None
+    dest_vault_id: str | None
+    balance_after: Amount
+
+
+@dataclass
+class Payout:
+    batch_id: uuid.UUID
+    rows: list[dict]
+    jobs: list[PayoutJob]
+
+
+def _valid_amount(amount: Amount, decimals: int) -> bool:
+    try:
+        return amount.rescale(decimals) > 0
+    except ValueError:
+        return False
+
+
+def validate_items(asset: str, items) -> list[dict]:
+    """Errors of every malformed item, as ``{"index", "error"}`` dicts."""
+    decimals = get_asset(asset).decimals
+    addresses = [item.address for item in items if item.address is not None]
+    valid_address = dict(zip(addresses, validate_destinations(asset, addresses)))
+    errors = []
+    for index, item in enumerate(items):
+        if (item.address is None) == (item.destination_user_id is None):
+            errors.append(
+                {"index": index, "error": "Exactly one of address or destination_user_id is required"}
+            )
+            continue
+        if not _valid_amount(item.amount, decimals):
+            errors.append({"index": index, "error": "Invalid amount"})
+        elif item.address is not None and not valid_address[item.address]:
+            errors.append({"index": index, "error": "Invalid address"})
+    return errors
+
+
+async def resolve_destinations(
+    db: AsyncSession, asset: str, items
+) -> tuple[list[Destination | None], list[dict]]:
+    """Match items to internal payees with one query.
+
+    Returns one entry per item (``None`` for external addresses) and the
+    errors of user destinations that cannot be paid.
+    """
+    keys = {item.destination_user_id for item in items if item.destination_user_id}
+    addresses = {item.address for item in items if item.address}
+    result = await db.execute(
+        select(User, Wallet)
+        .outerjoin(
+            Wallet,
+            and_(
+                Wallet.user_id == User.id,
+                Wallet.currency == asset,
+                Wallet.network == "FIREBLOCKS",
+            ),
+        )
+        .where(
+            or_(
+                User.privacy_id.in_(keys),
+                User.username.in_(keys),
+                Wallet.address.in_(addresses),
+            )
+        )
+    )
+    matches = result.all()
+    by_key: dict[str, Destination] = {}
+    by_address: dict[str, Destination] = {}
+    # Privacy IDs take precedence over usernames, as in internal transfers
+    for user, wallet in matches:
+        by_key[user.privacy_id] = Destination(user, wallet)
+        if wallet is not None:
+            by_address[wallet.address] = Destination(user, wallet)
+    for user, wallet in matches:
+        if user.username:
+            by_key.setdefault(user.username, Destination(user, wallet))
+
+    destinations: list[Destination | None] = []
+    errors = []
+    for index, item in enumerate(items):
+        if item.address is not None:
+            destinations.append(by_address.get(item.address))
+            continue
+        dest = by_key.get(item.destination_user_id)
+        if dest is None:
+            errors.append({"index": index, "error": "Destination user not found"})
+        elif not dest.user.email_verified:
+            errors.append({"index": index, "error": "Destination email not verified"})
+        destinations.append(dest)
+    return destinations, errors
+
+
+async def create_payout(db: AsyncSession, user: User, wallet: Wallet, items) -> Payout:
+    """Validate ``items`` and record them as queued transactions of one batch.
+
+    Raises :class:`PayoutError` listing every invalid item,
+    :class:`InsufficientBalanceError` or
+    :class:`~app.core.velocity.VelocityLimitExceeded`; nothing is written in
+    any of these cases.
+    """
+    asset = wallet.currency
+    errors = validate_items(asset, items)
+    if errors:
+        raise PayoutError(errors)
+    destinations, errors = await resolve_destinations(db, asset, items)
+    if errors:
+        raise PayoutError(errors)
+
+    # Provisioning commits, so it happens before the balance lock is taken
+    provisioned: dict = {}
+    for n, dest in enumerate(destinations):
+        if dest is not None and dest.wallet is None:
+            if dest.user.id not in provisioned:
+                provisioned[dest.user.id] = await ensure_wallet(db, dest.user, asset)
+            destinations[n] = Destination(dest.user, provisioned[dest.user.id])
+
+    # Same lock as single withdrawals so queued amounts are not double spent
+    await advisory_xact_lock(db, f"withdraw:{wallet.id}")
+    balance_data = await get_wallet_balance(wallet.vault_id, asset)
+    available = Amount.parse(balance_data["balance"]) - await queued_amount(db, wallet.id)
+    decimals = get_asset(asset).decimals
+    amounts = [item.amount.rescale(decimals) for item in items]
+    total = sum(amounts, Amount(0))
+    if total > available:
+        raise InsufficientBalanceError()
+    window = velocity_limits.exceeded(user.id, asset, total)
+    if window is None and asset in velocity_limits.assets:
+        # Withdrawals made through other workers are only in the database
+        withdrawn = await recent_withdrawals(db, user.id, asset)
+        window = velocity_limits.exceeded_by(asset, withdrawn, total)
+    if window is not None:
+        raise VelocityLimitExceeded(window, asset)
+
+    dest_balances = await latest_balances(
+        db, list({dest.wallet.id for dest in destinations if dest is not None})
+    )
+    batch_id = uuid.uuid4()
+    now = datetime.utcnow()
+    balance = available
+    out_rows, in_rows, jobs = [], [], []
+    for index, (item, amount, dest) in enumerate(zip(items, amounts, destinations)):
+        balance -= amount
+        out_id = uuid.uuid4()
+        in_id = None if dest is None else uuid.uuid4()
+        meta = {PAYOUT_KEY: index}
+        if dest is not None:
+            # What resume_payouts needs to rebuild the job from the row
+            meta.update(in_id=str(in_id), dest_vault_id=dest.wallet.vault_id)
+        row = {
+            "id": out_id,
+            "created_at": now,
+            "updated_at": now,
+            "user_id": user.id,
+            "wallet_id": wallet.id,
+            "provider": "fireblocks",
+            "type": TxType.crypto_out if dest is None else TxType.internal_out,
+            "status": TxStatus.pending,
+            "amount": amount.decimal,
+            "currency": asset,
+            "fee_amount": Decimal("0"),
+            "fee_currency": asset,
+            "balance_after": balance.decimal,
+            "address_from": wallet.address,
+            "address_to": item.address if dest is None else dest.wallet.address,
+            "counterparty_user": None if dest is None else dest.user.id,
+            "group_id": batch_id,
+            "idempotency_key": str(out_id),
+            "meta": meta,
+        }
+        out_rows.append(row)
+        if dest is not None:
+            dest_balance = dest_balances.get(dest.wallet.id)
+            if dest_balance is not None:
+                dest_balance = amount + dest_balance
+                dest_balances[dest.wallet.id] = dest_balance
+            in_rows.append(
+                {
+                    **row,
+                    "id": in_id,
+                    "user_id": dest.user.id,
+                    "wallet_id": dest.wallet.id,
+                    "type": TxType.internal_in,
+                    "balance_after": None if dest_balance is None else dest_balance.decimal,
+                    "counterparty_user": user.id,
+                    "idempotency_key": None,
+                    "meta": {},
+                }
+            )
+        jobs.append(
+            PayoutJob(
+                out_id=out_id,
+                in_id=in_id,
+                created_at=now,
+                amount=str(amount),
+                address=item.address if dest is None else None,
+                dest_vault_id=None if dest is None else dest.wallet.vault_id,
+                balance_after=balance,
+            )
+        )
+
+    with velocity_limits.reserve(user.id, asset, total):
+        result = await db.execute(
+            insert(Transaction).returning(*CHANGE_COLUMNS), out_rows + in_rows
+        )
+        inserted = result.all()
+        await db.commit()
+    metrics.inc("payout_batches_total")
+    metrics.inc("payout_items_total", len(jobs))
+    publish_transaction_changes(inserted)
+    return Payout(batch_id=batch_id, rows=out_rows, jobs=jobs)
+
+
+def is_rejection(exc: Exception) -> bool:
+    """Whether Fireblocks definitely refused the transfer (a 4xx other than a retry hint).
+
+    Timeouts, 5xx, 429 and non-HTTP errors leave the outcome unknown: the
+    transfer may exist, so the item must stay queued for the same external id.
+    """
+    status = getattr(exc, "status", None)
+    return status is not None and 400 <= status < 500 and status not in (408, 409, 429)
+
+
+def _failed(job: PayoutJob, exc: Exception) -> list[dict]:
+    description = f"Payout failed: {exc}"[:255]
+    return [
+        {
+            "id": tx_id,
+            "created_at": job.created_at,
+            "status": TxStatus.failed,
+            "description": description,
+            "updated_at": datetime.utcnow(),
+        }
+        for tx_id in (job.out_id, job.in_id)
+        if tx_id is not None
+    ]
+
+
+async def _submit(job: PayoutJob, vault_id: str, asset: str, resume: bool = False) -> list[dict]:
+    """Create the Fireblocks transfer of ``job``; returns its row updates.
+
+    Nothing is updated when the outcome is unclear, so the item stays queued.
+    With ``resume`` an existing transfer with the job's external id is
+    adopted instead of submitting again.
+    """
+    try:
+        transfer = None
+        if resume:
+            transfer = await find_transaction_by_external_id(str(job.out_id))
+        if transfer is not None:
+            metrics.inc("payout_items_adopted_total")
+        elif job.dest_vault_id is not None:
+            transfer = await transfer_between_vault_accounts(
+                vault_id, job.dest_vault_id, asset, job.amount, external_tx_id=str(job.out_id)
+            )
+        else:
+            transfer = await create_transfer(
+                vault_id, asset, job.amount, job.address, external_tx_id=str(job.out_id)
+            )
+    except Exception as exc:
+        if not is_rejection(exc):
+            logger.warning("Payout item %s left queued, outcome unclear: %s", job.out_id, exc)
+            metrics.inc("payout_items_unclear_total")
+            return []
+        logger.warning("Payout item %s failed: %s", job.out_id, exc)
+        metrics.inc("payout_items_failed_total")
+        return _failed(job, exc)
+
+    metrics.inc("payout_items_submitted_total")
+    now = datetime.utcnow()
+    out = {
+        "id": job.out_id,
+        "created_at": job.created_at,
+        "provider_ref_id": transfer.get("id"),
+        "updated_at": now,
+    }
+    if job.in_id is None:
+        fee = Amount.parse(transfer.get("fee") or "0")
+        out.update(fee_amount=fee.decimal, balance_after=(job.balance_after - fee).decimal)
+        return [out]
+    return [
+        out,
+        {
+            "id": job.in_id,
+            "created_at": job.created_at,
+            "provider_ref_id": transfer.get("id"),
+            "updated_at": now,
+        },
+    ]
+
+
+async def _write(session_factory, updates: list[dict]) -> None:
+    """Apply row updates by primary key and publish the new state."""
+    async with session_factory() as db:
+        await db.execute(update(Transaction), updates)
+        result = await db.execute(
+            select(*CHANGE_COLUMNS).where(
+                Transaction.created_at.in_({u["created_at"] for u in updates}),
+                Transaction.id.in_([u["id"] for u in updates]),
+            )
+        )
+        rows = result.all()
+        await db.commit()
+    publish_transaction_changes(rows)
+
+
+async def run_payout(
+    session_factory, vault_id: str, asset: str, jobs: list[PayoutJob], resume: bool = False
+) -> None:
+    """Submit ``jobs`` with ``PAYOUT_CONCURRENCY`` workers.
+
+    Results are written as they arrive: each write takes every result ready
+    at that moment, so the database sees few large updates while the
+    workers keep Fireblocks busy.
+    """
+    if not jobs:
+        return
+    results: asyncio.Queue = asyncio.Queue()
+    remaining = iter(jobs)
+
+    async def worker() -> None:
+        for job in remaining:
+            await results.put(await _submit(job, vault_id, asset, resume))
+
+    workers = [
+        asyncio.create_task(worker())
+        for _ in range(min(max(settings.PAYOUT_CONCURRENCY, 1), len(jobs)))
+    ]
+    try:
+        done = 0
+        while done < len(jobs):
+            ready = [await results.get()]
+            while not results.empty():
+                ready.append(results.get_nowait())
+            done += len(ready)
+            updates = [u for item in ready for u in item]
+            if updates:
+                await _write(session_factory, updates)
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+def _job_from_row(tx: Transaction) -> PayoutJob | None:
+    meta = tx.meta or {}
+    internal = tx.type == TxType.internal_out
+    if internal and "dest_vault_id" not in meta:
+        return None
+    return PayoutJob(
+        out_id=tx.id,
+        in_id=uuid.UUID(meta["in_id"]) if internal else None,
+        created_at=tx.created_at,
+        amount=format(tx.amount, "f"),
+        address=None if internal else tx.address_to,
+        dest_vault_id=meta.get("dest_vault_id"),
+        balance_after=Amount.parse(tx.balance_after),
+    )
+
+
+async def resume_payouts(session_factory) -> int:
+    """Submit payout items still queued ``PAYOUT_RESUME_AFTER`` seconds after creation.
+
+    These were left by a process that stopped mid-payout or by an unclear
+    failure.  Each keeps its external id, and transfers Fireblocks already
+    has are adopted rather than sent again.  Returns how many were picked up.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.PAYOUT_RESUME_AFTER)
+    async with session_factory() as db:
+        result = await db.execute(
+            select(Transaction, Wallet.vault_id)
+            .join(Wallet, Wallet.id == Transaction.wallet_id)
+            .where(
+                Transaction.meta.has_key(PAYOUT_KEY),
+                Transaction.type.in_((TxType.crypto_out, TxType.internal_out)),
+                Transaction.status == TxStatus.pending,
+                Transaction.provider_ref_id.is_(None),
+                Transaction.created_at < cutoff,
+            )
+            .order_by(Transaction.created_at)
+            .limit(max(settings.PAYOUT_MAX_ITEMS, 1))
+        )
+        rows = result.all()
+    groups: dict[tuple, list[PayoutJob]] = defaultdict(list)
+    for tx, vault_id in rows:
+        job = _job_from_row(tx)
+        if job is None:
+            logger.error("Queued payout item %s has no destination vault to resume with", tx.id)
+            continue
+        groups[(vault_id, tx.currency)].append(job)
+    for (vault_id, asset), jobs in groups.items():
+        await run_payout(session_factory, vault_id, asset, jobs, resume=True)
+    resumed = sum(len(jobs) for jobs in groups.values())
+    metrics.inc("payout_items_resumed_total", resumed)
+    return resumed
+
+
+def item_status(tx) -> str:
+    if tx.status == TxStatus.pending and tx.provider_ref_id is None:
+        return QUEUED
+    return getattr(tx.status, "value", tx.status)
+
+
+async def payout_status(
+    db: AsyncSession, user_id, batch_id, since: datetime | None = None
+) -> tuple[dict[str, int], list[Transaction], datetime | None] | None:
+    """Item counts by status, the items changed after ``since`` and the next cursor.
+
+    ``updated_at`` is stamped before the row commits, so an update can become
+    visible after a poll that already moved past its timestamp.  Items are
+    therefore returned from ``PAYOUT_CURSOR_OVERLAP`` seconds before
+    ``since``, ordered by ``updated_at`` then ``id``; an item may be returned
+    again and callers keep the latest copy per ``transaction_id``.  The cursor
+    never moves backwards.  ``None`` when the user has no payout with that id.
+    """
+    own_items = (
+        Transaction.group_id == batch_id,
+        Transaction.user_id == user_id,
+        Transaction.meta.has_key(PAYOUT_KEY),
+    )
+    queued = and_(
+        Transaction.status == TxStatus.pending, Transaction.provider_ref_id.is_(None)
+    )
+    result = await db.execute(
+        select(Transaction.status, queued, func.count())
+        .where(*own_items)
+        .group_by(Transaction.status, queued)
+    )
+    counts: dict[str, int] = {}
+    for status, is_queued, count in result.all():
+        key = QUEUED if is_queued else status.value
+        counts[key] = counts.get(key, 0) + count
+    if not counts:
+        return None
+
+    stmt = select(Transaction).where(*own_items)
+    if since is not None:
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        overlap = timedelta(seconds=settings.PAYOUT_CURSOR_OVERLAP)
+        stmt = stmt.where(Transaction.updated_at > since - overlap)
+    result = await db.execute(stmt.order_by(Transaction.updated_at, Transaction.id))
+    txs = result.scalars().all()
+    cursor = since
+    if txs and (cursor is None or txs[-1].updated_at > cursor):
+        cursor = txs[-1].updated_at
+    return counts, txs, cursor
@@ -0,0 +1,271 @@
+"""Vault and wallet provisioning shared by the wallet routes and services.
+
+Provisioning is coordinated per user (vaults) and per user and asset
+(wallets): an in-process :class:`SingleFlight` makes concurrent requests in
+this worker wait for the first one, and a Postgres advisory lock does the same
+across workers.  Whoever gets the lock second re-reads the database and reuses
+what the first caller created, so Fireblocks is called once per vault/asset.
+
+Whether an asset already exists in a vault is answered by the local
+``vault_assets`` mirror; Fireblocks is only read when an activation fails.
+"""
+import asyncio
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import settings
+from app.core import metrics
+from app.core.assets import get_asset
+from app.core.singleflight import SingleFlight
+from app.database import advisory_xact_lock
+from app.models.user import User
+from app.models.vault import Vault
+from app.models.wallet import Wallet
+from app.services.fireblocks import (
+    create_vault_account,
+    activate_vault_asset,
+    generate_address_for_vault,
+    get_vault_asset_ids,
+    AssetAlreadyExistsError,
+)
+from app.services.vault_assets import known_vault_assets, record_vault_assets
+from app.services.vault_pool import claim_pooled_vault, pooled_address, pooled_addresses
+
+_flight = SingleFlight()
+
+
+@dataclass
+class ProvisionResult:
+    """Outcome of provisioning one asset in :func:`ensure_wallets`."""
+
+    asset: str
+    status: str  # 'created' | 'existing' | 'failed'
+    wallet: Wallet | None = None
+    error: str | None = None
+
+
+async def _find_vault(db: AsyncSession, user_id) -> Vault | None:
+    result = await db.execute(select(Vault).where(Vault.user_id == user_id))
+    return result.scalar_one_or_none()
+
+
+async def _find_wallet(db: AsyncSession, user_id, asset: str) -> Wallet | None:
+    result = await db.execute(
+        select(Wallet).where(
+            Wallet.user_id == user_id,
+            Wallet.currency == asset,
+            Wallet.network == "FIREBLOCKS",
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+async def _find_wallets(db: AsyncSession, user_id, assets: list[str]) -> dict[str, Wallet]:
+    if not assets:
+        return {}
+    result = await db.execute(
+        select(Wallet).where(
+            Wallet.user_id == user_id,
+            Wallet.currency.in_(assets),
+            Wallet.network == "FIREBLOCKS",
+        )
+    )
+    return {wallet.currency: wallet for wallet in result.scalars().all()}
+
+
+async def _provision_address(
+    vault_id: str,
+    asset: str,
+    known: dict[str, str | None],
+    reuse_existing_asset: bool,
+) -> str:
+    """Return a deposit address for ``asset`` in ``vault_id``, activating it if needed.
+
+    ``known`` is the local mirror of the vault's assets.  Only Fireblocks is
+    called here, so several assets can be provisioned concurrently; callers
+    record the result in the mirror.
+    """
+    if asset in known:
+        if not reuse_existing_asset:
+            raise AssetAlreadyExistsError(f"Asset {asset} already exists in vault {vault_id}")
+        return known[asset] or await generate_address_for_vault(vault_id, asset)
+
+    try:
+        return await activate_vault_asset(vault_id, asset)
+    except Exception:
+        # The mirror may be stale; only now confirm with the provider.
+        if asset not in await get_vault_asset_ids(vault_id):
+            raise
+    metrics.inc("vault_assets_mirror_mismatch_total")
+    if not reuse_existing_asset:
+        raise AssetAlreadyExistsError(f"Asset {asset} already exists in vault {vault_id}")
+    return await generate_address_for_vault(vault_id, asset)
+
+
+async def ensure_vault(db: AsyncSession, user: User) -> Vault:
+    """Return the vault of ``user``, creating it if missing.
+
+    A pre-provisioned vault is claimed from the warm pool when one is
+    available; Fireblocks is only called when the pool is empty.
+    """
+    vault = await _find_vault(db, user.id)
+    if vault is not None:
+        return vault
+
+    async with _flight.hold(("vault", user.id)):
+        await advisory_xact_lock(db, f"vault:{user.id}")
+        vault = await _find_vault(db, user.id)
+        if vault is not None:
+            return vault
+
+        pooled = await claim_pooled_vault(db, user.id)
+        if pooled is not None:
+            vault_id = pooled.vault_id
+        else:
+            vault_data = await create_vault_account(str(user.id))
+            vault_id = vault_data["vault_account_id"]
+        vault = Vault(vault_id=vault_id, user_id=user.id)
+        user.has_vault = True
+        db.add(vault)
+        db.add(user)
+        await db.commit()
+        await db.refresh(vault)
+        return vault
+
+
+async def ensure_wallet(
+    db: AsyncSession,
+    user: User,
+    asset: str,
+    *,
+    reuse_existing_asset: bool = True,
+) -> Wallet:
+    """Return the Fireblocks wallet of ``user`` for ``asset``, provisioning it if missing.
+
+    When the asset is already activated in the vault but has no ``Wallet``
+    row, its known deposit address is reused (or a fresh one generated); pass
+    ``reuse_existing_asset=False`` to get :class:`AssetAlreadyExistsError`
+    instead.
+    """
+    wallet = await _find_wallet(db, user.id, asset)
+    if wallet is not None:
+        return wallet
+
+    async with _flight.hold(("wallet", user.id, asset)):
+        vault = await ensure_vault(db, user)
+        # ensure_vault may have committed, so take the wallet lock afterwards
+        await advisory_xact_lock(db, f"wallet:{user.id}:{asset}")
+        wallet = await _find_wallet(db, user.id, asset)
+        if wallet is not None:
+            return wallet
+
+        address = await pooled_address(db, vault.vault_id, asset)
+        if address is None:
+            known = await known_vault_assets(db, vault.vault_id)
+            try:
+                address = await _provision_address(
+                    vault.vault_id, asset, known, reuse_existing_asset
+                )
+            except AssetAlreadyExistsError:
+                if asset not in known:
+                    await record_vault_assets(db, [(vault.vault_id, asset, None)])
+                    await db.commit()
+                raise
+            await record_vault_assets(db, [(vault.vault_id, asset, address)])
+
+        wallet = Wallet(
+            user_id=user.id,
+            vault_id=vault.vault_id,
+            address=address,
+            currency=asset,
+            network="FIREBLOCKS",
+        )
+        db.add(wallet)
+        await db.commit()
+        await db.refresh(wallet)
+        return wallet
+
+
+async def ensure_wallets(
+    db: AsyncSession, user: User, assets: list[str]
+) -> list[ProvisionResult]:
+    """Provision wallets for several assets at once.
+
+    The vault's assets are read once from the local mirror, the missing ones
+    are activated concurrently (at most ``PROVISIONING_FANOUT`` calls in flight)
+    and all new ``Wallet`` rows are written in one commit.  Failures are
+    reported per asset and do not prevent the other assets from being
+    created.
+    """
+    assets = list(dict.fromkeys(assets))
+    results: dict[str, ProvisionResult] = {}
+    supported = []
+    for asset in assets:
+        try:
+            get_asset(asset)
+        except ValueError as exc:
+            results[asset] = ProvisionResult(asset, "failed", error=str(exc))
+        else:
+            supported.append(asset)
+
+    existing = await _find_wallets(db, user.id, supported)
+    for asset, wallet in existing.items():
+        results[asset] = ProvisionResult(asset, "existing", wallet)
+    missing = sorted(a for a in supported if a not in existing)
+    if not missing:
+        return [results[a] for a in assets]
+
+    async with AsyncExitStack() as stack:
+        # Keys are taken in sorted order so concurrent bulk calls cannot deadlock
+        for asset in missing:
+            await stack.enter_async_context(_flight.hold(("wallet", user.id, asset)))
+        vault = await ensure_vault(db, user)
+        for asset in missing:
+            await advisory_xact_lock(db, f"wallet:{user.id}:{asset}")
+
+        raced = await _find_wallets(db, user.id, missing)
+        for asset, wallet in raced.items():
+            results[asset] = ProvisionResult(asset, "existing", wallet)
+        to_create = [a for a in missing if a not in raced]
+
+        pooled = await pooled_addresses(db, vault.vault_id) if to_create else {}
+        known = await known_vault_assets(db, vault.vault_id) if to_create else {}
+        semaphore = asyncio.Semaphore(max(settings.PROVISIONING_FANOUT, 1))
+
+        async def provision(asset: str) -> str:
+            if asset in pooled:
+                return pooled[asset]
+            async with semaphore:
+                return await _provision_address(vault.vault_id, asset, known, True)
+
+        addresses = await asyncio.gather(
+            *(provision(a) for a in to_create), return_exceptions=True
+        )
+
+        new_wallets = []
+        for asset, address in zip(to_create, addresses):
+            if isinstance(address, Exception):
+                error = str(address) or type(address).__name__
+                results[asset] = ProvisionResult(asset, "failed", error=error)
+                continue
+            wallet = Wallet(
+                user_id=user.id,
+                vault_id=vault.vault_id,
+                address=address,
+                currency=asset,
+                network="FIREBLOCKS",
+            )
+            new_wallets.append(wallet)
+            results[asset] = ProvisionResult(asset, "created", wallet)
+
+        if new_wallets:
+            await record_vault_assets(
+                db, [(w.vault_id, w.currency, w.address) for w in new_wallets]
+            )
+            db.add_all(new_wallets)
+            await db.commit()
+
+    return [results[a] for a in assets]
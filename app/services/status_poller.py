@@ -0,0 +1,176 @@
+"""Fallback status polling for Fireblocks transactions stuck in ``pending``.
+
+Webhooks normally move transactions out of ``pending``; this poller covers
+delayed or lost deliveries.  Each tick selects pending provider ids, asks
+Fireblocks about the ones that are due (at most ``STATUS_POLL_CONCURRENCY``
+requests in flight) and applies every answer in one batched update.
+
+A transaction is polled again after an interval that grows with its age:
+fresh transfers are checked every ``STATUS_POLL_MIN_INTERVAL`` seconds, old
+ones back off up to ``STATUS_POLL_MAX_INTERVAL``.
+
+Pending ids are read ``STATUS_POLL_BATCH_SIZE`` at a time in id order, each
+tick continuing after the last id of the previous one and wrapping around at
+the end, so a backlog of stuck transactions cannot keep newer ones from
+being polled.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import settings
+from app.core import metrics
+from app.models.transaction import Transaction, TxStatus
+from app.services.fireblocks import get_transaction
+from app.services.notifications import publish_transaction_changes
+from app.services.webhook_processor import (
+    TransactionUpdate,
+    apply_transaction_updates,
+    parse_transaction_event,
+)
+
+logger = logging.getLogger(__name__)
+
+PROVIDER = "fireblocks"
+
+_PENDING = (
+    Transaction.provider == PROVIDER,
+    Transaction.status == TxStatus.pending,
+    Transaction.provider_ref_id.is_not(None),
+)
+# Byte order, so the database pages ids in the order Python compares them
+_REF_ORDER = Transaction.provider_ref_id.collate("C")
+
+
+def poll_interval(age: float) -> float:
+    """Seconds to wait between polls of a transaction that is ``age`` seconds old."""
+    return min(
+        max(age / 10, settings.STATUS_POLL_MIN_INTERVAL),
+        settings.STATUS_POLL_MAX_INTERVAL,
+    )
+
+
+class StatusPoller:
+    """Remembers when each pending transaction was last polled."""
+
+    def __init__(self):
+        self._last_polled: dict[str, float] = {}
+        # Last id of the previous page; None starts again from the lowest id
+        self._cursor: str | None = None
+
+    def due(
+        self,
+        pending: dict[str, datetime],
+        now: datetime,
+        after: str | None = None,
+        upto: str | None = None,
+    ) -> list[str]:
+        """Return the ids in ``pending`` whose poll interval has elapsed.
+
+        ``pending`` holds every pending id in ``(after, upto]``, ``None``
+        leaving that end open.
+        """
+        clock = time.monotonic()
+        # Forget transactions in this range that are no longer pending
+        for ref in self._last_polled.keys() - pending.keys():
+            if (after is None or ref > after) and (upto is None or ref <= upto):
+                del self._last_polled[ref]
+        due = []
+        for ref, created_at in pending.items():
+            age = (now - created_at).total_seconds()
+            last = self._last_polled.get(ref)
+            if age < settings.STATUS_POLL_MIN_INTERVAL:
+                continue  # give the webhook a chance first
+            if last is None or clock - last >= poll_interval(age):
+                due.append(ref)
+        return due
+
+    async def _record_backlog(self, db: AsyncSession, now: datetime) -> None:
+        result = await db.execute(
+            select(
+                func.count(func.distinct(Transaction.provider_ref_id)),
+                func.min(Transaction.created_at),
+            ).where(*_PENDING)
+        )
+        count, oldest = result.one()
+        metrics.set_gauge("transactions_pending", count)
+        metrics.set_gauge(
+            "transactions_pending_oldest_seconds",
+            (now - oldest).total_seconds() if oldest is not None else 0,
+        )
+
+    async def _pending(self, db: AsyncSession) -> tuple[dict[str, datetime], str | None, str | None]:
+        """Next page of pending ids with their ages, and the id range it covers."""
+        query = select(Transaction.provider_ref_id, func.min(Transaction.created_at)).where(
+            *_PENDING
+        )
+        after = self._cursor
+        if after is not None:
+            query = query.where(_REF_ORDER > after)
+        result = await db.execute(
+            query.group_by(Transaction.provider_ref_id)
+            .order_by(_REF_ORDER)
+            .limit(settings.STATUS_POLL_BATCH_SIZE)
+        )
+        pending = {ref: created_at for ref, created_at in result.all()}
+        if len(pending) < settings.STATUS_POLL_BATCH_SIZE:
+            # Reached the end; the next tick starts over
+            self._cursor = upto = None
+        else:
+            self._cursor = upto = next(reversed(pending))
+        return pending, after, upto
+
+    async def _fetch(self, refs: list[str]) -> list[TransactionUpdate]:
+        semaphore = asyncio.Semaphore(max(settings.STATUS_POLL_CONCURRENCY, 1))
+
+        async def fetch(ref: str) -> TransactionUpdate:
+            async with semaphore:
+                return parse_transaction_event(await get_transaction(ref))
+
+        results = await asyncio.gather(*(fetch(ref) for ref in refs), return_exceptions=True)
+        updates = []
+        for ref, result in zip(refs, results):
+            if isinstance(result, Exception):
+                metrics.inc("status_poll_errors_total")
+                logger.warning("Could not poll Fireblocks transaction %s: %s", ref, result)
+                continue
+            updates.append(result)
+        return updates
+
+    async def poll(self, session_factory) -> int:
+        """Run one polling round and return how many transactions were resolved."""
+        async with session_factory() as db:
+            now = datetime.utcnow()
+            await self._record_backlog(db, now)
+            pending, after, upto = await self._pending(db)
+
+            refs = self.due(pending, now, after, upto)
+            if not refs:
+                return 0
+            clock = time.monotonic()
+            for ref in refs:
+                self._last_polled[ref] = clock
+
+            updates = await self._fetch(refs)
+            resolved = [u for u in updates if u.status is not None]
+            metrics.inc("status_polls_total", len(refs))
+            changed = await apply_transaction_updates(db, updates)
+            await db.commit()
+        publish_transaction_changes(changed)
+
+        for update in resolved:
+            self._last_polled.pop(update.provider_ref_id, None)
+            pending_for = (now - pending.get(update.provider_ref_id, now)).total_seconds()
+            metrics.inc("transaction_pending_seconds_sum", pending_for)
+            metrics.inc("transactions_resolved_by_poll_total")
+        return len(resolved)
+
+
+status_poller = StatusPoller()
@@ -0,0 +1,98 @@
+"""Local mirror of Fireblocks vault/asset state.
+
+Provisioning asks this table whether an asset is already activated in a
+vault and what its deposit address is, instead of reading the vault account
+from Fireblocks each time.  The mirror is fed by provisioning results, by
+``VAULT_ACCOUNT_ASSET_ADDED`` webhooks and by a periodic paginated sync; the
+provider is only read when an activation fails and the mirror may be stale.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core import metrics
+from app.models.vault_asset import VaultAsset
+from app.services.fireblocks import get_vault_accounts_page
+
+logger = logging.getLogger(__name__)
+
+
+async def known_vault_assets(db: AsyncSession, vault_id: str) -> dict[str, str | None]:
+    """Return ``{asset_id: address}`` for the assets mirrored for ``vault_id``."""
+    result = await db.execute(
+        select(VaultAsset.asset_id, VaultAsset.address).where(VaultAsset.vault_id == vault_id)
+    )
+    return {row.asset_id: row.address for row in result.all()}
+
+
+async def record_vault_assets(db: AsyncSession, rows: list[tuple[str, str, str | None]]) -> None:
+    """Upsert ``(vault_id, asset_id, address)`` rows into the mirror.
+
+    A ``None`` address never overwrites a known one.  The caller commits.
+    """
+    # One row per key: ON CONFLICT cannot touch the same row twice
+    latest: dict[tuple[str, str], str | None] = {}
+    for vault_id, asset_id, address in rows:
+        latest[(vault_id, asset_id)] = address or latest.get((vault_id, asset_id))
+    if not latest:
+        return
+    now = datetime.utcnow()
+    stmt = insert(VaultAsset).values(
+        [
+            {"vault_id": vault_id, "asset_id": asset_id, "address": address, "synced_at": now}
+            for (vault_id, asset_id), address in latest.items()
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_vault_assets_vault_asset",
+        set_={
+            "address": func.coalesce(stmt.excluded.address, VaultAsset.address),
+            "synced_at": stmt.excluded.synced_at,
+        },
+    )
+    await db.execute(stmt)
+
+
+async def record_webhook_event(db: AsyncSession, event_type: str, data: dict) -> bool:
+    """Apply a vault webhook to the mirror; returns whether the event was relevant."""
+    if event_type != "VAULT_ACCOUNT_ASSET_ADDED":
+        return False
+    vault_id = data.get("accountId") or data.get("vaultAccountId")
+    asset_id = data.get("assetId")
+    if not vault_id or not asset_id:
+        return False
+    await record_vault_assets(db, [(str(vault_id), asset_id, data.get("address"))])
+    return True
+
+
+async def sync_vault_assets(session_factory, page_size: int = 200) -> int:
+    """Walk every Fireblocks vault page by page and refresh the mirror.
+
+    Each page is written in one statement and committed on its own, so a
+    failure part-way keeps the pages already synced.  Returns the number of
+    vault/asset pairs seen.
+    """
+    seen = 0
+    after = None
+    async with session_factory() as db:
+        while True:
+            page, after = await get_vault_accounts_page(after, page_size)
+            rows = [
+                (vault_id, asset_id, None)
+                for vault_id, asset_ids in page.items()
+                for asset_id in asset_ids
+            ]
+            await record_vault_assets(db, rows)
+            await db.commit()
+            seen += len(rows)
+            if not after:
+                break
+    metrics.set_gauge("vault_assets_synced", seen)
+    logger.info("Synced %d vault assets from Fireblocks", seen)
+    return seen
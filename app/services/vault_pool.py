@@ -0,0 +1,200 @@
+"""Warm pool of Fireblocks vaults provisioned ahead of user onboarding.
+
+A background provisioner keeps ``VAULT_POOL_SIZE`` unclaimed vaults in the
+``vault_pool`` table, each with the ``VAULT_POOL_ASSETS`` already activated.
+Wallet creation claims one with a single ``UPDATE ... SKIP LOCKED`` instead of
+calling Fireblocks on the request path.
+
+A new vault is recorded before its assets are activated, so a failed
+activation is retried on the next refill instead of leaking the vault.  The
+shortfall is computed under an advisory lock, so workers refilling at the
+same time do not each add the missing vaults.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+
+from sqlalchemy import func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import settings
+from app.core import metrics
+from app.core.assets import ASSETS
+from app.database import advisory_xact_lock
+from app.models.vault_pool import PooledVault
+from app.services.fireblocks import create_vault_account, activate_vault_asset
+from app.services.vault_assets import record_vault_assets
+
+logger = logging.getLogger(__name__)
+
+
+async def claim_pooled_vault(db: AsyncSession, user_id):
+    """Atomically assign an unclaimed pooled vault to ``user_id``.
+
+    The claim is part of the caller's transaction, so it is rolled back with
+    it if the ``Vault`` row cannot be written.  Returns a row with
+    ``vault_id`` and ``assets``, or ``None`` when the pool is empty.
+    """
+    if settings.VAULT_POOL_SIZE <= 0:
+        return None
+
+    candidate = (
+        select(PooledVault.id)
+        .where(PooledVault.claimed_by.is_(None), PooledVault.ready)
+        .order_by(PooledVault.created_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        update(PooledVault)
+        .where(PooledVault.id == candidate)
+        .values(claimed_by=user_id, claimed_at=datetime.utcnow())
+        .returning(PooledVault.vault_id, PooledVault.assets)
+        .execution_options(synchronize_session=False)
+    )
+    pooled = result.first()
+    if pooled is None:
+        metrics.inc("vault_pool_misses_total")
+        logger.warning("Vault pool exhausted, provisioning on the request path")
+        return None
+
+    metrics.inc("vault_pool_claimed_total")
+    return pooled
+
+
+async def pooled_addresses(db: AsyncSession, vault_id: str) -> dict[str, str]:
+    """Return the pre-activated deposit addresses of a pooled vault by asset."""
+    result = await db.execute(
+        select(PooledVault.assets).where(PooledVault.vault_id == vault_id)
+    )
+    return result.scalar_one_or_none() or {}
+
+
+async def pooled_address(db: AsyncSession, vault_id: str, asset: str) -> str | None:
+    """Return the pre-activated deposit address of ``asset`` in a pooled vault."""
+    return (await pooled_addresses(db, vault_id)).get(asset)
+
+
+def validate_pool_assets() -> None:
+    """Raise ``ValueError`` when ``VAULT_POOL_ASSETS`` names an unknown asset."""
+    unknown = [asset for asset in settings.VAULT_POOL_ASSETS if asset not in ASSETS]
+    if unknown:
+        raise ValueError(f"Unknown VAULT_POOL_ASSETS: {', '.join(unknown)}")
+
+
+async def _add_pooled_vaults(db: AsyncSession, target: int) -> int:
+    """Record new vaults, assets not yet activated, until ``target`` are unclaimed."""
+    added = 0
+    while True:
+        # Committing ends the transaction, so the lock is taken again each time
+        await advisory_xact_lock(db, "vault_pool_refill")
+        result = await db.execute(
+            select(func.count())
+            .select_from(PooledVault)
+            .where(PooledVault.claimed_by.is_(None))
+        )
+        if result.scalar_one() >= target:
+            await db.commit()
+            return added
+        vault_data = await create_vault_account(f"pool-{uuid.uuid4().hex}")
+        db.add(
+            PooledVault(
+                vault_id=vault_data["vault_account_id"],
+                assets=dict.fromkeys(settings.VAULT_POOL_ASSETS),
+            )
+        )
+        await db.commit()
+        added += 1
+
+
+async def _activate_pending(db: AsyncSession) -> int:
+    """Activate the missing assets of pooled vaults that are not ready yet.
+
+    Returns how many vaults became ready.  A vault whose activation fails
+    keeps the addresses obtained so far and is retried on the next refill,
+    which is also when the remaining vaults are tried.
+    """
+    ready = 0
+    while True:
+        result = await db.execute(
+            select(PooledVault)
+            .where(PooledVault.claimed_by.is_(None), PooledVault.ready.is_(False))
+            .order_by(PooledVault.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        pooled = result.scalar_one_or_none()
+        if pooled is None:
+            return ready
+        assets = dict(pooled.assets)
+        # Assets added to VAULT_POOL_ASSETS since the vault was recorded
+        for asset in settings.VAULT_POOL_ASSETS:
+            assets.setdefault(asset, None)
+        missing = [asset for asset, address in assets.items() if address is None]
+        addresses = await asyncio.gather(
+            *(activate_vault_asset(pooled.vault_id, asset) for asset in missing),
+            return_exceptions=True,
+        )
+        failed = None
+        for asset, address in zip(missing, addresses):
+            if isinstance(address, Exception):
+                failed = address
+            else:
+                assets[asset] = address
+        pooled.assets = assets
+        pooled.ready = failed is None
+        await record_vault_assets(
+            db,
+            [(pooled.vault_id, asset, address) for asset, address in assets.items() if address],
+        )
+        await db.commit()
+        if failed is not None:
+            metrics.inc("vault_pool_refill_errors_total")
+            logger.error(
+                "Failed to activate assets of pooled vault %s",
+                pooled.vault_id,
+                exc_info=failed,
+            )
+            return ready
+        ready += 1
+
+
+async def refill_pool(session_factory) -> int:
+    """Top the pool back up to ``VAULT_POOL_SIZE`` and return how many became ready."""
+    target = settings.VAULT_POOL_SIZE
+    if target <= 0:
+        return 0
+
+    async with session_factory() as db:
+        result = await db.execute(
+            select(func.count())
+            .select_from(PooledVault)
+            .where(PooledVault.claimed_by.is_(None), PooledVault.ready)
+        )
+        available = result.scalar_one()
+        metrics.set_gauge("vault_pool_available", available)
+        if available < settings.VAULT_POOL_LOW_WATER:
+            metrics.inc("vault_pool_low_water_alerts_total")
+            logger.warning(
+                "Vault pool below low-water mark: %d available (low water %d)",
+                available,
+                settings.VAULT_POOL_LOW_WATER,
+            )
+
+        try:
+            await _add_pooled_vaults(db, target)
+        except Exception:
+            await db.rollback()
+            metrics.inc("vault_pool_refill_errors_total")
+            logger.exception("Failed to provision pooled vault")
+        # Also finishes vaults left pending by earlier failures
+        ready = await _activate_pending(db)
+        if ready:
+            metrics.inc("vault_pool_refilled_total", ready)
+            metrics.set_gauge("vault_pool_available", available + ready)
+        return ready
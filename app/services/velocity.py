@@ -0,0 +1,98 @@
+"""Seeding and upkeep of the in-memory velocity totals.
+
+:data:`app.core.velocity.velocity_limits` starts empty; the last day of
+withdrawals is loaded from ``transactions`` at startup, summed per user,
+asset and bucket by the database, so limits hold across restarts.
+:func:`recent_withdrawals` sums one user's withdrawals the same way when a
+request passes the in-memory check, so withdrawals made through other
+workers count too.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import case, func
+from sqlalchemy.future import select
+
+from app.core import metrics
+from app.core.velocity import WINDOWS, velocity_limits
+from app.database import advisory_xact_lock
+from app.models.transaction import Transaction, TxStatus, TxType
+
+logger = logging.getLogger(__name__)
+
+# Transaction types counted against withdrawal limits
+OUTFLOW_TYPES = (TxType.crypto_out, TxType.internal_out)
+_COUNTED = (
+    Transaction.type.in_(OUTFLOW_TYPES),
+    Transaction.status.notin_((TxStatus.failed, TxStatus.canceled)),
+)
+
+
+async def recent_withdrawals(db, user_id, asset: str) -> dict[str, Decimal]:
+    """What ``user_id`` withdrew of ``asset`` over each velocity window.
+
+    Takes an advisory lock held until the caller's transaction ends, so the
+    caller must write its withdrawal in that transaction: a concurrent check
+    in any worker waits for it to be committed or rolled back and then counts
+    it.
+    """
+    await advisory_xact_lock(db, f"velocity:{user_id}:{asset}")
+    now = datetime.utcnow()
+    sums = [
+        func.coalesce(
+            func.sum(
+                case(
+                    (Transaction.created_at >= now - timedelta(seconds=span), Transaction.amount),
+                    else_=0,
+                )
+            ),
+            0,
+        ).label(name)
+        for name, span in WINDOWS.items()
+    ]
+    result = await db.execute(
+        select(*sums).where(
+            Transaction.user_id == user_id,
+            Transaction.currency == asset,
+            Transaction.created_at >= now - timedelta(seconds=max(WINDOWS.values())),
+            *_COUNTED,
+        )
+    )
+    return dict(zip(WINDOWS, result.one()))
+
+
+async def load_velocity(session_factory) -> int:
+    """Seed the rolling totals with every counted withdrawal of the last day."""
+    if not velocity_limits.assets:
+        return 0
+    bucket = velocity_limits.bucket_seconds
+    since = datetime.utcnow() - timedelta(seconds=max(WINDOWS.values()))
+    # created_at is naive UTC, which is what extract(epoch) assumes
+    start = (func.floor(func.extract("epoch", Transaction.created_at) / bucket) * bucket).label(
+        "bucket"
+    )
+    async with session_factory() as db:
+        result = await db.execute(
+            select(Transaction.user_id, Transaction.currency, start, func.sum(Transaction.amount))
+            .where(
+                Transaction.created_at >= since,
+                *_COUNTED,
+                Transaction.currency.in_(velocity_limits.assets),
+            )
+            .group_by(Transaction.user_id, Transaction.currency, start)
+            .order_by(start)
+        )
+        rows = result.all()
+    for user_id, asset, bucket_start, total in rows:
+        velocity_limits.record(user_id, asset, total, float(bucket_start))
+    logger.info("Loaded %d velocity buckets", len(rows))
+    return len(rows)
+
+
+async def prune_velocity() -> None:
+    """Drop users whose withdrawals have all left the daily window."""
+    velocity_limits.prune()
+    metrics.set_gauge("velocity_tracked_keys", velocity_limits.tracked)
@@ -0,0 +1,227 @@
+"""Fast-path ingestion of Fireblocks webhooks.
+
+The route only verifies the signature and hands the raw body to
+:class:`WebhookIngestor`, so Fireblocks gets its acknowledgement without
+waiting on the database.  A single writer task drains the queue and writes
+events to ``webhook_events`` in multi-row inserts; redeliveries are dropped by
+the unique ``(provider, event_id)`` index.  Processing happens later, from the
+table.
+
+When the database rejects a batch, the writer retries it row by row and
+dead-letters (logs with the full payload and counts) the rows that still fail,
+so one malformed event cannot hold up the rest.  While the database is
+unreachable the batch is kept and retried as a whole.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import logging
+import time
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from app.config import settings
+from app.core import metrics
+from app.models.webhook_event import WebhookEvent
+
+try:
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding
+except ModuleNotFoundError:  # pragma: no cover - optional dependency
+    serialization = None
+
+logger = logging.getLogger(__name__)
+
+PROVIDER = "fireblocks"
+
+# Errors meaning the database could not be reached rather than a bad row
+_UNAVAILABLE = (OperationalError, InterfaceError, OSError, asyncio.TimeoutError)
+
+
+class WebhookQueueFullError(Exception):
+    """Raised when the ingestion queue cannot take another event."""
+
+
+_public_key = None
+_public_key_pem: str | None = None
+
+
+def _load_public_key():
+    global _public_key, _public_key_pem
+    pem = settings.FIREBLOCKS_WEBHOOK_PUBLIC_KEY
+    if pem != _public_key_pem:
+        _public_key = serialization.load_pem_public_key(pem.encode()) if pem else None
+        _public_key_pem = pem
+    return _public_key
+
+
+def verify_signature(body: bytes, signature: str | None) -> bool:
+    """Check the ``Fireblocks-Signature`` header (base64 RSA-SHA512 of the body).
+
+    Fails closed: without a configured key or the ``cryptography`` package
+    every event is rejected.
+    """
+    if not signature or serialization is None:
+        return False
+    key = _load_public_key()
+    if key is None:
+        return False
+    try:
+        key.verify(base64.b64decode(signature), body, padding.PKCS1v15(), hashes.SHA512())
+    except (InvalidSignature, ValueError):
+        return False
+    return True
+
+
+def event_row(body: bytes, payload: dict) -> dict:
+    """Build the ``webhook_events`` row for one delivery."""
+    data = payload.get("data") or {}
+    event_id = payload.get("id") or payload.get("eventId")
+    if not event_id:
+        # Older payloads carry no id; identical bodies are the same event.
+        event_id = hashlib.sha256(body).hexdigest()
+    provider_ref_id = data.get("id") if isinstance(data, dict) else None
+    return {
+        "provider": PROVIDER,
+        "event_id": str(event_id),
+        "event_type": payload.get("type") or "UNKNOWN",
+        "provider_ref_id": str(provider_ref_id) if provider_ref_id else None,
+        "payload": payload,
+    }
+
+
+class WebhookIngestor:
+    """Bounded in-process queue feeding a batching writer task."""
+
+    def __init__(self, maxsize: int | None = None):
+        self._maxsize = maxsize
+        self._queue: asyncio.Queue | None = None
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        # Created lazily so it binds to the running event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._maxsize or settings.WEBHOOK_QUEUE_SIZE)
+        return self._queue
+
+    def submit(self, body: bytes, payload: dict) -> None:
+        """Queue a verified event; never waits on the database."""
+        try:
+            self.queue.put_nowait(event_row(body, payload))
+        except asyncio.QueueFull:
+            metrics.inc("webhook_events_rejected_total")
+            raise WebhookQueueFullError("webhook queue is full") from None
+        metrics.inc("webhook_events_received_total")
+        metrics.set_gauge("webhook_queue_depth", self.queue.qsize())
+
+    async def _next_batch(self) -> list[dict]:
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + settings.WEBHOOK_FLUSH_INTERVAL
+        while len(batch) < settings.WEBHOOK_BATCH_SIZE:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _drain(self) -> list[dict]:
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return batch
+
+    async def write(self, session_factory, batch: list[dict]) -> int:
+        """Insert ``batch`` in one statement and return how many rows were new."""
+        # ON CONFLICT cannot touch the same row twice in one statement
+        rows = list({row["event_id"]: row for row in batch}.values())
+        stmt = (
+            insert(WebhookEvent)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["provider", "event_id"])
+            .returning(WebhookEvent.id)
+        )
+        async with session_factory() as db:
+            result = await db.execute(stmt)
+            written = len(result.all())
+            await db.commit()
+        metrics.inc("webhook_events_written_total", written)
+        metrics.inc("webhook_events_duplicate_total", len(batch) - written)
+        return written
+
+    async def write_each(self, session_factory, batch: list[dict]) -> int:
+        """Insert ``batch`` one row at a time, dead-lettering rows that fail.
+
+        Rows are removed from ``batch`` as they are handled, so if the database
+        becomes unreachable part-way only the unwritten rows are left in it.
+        """
+        written = 0
+        while batch:
+            row = batch[0]
+            try:
+                written += await self.write(session_factory, [row])
+            except _UNAVAILABLE:
+                raise
+            except Exception:
+                metrics.inc("webhook_events_dead_lettered_total")
+                logger.exception(
+                    "Dead-lettered webhook event %s (%s): %r",
+                    row["event_id"],
+                    row["event_type"],
+                    row["payload"],
+                )
+            batch.pop(0)
+        return written
+
+    async def _flush(self, session_factory, batch: list[dict]) -> None:
+        try:
+            await self.write(session_factory, batch)
+        except _UNAVAILABLE:
+            raise
+        except Exception:
+            # A single bad row fails the whole statement; find it row by row
+            metrics.inc("webhook_write_errors_total")
+            logger.exception("Failed to write %d webhook events; retrying one by one", len(batch))
+            await self.write_each(session_factory, batch)
+        batch.clear()
+
+    async def run(self, session_factory, retry_delay: float = 1.0) -> None:
+        """Writer loop: batch queued events into ``webhook_events`` until cancelled."""
+        batch: list[dict] = []
+        try:
+            while True:
+                if not batch:
+                    batch = await self._next_batch()
+                try:
+                    await self._flush(session_factory, batch)
+                except _UNAVAILABLE:
+                    # Keep the batch; Fireblocks has already been acknowledged
+                    metrics.inc("webhook_write_errors_total")
+                    logger.exception("Failed to write %d webhook events", len(batch))
+                    await asyncio.sleep(retry_delay)
+                    continue
+                metrics.set_gauge("webhook_queue_depth", self.queue.qsize())
+        except asyncio.CancelledError:
+            batch += self._drain()
+            if batch:
+                try:
+                    await self._flush(session_factory, batch)
+                except Exception:
+                    logger.exception("Dropped %d webhook events on shutdown", len(batch))
+            raise
+
+
+webhook_ingestor = WebhookIngestor()
@@ -0,0 +1,224 @@
+"""Apply stored Fireblocks webhooks to ``transactions``.
+
+Events written by :mod:`app.services.webhook_ingest` are drained in batches
+with ``FOR UPDATE SKIP LOCKED``, so several processors (tasks or API workers)
+can run side by side without taking the same rows.  All transaction changes
+of a batch are applied with one ``UPDATE ... FROM (VALUES ...)`` matched on
+``(provider, provider_ref_id)``, the ``ix_transactions_provider_ref`` index.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import Numeric, String, case, cast, column, func, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import settings
+from app.core import metrics
+from app.models.transaction import Transaction, TxStatus, TxType
+from app.models.webhook_event import WebhookEvent
+from app.services.deposits import Deposit, merge_deposit, parse_deposit_event, record_deposits
+from app.services.notifications import CHANGE_COLUMNS, publish_transaction_changes
+from app.services.partitions import lookup_bound, provider_created_at
+from app.services.vault_assets import record_webhook_event
+from app.services.webhook_ingest import PROVIDER
+
+logger = logging.getLogger(__name__)
+
+TRANSACTION_EVENTS = {"TRANSACTION_CREATED", "TRANSACTION_STATUS_UPDATED"}
+
+# Fireblocks transaction status -> our lifecycle; anything else stays pending
+STATUS_MAP = {
+    "COMPLETED": TxStatus.confirmed,
+    "FAILED": TxStatus.failed,
+    "REJECTED": TxStatus.failed,
+    "BLOCKED": TxStatus.failed,
+    "TIMEOUT": TxStatus.failed,
+    "CANCELLED": TxStatus.canceled,
+}
+
+
+@dataclass
+class TransactionUpdate:
+    """Latest known provider state of one Fireblocks transaction."""
+
+    provider_ref_id: str
+    status: TxStatus | None
+    tx_hash: str | None
+    fee: Decimal | None
+    created_at: datetime | None = None  # Fireblocks creation time
+
+
+def parse_transaction_event(data: dict) -> TransactionUpdate:
+    """Extract the fields we track from a ``TRANSACTION_*`` event payload."""
+    ref = data.get("id")
+    if not ref:
+        raise ValueError("transaction event without id")
+    fee = data.get("networkFee")
+    if fee is None:
+        fee = (data.get("feeInfo") or {}).get("networkFee")
+    try:
+        fee = Decimal(str(fee)) if fee not in (None, "") else None
+    except InvalidOperation:
+        raise ValueError(f"invalid network fee {fee!r}") from None
+    return TransactionUpdate(
+        provider_ref_id=str(ref),
+        status=STATUS_MAP.get(data.get("status")),
+        tx_hash=data.get("txHash") or None,
+        fee=fee,
+        created_at=provider_created_at(data),
+    )
+
+
+def _merge(old: TransactionUpdate | None, new: TransactionUpdate) -> TransactionUpdate:
+    # Events are applied in arrival order, but a final status is never undone
+    # by a late intermediate one.
+    if old is None:
+        return new
+    return TransactionUpdate(
+        provider_ref_id=new.provider_ref_id,
+        status=new.status or old.status,
+        tx_hash=new.tx_hash or old.tx_hash,
+        fee=new.fee if new.fee is not None else old.fee,
+        created_at=new.created_at or old.created_at,
+    )
+
+
+async def apply_transaction_updates(db: AsyncSession, updates: list[TransactionUpdate]) -> list:
+    """Apply ``updates`` in one statement and return the updated rows.
+
+    Only pending transactions change status.  When the final network fee is
+    known, outgoing crypto transfers move ``balance_after`` by the difference
+    from the fee estimated at submission (pro-rated for batched withdrawals).
+    """
+    if not updates:
+        return []
+    v = values(
+        column("ref", String),
+        column("status", String),
+        column("tx_hash", String),
+        column("fee", String),
+        name="v",
+    ).data(
+        [
+            (
+                u.provider_ref_id,
+                u.status.value if u.status else None,
+                u.tx_hash,
+                str(u.fee) if u.fee is not None else None,
+            )
+            for u in updates
+        ]
+    )
+    new_status = cast(v.c.status, Transaction.status.type)
+    # Rows of a batched withdrawal carry their share of the batch fee
+    fee_share = func.coalesce(cast(Transaction.meta["fee_share"].astext, Numeric(38, 18)), 1)
+    new_fee = cast(v.c.fee, Numeric(38, 18)) * fee_share
+    fee_changes = (new_fee.is_not(None)) & (Transaction.type == TxType.crypto_out)
+    stmt = (
+        update(Transaction)
+        .where(
+            Transaction.provider == PROVIDER,
+            Transaction.provider_ref_id == v.c.ref,
+        )
+        .values(
+            status=case(
+                (Transaction.status == TxStatus.pending, func.coalesce(new_status, Transaction.status)),
+                else_=Transaction.status,
+            ),
+            tx_hash=func.coalesce(v.c.tx_hash, Transaction.tx_hash),
+            balance_after=case(
+                (
+                    fee_changes,
+                    Transaction.balance_after + func.coalesce(Transaction.fee_amount, 0) - new_fee,
+                ),
+                else_=Transaction.balance_after,
+            ),
+            fee_amount=case((fee_changes, new_fee), else_=Transaction.fee_amount),
+            updated_at=datetime.utcnow(),
+        )
+        .returning(*CHANGE_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    since = lookup_bound(u.created_at for u in updates)
+    if since is not None:
+        stmt = stmt.where(Transaction.created_at >= since)
+    result = await db.execute(stmt)
+    return result.all()
+
+
+async def process_batch(db: AsyncSession, limit: int) -> int:
+    """Process up to ``limit`` unprocessed events and return how many were taken."""
+    result = await db.execute(
+        select(WebhookEvent)
+        .where(WebhookEvent.processed_at.is_(None))
+        .order_by(WebhookEvent.received_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    events = result.scalars().all()
+    if not events:
+        metrics.set_gauge("webhook_processing_lag_seconds", 0)
+        await db.rollback()
+        return 0
+
+    now = datetime.utcnow()
+    metrics.set_gauge(
+        "webhook_processing_lag_seconds",
+        (now - min(e.received_at for e in events)).total_seconds(),
+    )
+
+    updates: dict[str, TransactionUpdate] = {}
+    deposits: dict[str, Deposit] = {}
+    errors: dict = {}
+    for event in events:
+        data = (event.payload or {}).get("data") or {}
+        try:
+            if event.event_type in TRANSACTION_EVENTS:
+                parsed = parse_transaction_event(data)
+                ref = parsed.provider_ref_id
+                updates[ref] = _merge(updates.get(ref), parsed)
+                deposit = parse_deposit_event(data, parsed.status)
+                if deposit is not None:
+                    deposits[ref] = merge_deposit(deposits.get(ref), deposit)
+            else:
+                await record_webhook_event(db, event.event_type, data)
+        except (ValueError, TypeError, AttributeError) as exc:
+            errors[event.id] = str(exc)[:500]
+
+    # New deposits first, so later events in the same batch update them too
+    created = await record_deposits(db, list(deposits.values()))
+    changed = await apply_transaction_updates(db, list(updates.values()))
+    for event in events:
+        event.processed_at = now
+        event.processing_error = errors.get(event.id)
+    await db.commit()
+
+    # Rows updated in the same batch are reported once, in their final state
+    changed_ids = {row.id for row in changed}
+    publish_transaction_changes([r for r in created if r.id not in changed_ids] + changed)
+    metrics.inc("webhook_events_processed_total", len(events))
+    metrics.inc("webhook_events_failed_total", len(errors))
+    metrics.inc("transactions_updated_from_webhooks_total", len(changed))
+    return len(events)
+
+
+async def process_webhook_events(session_factory) -> int:
+    """Drain the backlog of unprocessed events; returns how many were handled."""
+    limit = max(settings.WEBHOOK_PROCESS_BATCH_SIZE, 1)
+    handled = 0
+    async with session_factory() as db:
+        while True:
+            try:
+                taken = await process_batch(db, limit)
+            except Exception:
+                await db.rollback()
+                metrics.inc("webhook_process_errors_total")
+                raise
+            handled += taken
+            if taken < limit:
+                return handled
@@ -0,0 +1,257 @@
+"""Batched external withdrawals.
+
+With ``WITHDRAWAL_BATCHING`` on, withdrawals of assets on networks that
+support multi-output transactions are not sent one by one.  The route records
+them as queued ``crypto_out`` rows (no ``provider_ref_id``,
+``meta["batch"] == "queued"``) and this job pays them together once the
+oldest has waited ``WITHDRAWAL_BATCH_WINDOW`` seconds or
+``WITHDRAWAL_BATCH_MAX_OUTPUTS`` are waiting.  A Fireblocks transaction has a
+single source, so a batch only combines withdrawals of one asset from one
+vault.  Every user has their own vault, so batches only ever combine one
+user's own withdrawals; there is no omnibus vault to pay several users from,
+and moving funds into one would itself cost an on-chain transaction per user.
+
+Batches are paid in two steps so a retry can never pay twice: rows are first
+claimed under a new ``group_id`` (``"submitting"``) and committed, then the
+batch is submitted with the ``group_id`` as external transaction id, which
+Fireblocks accepts only once.  Each row then gets the provider id and its
+amount-weighted share of the fee (``meta["fee_share"]``), which the webhook
+processor also applies to the final fee.
+
+A batch whose submission fails without a definite rejection keeps its
+``group_id`` and is retried with exponential backoff (``meta["attempts"]``,
+``meta["retry_at"]``), so other batches go ahead meanwhile.  After
+``WITHDRAWAL_BATCH_MAX_ATTEMPTS`` it is parked as ``"stalled"`` for an
+operator to reconcile against Fireblocks by its external id; its amounts stay
+reserved because the transfer may have gone out.
+"""
+from __future__ import annotations
+
+import logging
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import Float, cast, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import settings
+from app.core import metrics
+from app.core.assets import ASSETS
+from app.database import advisory_xact_lock
+from app.models.transaction import Transaction, TxStatus, TxType
+from app.models.wallet import Wallet
+from app.services.fee_engine import fee_engine
+from app.services.fireblocks import create_batch_transfer
+from app.services.notifications import publish_transaction_changes
+
+logger = logging.getLogger(__name__)
+
+# Networks where one transaction can pay several destinations
+MULTI_OUTPUT_NETWORKS = {"BTC"}
+
+QUEUED = "queued"
+SUBMITTING = "submitting"
+SUBMITTED = "submitted"
+REJECTED = "rejected"
+STALLED = "stalled"
+
+_LOCK = "withdrawal_batches"
+
+# Upper bound on the wait between retries of one batch, in seconds
+_MAX_RETRY_DELAY = 900
+
+
+def supports_batching(asset: str) -> bool:
+    meta = ASSETS.get(asset)
+    return (
+        settings.WITHDRAWAL_BATCHING
+        and meta is not None
+        and meta.network in MULTI_OUTPUT_NETWORKS
+    )
+
+
+def _in_state(state: str) -> tuple:
+    return (
+        Transaction.type == TxType.crypto_out,
+        Transaction.status == TxStatus.pending,
+        Transaction.provider_ref_id.is_(None),
+        Transaction.meta["batch"].astext == state,
+    )
+
+
+async def queued_amount(db: AsyncSession, wallet_id) -> Decimal:
+    """Total of the wallet's outgoing transfers not yet submitted to the provider."""
+    result = await db.execute(
+        select(func.coalesce(func.sum(Transaction.amount), 0)).where(
+            Transaction.wallet_id == wallet_id,
+            Transaction.type.in_((TxType.crypto_out, TxType.internal_out)),
+            Transaction.status == TxStatus.pending,
+            Transaction.provider_ref_id.is_(None),
+        )
+    )
+    return Decimal(result.scalar_one())
+
+
+def plan_batches(rows, now: datetime, window: float, max_outputs: int) -> list[list]:
+    """Split queued ``(transaction, vault_id)`` rows into batches that are due.
+
+    Rows are grouped by (asset, vault) in queue order; a chunk of
+    ``max_outputs`` is due when full or when its oldest row has waited
+    ``window`` seconds.
+    """
+    groups: dict[tuple, list] = defaultdict(list)
+    for tx, vault_id in rows:
+        groups[(tx.currency, vault_id)].append((tx, vault_id))
+    batches = []
+    for members in groups.values():
+        for start in range(0, len(members), max_outputs):
+            chunk = members[start : start + max_outputs]
+            oldest = chunk[0][0].created_at
+            if len(chunk) >= max_outputs or (now - oldest).total_seconds() >= window:
+                batches.append(chunk)
+    return batches
+
+
+async def claim_batches(db: AsyncSession) -> int:
+    """Assign a ``group_id`` to every due batch of queued withdrawals."""
+    await advisory_xact_lock(db, _LOCK)
+    result = await db.execute(
+        select(Transaction, Wallet.vault_id)
+        .join(Wallet, Wallet.id == Transaction.wallet_id)
+        .where(*_in_state(QUEUED))
+        .order_by(Transaction.created_at)
+    )
+    rows = result.all()
+    metrics.set_gauge("withdrawal_queue_depth", len(rows))
+    batches = plan_batches(
+        rows,
+        datetime.utcnow(),
+        settings.WITHDRAWAL_BATCH_WINDOW,
+        max(settings.WITHDRAWAL_BATCH_MAX_OUTPUTS, 1),
+    )
+    for batch in batches:
+        group_id = uuid.uuid4()
+        for tx, vault_id in batch:
+            tx.group_id = group_id
+            tx.meta = {**(tx.meta or {}), "batch": SUBMITTING, "vault_id": vault_id}
+    await db.commit()
+    return len(batches)
+
+
+def _fee_saved(txs: list[Transaction], fee: Decimal) -> Decimal | None:
+    """Medium fee of paying each row alone minus the batch fee, when known."""
+    standalone = Decimal("0")
+    for tx in txs:
+        quote = fee_engine.quote(tx.currency, tx.amount, tx.address_to)
+        if quote is None:
+            return None
+        standalone += Decimal(quote["medium"])
+    return standalone - fee
+
+
+def _retry_later(txs: list[Transaction], group_id, exc: Exception) -> None:
+    """Back the batch off after an unclear failure, or park it after too many."""
+    attempts = int(txs[0].meta.get("attempts", 0)) + 1
+    if attempts >= settings.WITHDRAWAL_BATCH_MAX_ATTEMPTS:
+        for tx in txs:
+            tx.meta = {**tx.meta, "batch": STALLED, "attempts": attempts}
+        metrics.inc("withdrawal_batches_stalled_total")
+        logger.error(
+            "Withdrawal batch %s stalled after %d attempts; reconcile it by external id: %s",
+            group_id,
+            attempts,
+            exc,
+        )
+        return
+    delay = min(settings.WITHDRAWAL_BATCH_INTERVAL * 2**attempts, _MAX_RETRY_DELAY)
+    for tx in txs:
+        tx.meta = {**tx.meta, "attempts": attempts, "retry_at": time.time() + delay}
+    metrics.inc("withdrawal_batch_retries_total")
+    logger.warning(
+        "Withdrawal batch %s failed (attempt %d), retrying in %.0fs: %s",
+        group_id,
+        attempts,
+        delay,
+        exc,
+    )
+
+
+async def submit_next_batch(db: AsyncSession) -> bool:
+    """Submit the oldest claimed batch that is not backing off; returns whether there was one."""
+    await advisory_xact_lock(db, _LOCK)
+    retry_at = cast(Transaction.meta["retry_at"].astext, Float)
+    result = await db.execute(
+        select(Transaction.group_id)
+        .where(*_in_state(SUBMITTING), or_(retry_at.is_(None), retry_at <= time.time()))
+        .order_by(Transaction.created_at)
+        .limit(1)
+    )
+    group_id = result.scalar_one_or_none()
+    if group_id is None:
+        await db.rollback()
+        return False
+    result = await db.execute(
+        select(Transaction)
+        .where(*_in_state(SUBMITTING), Transaction.group_id == group_id)
+        .order_by(Transaction.created_at)
+    )
+    txs = result.scalars().all()
+
+    try:
+        asset, vault_id = txs[0].currency, txs[0].meta["vault_id"]
+        transfer = await create_batch_transfer(
+            vault_id,
+            asset,
+            [(tx.address_to, format(tx.amount, "f")) for tx in txs],
+            str(group_id),
+        )
+    except Exception as exc:
+        status = getattr(exc, "status", None)
+        if status is None or status == 429 or status >= 500:
+            # Unclear outcome: retried with the same external id after a backoff
+            _retry_later(txs, group_id, exc)
+            await db.commit()
+            return True
+        for tx in txs:
+            tx.status = TxStatus.failed
+            tx.description = f"Batch rejected: {exc}"[:255]
+            tx.meta = {**tx.meta, "batch": REJECTED}
+        await db.commit()
+        metrics.inc("withdrawal_batches_rejected_total")
+        publish_transaction_changes(txs)
+        logger.warning("Withdrawal batch %s rejected: %s", group_id, exc)
+        return True
+
+    fee = Decimal(transfer.get("fee") or "0")
+    total = sum((tx.amount for tx in txs), Decimal("0"))
+    for tx in txs:
+        share = tx.amount / total
+        tx.provider_ref_id = transfer.get("id")
+        tx.fee_amount = fee * share
+        tx.balance_after = tx.balance_after - tx.fee_amount
+        tx.meta = {**tx.meta, "batch": SUBMITTED, "fee_share": str(share), "batch_size": len(txs)}
+    await db.commit()
+
+    metrics.inc("withdrawal_batches_total")
+    metrics.inc("withdrawal_batch_outputs_total", len(txs))
+    saved = _fee_saved(txs, fee)
+    if saved is not None:
+        metrics.inc(f"withdrawal_batch_fee_saved_{asset}", float(saved))
+    publish_transaction_changes(txs)
+    return True
+
+
+async def process_withdrawal_batches(session_factory) -> int:
+    """Claim due batches and submit every claimed one that is not backing off."""
+    async with session_factory() as db:
+        await claim_batches(db)
+    submitted = 0
+    while True:
+        async with session_factory() as db:
+            if not await submit_next_batch(db):
+                return submitted
+        submitted += 1
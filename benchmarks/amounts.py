@@ -0,0 +1,73 @@
+"""Compare Decimal and Amount arithmetic on the withdrawal hot path.
+
+Replays what an external withdrawal does with its amounts: read the request
+amount, the provider balance and the provider fee, compute the balance
+after the transfer and hand ``Decimal`` values to the database.  The
+Decimal variant constructs each value where it is used, as the route did;
+the Amount variant parses once at the schema boundary and converts only at
+the database boundary.  A second pair converts human amounts to base units
+for the asset with the most decimals.  No database or network is needed::
+
+    python -m benchmarks.amounts --iterations 200000
+
+On CPython the C ``decimal`` module wins both pairs (roughly 1.5 us against
+10 us per withdrawal here): pure-Python integer arithmetic does not
+outrun it.  Amount buys exact, validated amounts, not speed.
+"""
+import argparse
+import time
+from decimal import Decimal
+
+from app.core.amounts import Amount
+
+AMOUNT = "0.00123456"
+BALANCE = "1.23456789"
+FEE = 0.0000141
+DECIMALS = 18
+
+
+def decimal_withdrawal():
+    fee = Decimal(str(FEE))
+    amount_dec = Decimal(AMOUNT)
+    balance_after = Decimal(BALANCE) - amount_dec - fee
+    return Decimal(AMOUNT), fee, balance_after
+
+
+def amount_withdrawal(amount=Amount.parse(AMOUNT, 8)):
+    fee = Amount.parse(FEE)
+    balance_after = Amount.parse(BALANCE) - amount - fee
+    return amount.decimal, fee.decimal, balance_after.decimal
+
+
+def decimal_base_units():
+    return int(Decimal(AMOUNT) * (Decimal(10) ** DECIMALS))
+
+
+def amount_base_units():
+    return Amount.parse(AMOUNT, DECIMALS).units
+
+
+def timed(fn, iterations: int, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return best / iterations * 1e9
+
+
+def main(iterations: int) -> None:
+    print(f"{'path':>12} {'Decimal ns':>12} {'Amount ns':>12}")
+    for name, old, new in [
+        ("withdrawal", decimal_withdrawal, amount_withdrawal),
+        ("base units", decimal_base_units, amount_base_units),
+    ]:
+        print(f"{name:>12} {timed(old, iterations):>12.0f} {timed(new, iterations):>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+    main(args.iterations)
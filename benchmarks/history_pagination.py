@@ -0,0 +1,97 @@
+"""Compare keyset and OFFSET paging of transaction history.
+
+Seeds one user with ``--rows`` transactions (one million by default) in the
+database configured by the usual ``POSTGRES_*`` settings, then times a page
+read at increasing depths with both strategies.  Run against a scratch
+database with migrations applied::
+
+    python -m benchmarks.history_pagination --rows 1000000
+
+Pass ``--keep`` to leave the seeded rows in place for repeated runs.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from sqlalchemy import text
+
+from app.database import AsyncSessionLocal
+from app.models.transaction import Transaction
+from app.services.history import DEFAULT_FIELDS, fetch_page, history_query
+
+SEED_SQL = """
+INSERT INTO transactions (id, user_id, provider, type, status, amount, currency,
+                          created_at, updated_at, meta)
+SELECT gen_random_uuid(), :user_id, 'system', 'crypto_in', 'confirmed',
+       (g % 1000) / 100.0, 'BTC',
+       now() - make_interval(secs => g), now() - make_interval(secs => g), '{}'
+FROM generate_series(1, :rows) AS g
+"""
+
+
+async def seed(db, rows: int) -> uuid.UUID:
+    user_id = uuid.uuid4()
+    await db.execute(
+        text(
+            "INSERT INTO users (id, email, password_hash, privacy_id, has_vault) "
+            "VALUES (:id, :email, 'x', :privacy_id, false)"
+        ),
+        {"id": user_id, "email": f"bench-{user_id}@example.com", "privacy_id": user_id.hex[:10]},
+    )
+    await db.execute(text(SEED_SQL), {"user_id": user_id, "rows": rows})
+    await db.commit()
+    await db.execute(text("ANALYZE transactions"))
+    return user_id
+
+
+async def timed(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+async def main(rows: int, page: int, keep: bool) -> None:
+    fields = list(DEFAULT_FIELDS)
+    async with AsyncSessionLocal() as db:
+        user_id = await seed(db, rows)
+        print(f"seeded {rows} transactions for user {user_id}")
+        print(f"{'depth':>10} {'offset ms':>12} {'keyset ms':>12}")
+        try:
+            depth, cursor = 0, None
+            for target in [0, 1_000, 10_000, 100_000, rows // 2, rows - page]:
+                # Walk the cursor to the target depth, a page at a time
+                while depth < target:
+                    step = min(1000, target - depth)
+                    _, cursor = await fetch_page(
+                        db, user_id, fields=fields, cursor=cursor, limit=step
+                    )
+                    depth += step
+
+                async def offset_page(offset=target):
+                    stmt = history_query(user_id, fields).offset(offset).limit(page)
+                    (await db.execute(stmt)).all()
+
+                async def keyset_page(cursor=cursor):
+                    await fetch_page(db, user_id, fields=fields, cursor=cursor, limit=page)
+
+                print(f"{target:>10} {await timed(offset_page):>12.2f} {await timed(keyset_page):>12.2f}")
+        finally:
+            if not keep:
+                await db.execute(
+                    Transaction.__table__.delete().where(Transaction.user_id == user_id)
+                )
+                await db.execute(text("DELETE FROM users WHERE id = :id"), {"id": user_id})
+                await db.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.page, args.keep))
@@ -0,0 +1,40 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app.core.addresses import base58check_payload, segwit_program
+from app.core.assets import is_btc_main, is_btc_test, is_tron, validate_destinations
+
+
+def test_bech32_and_bech32m_checksums():
+    # BIP-173 / BIP-350 test vectors
+    assert segwit_program("bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4", "bc")[0] == 0
+    assert segwit_program("BC1QW508D6QEJXTDG4Y5R3ZARVARY0C5XW7KV8F3T4", "bc") is not None
+    taproot = "bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqzk5jj0"
+    assert segwit_program(taproot, "bc")[0] == 1
+
+    assert segwit_program("bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t5", "bc") is None
+    # Version 1 with a bech32 (not bech32m) checksum
+    assert segwit_program("bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqh2y7hd", "bc") is None
+    assert segwit_program("tb1qw508d6qejxtdg4y5r3zarvary0c5xw7kxpjzsx", "bc") is None
+
+
+def test_base58check_addresses():
+    assert base58check_payload("1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN2")[0] == 0x00
+    assert base58check_payload("1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN3") is None
+    assert is_btc_main("3J98t1WpEZ73CNmQviecrnyiWrnqRhWNLy")
+    assert not is_btc_test("3J98t1WpEZ73CNmQviecrnyiWrnqRhWNLy")
+    assert is_tron("TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU7")
+    assert not is_tron("TLa2f6VPqDgRE67v1736s7bJ8Ray5wYjU8")
+
+
+def test_batch_validation_keeps_request_order():
+    addresses = [
+        "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4",
+        "not an address",
+        "1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN3",
+        "1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN2",
+    ]
+    assert validate_destinations("BTC", addresses) == [True, False, False, True]
+    assert validate_destinations("BTC", addresses * 2) == [True, False, False, True] * 2
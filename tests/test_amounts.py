@@ -0,0 +1,53 @@
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app.core.amounts import Amount
+from app.core.assets import base_amount_from_human, human_amount_from_base
+
+
+def test_parse_is_exact_and_arithmetic_does_not_drift():
+    assert Amount.parse("0.1") + Amount.parse("0.2") == Amount.parse("0.3")
+    assert Amount.parse(0.1) + Amount.parse(0.2) == Decimal("0.3")
+    assert Amount.parse("1.50").units == 150
+    assert Amount.parse(Decimal("-1.5E+3")) == -1500
+    assert Amount.parse("1.41e-05") == Amount.parse("0.0000141")
+    assert Decimal("2") - Amount.parse("0.5") == Amount.parse("1.5")
+    assert str(Amount.parse("100.2300")) == "100.23"
+    assert str(-Amount.parse("0.05")) == "-0.05"
+    assert Amount.parse("12345678901234567890.123456789012345678").decimal == Decimal(
+        "12345678901234567890.123456789012345678"
+    )
+
+
+@pytest.mark.parametrize("value", ["", ".", "abc", "1_0", "١", "1e_5", "nan", "inf", True, None])
+def test_malformed_amounts_are_rejected(value):
+    with pytest.raises(ValueError):
+        Amount.parse(value)
+
+
+def test_rescale_refuses_to_drop_digits():
+    assert Amount.parse("1.5", 8).units == 150_000_000
+    with pytest.raises(ValueError):
+        Amount.parse("0.000000001", 8)
+    assert base_amount_from_human("0.00000001", 8) == 1
+    assert human_amount_from_base(123_000_000, 8) == "1.23"
+
+
+def test_schema_parses_once_and_serialises_to_string():
+    pytest.importorskip("pydantic")
+    from pydantic import ValidationError
+
+    from app.schemas.wallet import WithdrawalRequest
+
+    req = WithdrawalRequest.model_validate_json('{"asset": "BTC", "amount": 0.1, "address": "x"}')
+    assert req.amount == Amount(10_000_000, 8)
+    assert req.model_dump(mode="json")["amount"] == "0.1"
+    with pytest.raises(ValidationError):
+        WithdrawalRequest(asset="BTC", amount="0.000000001", address="x")
+    with pytest.raises(ValidationError):
+        WithdrawalRequest(asset="BTC", amount="0", address="x")
@@ -0,0 +1,105 @@
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+pytest.importorskip("sqlalchemy")
+
+
+def make_records(n, user_id):
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "amount": "1.000000000000000001",
+            "created_at": (start + timedelta(hours=i)).isoformat(),
+        }
+        for i in range(n)
+    ]
+
+
+def test_archive_round_trip_by_id_and_time_range(tmp_path, monkeypatch):
+    from app.config import settings
+    from app.services import archive
+
+    monkeypatch.setattr(settings, "ARCHIVE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "ARCHIVE_BLOCK_RECORDS", 10)
+    user_id = str(uuid.uuid4())
+    records = make_records(35, user_id)
+
+    path = archive.write_archive(str(tmp_path), archive.SOURCES["transactions"], records)
+    assert os.path.exists(path + archive.MANIFEST_SUFFIX)
+    manifest = archive.archive_index.manifests("transactions")[0]
+    assert [b["count"] for b in manifest["blocks"]] == [10, 10, 10, 5]
+
+    assert archive.find_archived("transactions", records[27]["id"]) == records[27]
+    assert archive.find_archived("transactions", uuid.uuid4()) is None
+    assert archive.archive_index.manifests("webhook_events") == []
+
+    found = archive.scan_archived(
+        "transactions", datetime(2024, 1, 1, 5), datetime(2024, 1, 1, 12)
+    )
+    assert found == records[5:12]
+    limited = archive.scan_archived(
+        "transactions",
+        datetime(2024, 1, 1),
+        datetime(2024, 1, 3),
+        predicate=lambda r: r["user_id"] == user_id,
+        limit=3,
+    )
+    assert limited == records[:3]
+
+
+def test_aware_bounds_are_converted_to_utc(tmp_path, monkeypatch):
+    from app.config import settings
+    from app.services import archive
+
+    monkeypatch.setattr(settings, "ARCHIVE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "ARCHIVE_BLOCK_RECORDS", 4)
+    records = make_records(10, str(uuid.uuid4()))
+    archive.write_archive(str(tmp_path), archive.SOURCES["transactions"], records)
+
+    plus_two = timezone(timedelta(hours=2))
+    found = archive.scan_archived(
+        "transactions",
+        datetime(2024, 1, 1, 5, tzinfo=plus_two),
+        datetime(2024, 1, 1, 9, tzinfo=plus_two),
+    )
+    assert found == records[3:7]
+
+
+def test_owner_scan_reads_only_the_owners_blocks(tmp_path, monkeypatch):
+    from app.config import settings
+    from app.services import archive
+
+    monkeypatch.setattr(settings, "ARCHIVE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "ARCHIVE_BLOCK_RECORDS", 5)
+    alice, bob = str(uuid.uuid4()), str(uuid.uuid4())
+    records = make_records(20, bob)
+    for n in (3, 17):
+        records[n]["user_id"] = alice
+    archive.write_archive(str(tmp_path), archive.SOURCES["transactions"], records)
+
+    read = []
+    read_blocks = archive._read_blocks
+
+    def tracking_read_blocks(manifest, blocks):
+        read.extend(block["offset"] for block in blocks)
+        return read_blocks(manifest, blocks)
+
+    monkeypatch.setattr(archive, "_read_blocks", tracking_read_blocks)
+    found = archive.scan_archived(
+        "transactions", datetime(2024, 1, 1), datetime(2024, 1, 3), owner=alice
+    )
+
+    assert found == [records[3], records[17]]
+    blocks = archive.archive_index.manifests("transactions")[0]["blocks"]
+    assert read == [blocks[0]["offset"], blocks[3]["offset"]]
+    assert archive.scan_archived(
+        "transactions", datetime(2024, 1, 1), datetime(2024, 1, 3), owner=uuid.uuid4()
+    ) == []
@@ -0,0 +1,82 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app.core import assets
+
+SOL = {
+    "symbol": "SOL",
+    "network": "SOL",
+    "decimals": 9,
+    "native": True,
+    "size_model": {"base_size": 1},
+}
+
+
+@pytest.fixture
+def registry_file(tmp_path):
+    path = tmp_path / "assets.json"
+
+    def write(entries):
+        path.write_text(json.dumps(entries))
+        return str(path)
+
+    yield write
+    assets.reload_assets("")
+
+
+def test_reload_swaps_in_a_new_snapshot(registry_file):
+    before = assets.ASSETS.snapshot()
+    count = assets.reload_assets(registry_file({**assets.BUILTIN_ASSETS, "SOL": SOL}))
+
+    assert count == len(assets.BUILTIN_ASSETS) + 1
+    assert assets.get_asset("SOL").decimals == 9
+    assert assets.get_asset("SOL").size_model.base_size == 1
+    assert assets.ASSETS["BTC"].size_model.max_inputs == 20
+    assert assets.ASSETS["BTC"].address_validator is assets.is_btc_main
+    # Holders of the old snapshot keep a consistent view
+    assert "SOL" not in before
+    with pytest.raises(TypeError):
+        assets.ASSETS.snapshot()["DOGE"] = SOL
+
+
+def test_a_bad_registry_keeps_the_current_assets(registry_file):
+    current = assets.ASSETS.snapshot()
+
+    with pytest.raises(ValueError, match="SOL"):
+        assets.reload_assets(registry_file({"SOL": {**SOL, "validator": "sol"}}))
+    with pytest.raises(ValueError, match="decimals"):
+        assets.reload_assets(registry_file({"SOL": {**SOL, "decimals": "9"}}))
+    with pytest.raises(ValueError, match="network"):
+        assets.reload_assets(registry_file({"SOL": {"symbol": "SOL", "decimals": 9, "native": True}}))
+    # A new network cannot be quoted without a size model
+    with pytest.raises(ValueError, match="size_model"):
+        assets.reload_assets(registry_file({"SOL": {**SOL, "size_model": None}}))
+    bad_model = {"base_size": 1, "input_amount": "x"}
+    with pytest.raises(ValueError, match="input_amount"):
+        assets.reload_assets(registry_file({"SOL": {**SOL, "size_model": bad_model}}))
+    # Tokens must say which native asset pays their fees
+    usdc = {**SOL, "symbol": "USDC", "native": False}
+    with pytest.raises(ValueError, match="fee_asset"):
+        assets.reload_assets(registry_file({"SOL": SOL, "USDC_SOL": usdc}))
+    with pytest.raises(ValueError, match="fee_asset"):
+        assets.reload_assets(
+            registry_file({"SOL": SOL, "USDC_SOL": {**usdc, "fee_asset": "USDC_SOL"}})
+        )
+
+    assert assets.ASSETS.snapshot() is current
+
+
+def test_reload_forgets_cached_validation_results(registry_file):
+    address = "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4"
+    assert assets.validate_destinations("BTC", [address]) == [True]
+
+    assets.reload_assets(registry_file({"BTC": {**assets.BUILTIN_ASSETS["BTC"], "validator": "eth"}}))
+
+    assert assets.validate_destinations("BTC", [address]) == [False]
+    with pytest.raises(ValueError):
+        assets.get_asset("ETH")
@@ -0,0 +1,89 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+pytest.importorskip("sqlalchemy")
+
+
+class DummyStream:
+    def __init__(self, rows, size):
+        self.rows = rows
+        self.size = size
+
+    async def partitions(self):
+        for i in range(0, len(self.rows), self.size):
+            yield self.rows[i : i + self.size]
+
+
+class DummySession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statement = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def stream(self, stmt):
+        self.statement = stmt
+        return DummyStream(self.rows, 2)
+
+
+def collect(rows, fmt, compress):
+    from app.services.export import export_transactions
+
+    db = DummySession(rows)
+
+    async def run():
+        return [
+            chunk
+            async for chunk in export_transactions(
+                lambda: db, uuid.uuid4(), ["amount", "currency"], fmt, compress
+            )
+        ]
+
+    chunks = asyncio.run(run())
+    return db, b"".join(chunks), len(chunks)
+
+
+def make_rows(n):
+    return [
+        (Decimal("12345678901234567890.000000000000000001"), "BTC", datetime(2025, 1, 1), uuid.uuid4())
+        for _ in range(n)
+    ]
+
+
+def test_csv_export_streams_chunks_with_exact_decimals():
+    db, body, chunks = collect(make_rows(5), "csv", False)
+    assert chunks == 3  # one per cursor partition
+    lines = list(csv.reader(io.StringIO(body.decode())))
+    assert lines[0] == ["amount", "currency"]
+    assert lines[1:] == [["12345678901234567890.000000000000000001", "BTC"]] * 5
+    assert db.statement.get_execution_options()["yield_per"] > 0
+    assert "ORDER BY transactions.created_at, transactions.id" in str(db.statement)
+
+
+def test_ndjson_export_gzip():
+    _, body, _ = collect(make_rows(3), "ndjson", True)
+    lines = gzip.decompress(body).decode().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"amount": "12345678901234567890.000000000000000001", "currency": "BTC"}
+    ] * 3
+
+
+def test_empty_csv_export_has_header():
+    _, body, _ = collect([], "csv", False)
+    assert body.decode().strip() == "amount,currency"
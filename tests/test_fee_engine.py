@@ -0,0 +1,117 @@
+import asyncio
+import importlib
+import os
+import sys
+import types
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+BTC_ADDR = "tb1qqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqq0l98cr"
+ETH_ADDR = "0x" + "ab" * 20
+
+
+def load_engine(monkeypatch, responses):
+    """Import ``fee_engine`` against a stubbed ``estimate_network_fee``."""
+    fireblocks_mod = types.ModuleType("app.services.fireblocks")
+    calls = []
+
+    async def estimate_network_fee(asset):
+        calls.append(asset)
+        if asset not in responses:
+            raise RuntimeError("unsupported")
+        return responses[asset]
+
+    fireblocks_mod.estimate_network_fee = estimate_network_fee
+    monkeypatch.setitem(sys.modules, "app.services.fireblocks", fireblocks_mod)
+    monkeypatch.delitem(sys.modules, "app.services.fee_engine", raising=False)
+    module = importlib.import_module("app.services.fee_engine")
+    monkeypatch.delitem(sys.modules, "app.services.fee_engine")
+    return module, calls
+
+
+def levels(key, low, medium, high):
+    return {"low": {key: low}, "medium": {key: medium}, "high": {key: high}}
+
+
+def test_quotes_are_served_from_the_refreshed_table(monkeypatch):
+    module, calls = load_engine(
+        monkeypatch,
+        {
+            "BTC_TEST": levels("feePerByte", "10", "20", "40"),
+            "ETH": levels("networkFee", "0.0004", "0.0006", "0.001"),
+        },
+    )
+    engine = module.FeeEngine()
+    asyncio.run(engine.refresh())
+    assert len(calls) == len(module.ASSETS)
+
+    # 141 vbytes at 10/20/40 sat per byte
+    assert engine.quote("BTC_TEST", "0.005", BTC_ADDR) == {
+        "low": "0.0000141",
+        "medium": "0.0000282",
+        "high": "0.0000564",
+    }
+    # Two extra inputs of 68 vbytes each
+    assert engine.quote("BTC_TEST", "0.025", BTC_ADDR)["low"] == "0.0000277"
+    assert engine.quote("ETH", "5", ETH_ADDR) == {
+        "low": "0.0004",
+        "medium": "0.0006",
+        "high": "0.001",
+    }
+    assert len(calls) == len(module.ASSETS)
+
+
+def test_token_fees_keep_the_fee_assets_precision(monkeypatch):
+    from app.core.fee_history import FeeHistory
+
+    module, _ = load_engine(
+        monkeypatch,
+        {"USDT_ERC20": levels("networkFee", "0.000123456789", "0.0002", "0.0003")},
+    )
+    history = FeeHistory()
+    monkeypatch.setattr(module, "fee_history", history)
+    engine = module.FeeEngine()
+    asyncio.run(engine.refresh())
+
+    # Paid in ETH, so not rounded to USDT's 6 decimals
+    assert engine.quote("USDT_ERC20", "100", ETH_ADDR)["low"] == "0.000123456789"
+    monkeypatch.setattr(module.settings, "FEE_HISTORY_MIN_SAMPLES", 1)
+    assert engine.suggested("USDT_ERC20").fees["low"] == Decimal("0.0002")
+
+
+def test_unusual_or_stale_requests_fall_back(monkeypatch):
+    module, _ = load_engine(
+        monkeypatch, {"BTC_TEST": levels("feePerByte", "10", "20", "40")}
+    )
+    engine = module.FeeEngine()
+    asyncio.run(engine.refresh())
+
+    assert engine.quote("ETH", "1", ETH_ADDR) is None  # never refreshed
+    assert engine.quote("BTC_TEST", "0.005", "not_an_address") is None
+    assert engine.quote("BTC_TEST", "5", BTC_ADDR) is None  # too many inputs
+
+    monkeypatch.setattr(module.settings, "FEE_TABLE_MAX_AGE", -1)
+    assert engine.quote("BTC_TEST", "0.005", BTC_ADDR) is None
+
+
+def test_suggestions_use_recent_percentiles(monkeypatch):
+    from app.core.fee_history import FeeHistory
+
+    module, calls = load_engine(monkeypatch, {})
+    monkeypatch.setattr(module, "fee_history", FeeHistory())
+    monkeypatch.setattr(module.settings, "FEE_HISTORY_MIN_SAMPLES", 3)
+    engine = module.FeeEngine()
+
+    assert engine.suggested("ETH") is None
+    for medium in ("0.0002", "0.0004", "0.0006"):
+        fetched = levels("networkFee", "0.0001", medium, "0.001")
+        engine._store("ETH", module.parse_levels(fetched, 0))
+
+    # p25/p50/p90 of the medium fee
+    assert engine.suggested("ETH").fees == {
+        "low": Decimal("0.0003"),
+        "medium": Decimal("0.0004"),
+        "high": Decimal("0.00056"),
+    }
+    assert calls == []
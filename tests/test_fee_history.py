@@ -0,0 +1,64 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app.core import fee_history as fee_history_mod
+from app.core.fee_history import FeeHistory, FeeRing
+
+
+def test_ring_keeps_the_last_capacity_observations():
+    ring = FeeRing(4)
+    for n in range(6):
+        ring.append(float(n), (n, 10 * n, 100 * n))
+
+    assert len(ring) == 4
+    # Positions 0 and 1 were overwritten
+    assert ring.since(0) == [
+        (2.0, (2, 20, 200)),
+        (3.0, (3, 30, 300)),
+        (4.0, (4, 40, 400)),
+        (5.0, (5, 50, 500)),
+    ]
+    assert ring.since(5) == [(5.0, (5, 50, 500))]
+    assert ring.percentiles(4.0, [50], level="high") == [450.0]
+
+
+def test_percentiles_over_window_match_linear_interpolation(monkeypatch):
+    ring = FeeRing(16)
+    for n, fee in enumerate([50, 10, 40, 20, 30]):
+        ring.append(100.0 + n, (0, fee, 0))
+    ring.append(1.0, (0, 1000, 0))  # outside the window
+
+    expected = [20.0, 30.0, 46.0]
+    assert ring.percentiles(100.0, [25, 50, 90]) == expected
+    assert ring.percentiles(100.0, [50], min_samples=6) is None
+
+    # The pure Python path gives the same numbers as numpy
+    monkeypatch.setattr(fee_history_mod, "numpy", None)
+    assert ring.percentiles(100.0, [25, 50, 90]) == expected
+
+
+def test_pending_observations_are_flushed_once():
+    history = FeeHistory()
+    history.load("BTC", [(1.0, (1, 2, 3))])
+    assert history.pending() == {}
+
+    history.record("BTC", 2.0, (4, 5, 6))
+    position, observations = history.pending()["BTC"]
+    assert observations == [(2.0, (4, 5, 6))]
+    history.mark_flushed("BTC", position)
+    assert history.pending() == {}
+
+
+def test_loading_after_recording_does_not_flush_loaded_rows_again():
+    history = FeeHistory()
+    history.record("BTC", 5.0, (7, 8, 9))
+    history.load("BTC", [(1.0, (1, 2, 3)), (2.0, (4, 5, 6))])
+
+    position, observations = history.pending()["BTC"]
+    assert observations == [(5.0, (7, 8, 9))]
+    history.mark_flushed("BTC", position)
+    assert history.pending() == {}
+    # Loaded rows still count towards the percentiles
+    assert history.percentiles("BTC", 0.0, [50], level="low") == [4.0]
@@ -1,10 +1,70 @@
-﻿from fastapi.testclient import TestClient
+﻿import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from app.core import metrics
+from app.core.limits import fee_cache, rate_limit_fee
+from app.database import get_db
 from app.main import app
+from app.services import fee_engine as fee_engine_mod
+from app.utils.auth import get_current_user
 
 client = TestClient(app)
 
+BTC_TEST_ADDR = 'tb1qqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqq0l98cr'
+
+class DummyResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar_one_or_none(self):
+        return self.value
+
+USER = SimpleNamespace(id=uuid.uuid4())
+
+class DummySession:
+    def __init__(self):
+        # address -> owning user id
+        self.wallets = {}
+
+    async def execute(self, stmt):
+        params = set(stmt.compile().params.values())
+        owned = any(addr in params and owner in params for addr, owner in self.wallets.items())
+        return DummyResult('W1' if owned else None)
+
+@pytest.fixture(autouse=True)
+def provider(monkeypatch):
+    calls = []
+
+    async def estimate_network_fee(asset):
+        calls.append(asset)
+        return {level: {'feePerByte': rate} for level, rate in (('low', '10'), ('medium', '20'), ('high', '40'))}
+
+    session = DummySession()
+    monkeypatch.setattr(fee_engine_mod, 'estimate_network_fee', estimate_network_fee)
+    monkeypatch.setattr(fee_engine_mod, 'fee_engine', fee_engine_mod.FeeEngine())
+    monkeypatch.setattr('app.services.fees.fee_engine', fee_engine_mod.fee_engine)
+    app.dependency_overrides[get_db] = lambda: session
+    app.dependency_overrides[get_current_user] = lambda: USER
+    fee_cache.clear()
+    rate_limit_fee.bucket.clear()
+    yield calls, session
+    app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_current_user, None)
+
+def test_fee_requires_authentication():
+    app.dependency_overrides.pop(get_current_user)
+    payload = {'asset':'BTC_TEST','amount':0.001,'destination_address':BTC_TEST_ADDR}
+    assert client.post('/fees/estimate', json=payload).status_code == 401
+
+def test_fee_request_is_documented():
+    schema = client.get('/openapi.json').json()
+    body = schema['paths']['/fees/estimate']['post']['requestBody']
+    assert body['content']['application/json']['schema']['$ref'].endswith('fees__FeeEstimateRequest')
+
 def test_fee_ok():
-    payload = {'asset':'BTC_TEST','amount':0.001,'destination_address':'tb1qqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqs3h5np'}
+    payload = {'asset':'BTC_TEST','amount':0.001,'destination_address':'tb1qqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqq0l98cr'}
     r = client.post('/fees/estimate', json=payload)
     assert r.status_code == 200
     body = r.json()
@@ -18,3 +78,31 @@ def test_fee_invalid_address():
     assert r.status_code == 400
     body = r.json()
     assert body['detail']['error']['code'] == 'bad_request'
+
+def test_fee_cache_is_keyed_on_bucket_and_destination_class(provider):
+    calls, session = provider
+    hits = metrics.get('fee_cache_hits_total')
+    payload = {'asset':'BTC_TEST','amount':0.001,'destination_address':BTC_TEST_ADDR}
+    first = client.post('/fees/estimate', json=payload).json()['data']
+    # 141 vbytes at 10 sat per byte
+    assert first['low'] == '0.0000141'
+
+    # Same input count, different external key-hash address: cache hit
+    other = dict(payload, amount=0.002, destination_address='tb1qllllllllllllllllllllllllllllllllrwyglf')
+    assert client.post('/fees/estimate', json=other).json()['data'] == first
+    assert metrics.get('fee_cache_hits_total') == hits + 1
+    assert calls == ['BTC_TEST']
+
+    # Larger amount needs another input
+    bigger = dict(payload, amount=0.015)
+    assert client.post('/fees/estimate', json=bigger).json()['data']['low'] == '0.0000209'
+
+    # Another user's wallet is quoted like any external address
+    session.wallets[BTC_TEST_ADDR] = uuid.uuid4()
+    assert client.post('/fees/estimate', json=payload).json()['data'] == first
+
+    # The caller's own wallets are internal transfers
+    session.wallets[BTC_TEST_ADDR] = USER.id
+    internal = client.post('/fees/estimate', json=payload).json()['data']
+    assert internal['low'] == internal['high'] == '0'
+    assert calls == ['BTC_TEST']
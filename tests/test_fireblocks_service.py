@@ -256,3 +256,44 @@ def test_estimate_transaction_fee(monkeypatch):
     assert request["amount"].amount == "0.5"
     assert isinstance(key, str) and len(key) == 32
     assert result == {"low": "0.1", "medium": "0.2", "high": "0.3"}
+
+
+def test_estimate_network_fee(monkeypatch):
+    """``estimate_network_fee`` returns every fee field of each level."""
+
+    class DummyFuture:
+        def result(self):
+            return SimpleNamespace(
+                data=SimpleNamespace(
+                    low=SimpleNamespace(network_fee=None, fee_per_byte="10", gas_price=None),
+                    medium=SimpleNamespace(network_fee=None, fee_per_byte="20", gas_price=None),
+                    high=SimpleNamespace(network_fee="0.001", fee_per_byte="40", gas_price=None),
+                )
+            )
+
+    class DummyTransactions:
+        def __init__(self):
+            self.calls = []
+
+        def estimate_network_fee(self, asset_id):
+            self.calls.append(asset_id)
+            return DummyFuture()
+
+    class DummyClient:
+        def __init__(self):
+            self.transactions = DummyTransactions()
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            pass
+
+    dummy_client = DummyClient()
+    monkeypatch.setattr(fb, "get_fireblocks_client", lambda: dummy_client)
+
+    result = asyncio.run(fb.estimate_network_fee("BTC_TEST"))
+
+    assert dummy_client.transactions.calls == ["BTC_TEST"]
+    assert result["low"] == {"networkFee": None, "feePerByte": "10", "gasPrice": None}
+    assert result["high"] == {"networkFee": "0.001", "feePerByte": "40", "gasPrice": None}
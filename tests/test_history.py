@@ -0,0 +1,61 @@
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+pytest.importorskip("sqlalchemy")
+
+
+class DummyResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class DummySession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return DummyResult(self.rows[: stmt._limit])
+
+
+def test_cursor_round_trip_and_validation():
+    from app.services.history import decode_cursor, encode_cursor, parse_fields
+
+    created_at, tx_id = datetime(2025, 1, 2, 3, 4, 5, 6), uuid.uuid4()
+    assert decode_cursor(encode_cursor(created_at, tx_id)) == (created_at, tx_id)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+    with pytest.raises(ValueError):
+        parse_fields("amount,password_hash")
+    assert parse_fields(" amount , amount,currency") == ["amount", "currency"]
+
+
+def test_page_projects_fields_and_returns_next_cursor():
+    from app.services.history import decode_cursor, fetch_page
+
+    now = datetime(2025, 1, 1)
+    rows = [
+        (Decimal("0.000000000000000001"), now - timedelta(seconds=i), uuid.uuid4())
+        for i in range(3)
+    ]
+    db = DummySession(rows)
+
+    items, cursor = asyncio.run(fetch_page(db, uuid.uuid4(), fields=["amount"], limit=2))
+    assert items == [{"amount": "0.000000000000000001"}] * 2
+    assert decode_cursor(cursor) == (rows[1][1], rows[1][2])
+    assert "created_at, transactions.id) <" not in str(db.statements[0])
+
+    asyncio.run(fetch_page(db, uuid.uuid4(), fields=["amount"], cursor=cursor, limit=2))
+    assert "(transactions.created_at, transactions.id) <" in str(db.statements[1])
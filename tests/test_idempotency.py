@@ -0,0 +1,125 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+pytest.importorskip("sqlalchemy")
+
+
+@pytest.fixture
+def idempotency(monkeypatch):
+    # Route tests import this module against stubbed models
+    monkeypatch.delitem(sys.modules, "app.services.idempotency", raising=False)
+    from app.services import idempotency
+
+    async def no_lock(db, key):
+        pass
+
+    monkeypatch.setattr(idempotency, "advisory_xact_lock", no_lock)
+    return idempotency
+
+
+class DummyResult:
+    def __init__(self, value):
+        self._value = value
+
+    def scalar_one_or_none(self):
+        return self._value
+
+
+class DummySession:
+    def __init__(self, tx=None):
+        self.tx = tx
+
+    async def execute(self, stmt):
+        return DummyResult(self.tx)
+
+
+def test_transaction_of_an_earlier_run_is_replayed(idempotency):
+    store = idempotency.IdempotencyStore(ttl=60, maxsize=10)
+    tx = SimpleNamespace(provider_ref_id="T9", meta={idempotency.FINGERPRINT_META: "fp"})
+
+    async def handler():
+        raise AssertionError("must not run again")
+
+    def run(fingerprint):
+        return asyncio.run(
+            store.run(
+                DummySession(tx), "u1", "k1", fingerprint, handler, lambda t: t.provider_ref_id
+            )
+        )
+
+    with pytest.raises(idempotency.IdempotencyKeyReused):
+        run("other")
+    assert run("fp") == "T9"
+
+
+def test_failures_are_not_stored_and_keys_are_per_user(idempotency):
+    store = idempotency.IdempotencyStore(ttl=60, maxsize=10)
+    db = DummySession()
+    runs = []
+
+    async def failing():
+        runs.append("fail")
+        raise RuntimeError("provider down")
+
+    async def succeeding():
+        runs.append("ok")
+        return "T1"
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(store.run(db, "u1", "k1", "fp", failing, None))
+    assert asyncio.run(store.run(db, "u1", "k1", "fp", succeeding, None)) == "T1"
+    assert asyncio.run(store.run(db, "u1", "k1", "fp", failing, None)) == "T1"
+    assert asyncio.run(store.run(db, "u2", "k1", "fp", succeeding, None)) == "T1"
+    assert runs == ["fail", "ok", "ok"]
+    with pytest.raises(idempotency.IdempotencyKeyReused):
+        asyncio.run(store.run(db, "u1", "k1", "other", succeeding, None))
+
+
+def test_duplicate_takes_over_when_the_first_request_is_cancelled(idempotency):
+    store = idempotency.IdempotencyStore(ttl=60, maxsize=10)
+    db = DummySession()
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+
+        async def fast():
+            return "T2"
+
+        first = asyncio.create_task(store.run(db, "u1", "k1", "fp", slow, None))
+        await started.wait()
+        duplicate = asyncio.create_task(store.run(db, "u1", "k1", "fp", fast, None))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await duplicate
+
+    assert asyncio.run(scenario()) == "T2"
+
+
+def test_responses_expire_and_the_oldest_are_evicted(idempotency, monkeypatch):
+    store = idempotency.IdempotencyStore(ttl=60, maxsize=2)
+    now = [1000.0]
+    monkeypatch.setattr(idempotency.time, "monotonic", lambda: now[0])
+    for key in ("a", "b", "c"):
+        store._store(key, "fp", key)
+
+    assert store._stored("a") is None
+    assert store._stored("b")[2] == "b"
+    now[0] += 61
+    assert store._stored("c") is None
+
+
+def test_provider_key_is_stable_per_user_and_key(idempotency):
+    key = idempotency.provider_key("u1", "k1")
+    assert key == idempotency.provider_key("u1", "k1")
+    assert key != idempotency.provider_key("u2", "k1")
+    assert len(key) == 36
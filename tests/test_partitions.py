@@ -0,0 +1,70 @@
+import asyncio
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+pytest.importorskip("sqlalchemy")
+
+
+class DummyResult:
+    def __init__(self, names):
+        self._names = names
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self._names
+
+
+class DummySession:
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.statements = []
+
+    async def execute(self, stmt, params=None):
+        sql = str(stmt)
+        if "pg_inherits" in sql:
+            return DummyResult(list(self.partitions))
+        self.statements.append(sql)
+        return DummyResult([])
+
+
+def test_partition_names_and_month_arithmetic():
+    from app.services.partitions import month_start, partition_month, partition_name
+
+    assert month_start(date(2025, 11, 17), 2) == date(2026, 1, 1)
+    assert month_start(date(2025, 1, 31), -1) == date(2024, 12, 1)
+    assert partition_name(date(2026, 1, 1)) == "transactions_y2026m01"
+    assert partition_month("transactions_y2026m01") == date(2026, 1, 1)
+    assert partition_month("transactions_default") is None
+
+
+def test_ensure_and_detach_partitions(monkeypatch):
+    from app.config import settings
+    from app.services.partitions import detach_old_partitions, ensure_partitions
+
+    monkeypatch.setattr(settings, "TX_PARTITION_MONTHS_AHEAD", 2)
+    monkeypatch.setattr(settings, "TX_PARTITION_RETENTION_MONTHS", 12)
+    db = DummySession(["transactions_y2024m01", "transactions_y2024m12", "transactions_y2025m06"])
+
+    created = asyncio.run(ensure_partitions(db, date(2025, 6, 15)))
+    assert created == ["transactions_y2025m07", "transactions_y2025m08"]
+    assert "FOR VALUES FROM ('2025-07-01') TO ('2025-08-01')" in db.statements[0]
+
+    detached = asyncio.run(detach_old_partitions(db, date(2025, 6, 15)))
+    assert detached == ["transactions_y2024m01"]
+
+
+def test_lookup_bound_needs_every_time():
+    from app.services.partitions import LOOKUP_SLACK, lookup_bound, provider_created_at
+
+    created = provider_created_at({"createdAt": 1735689600000})
+    assert created == datetime(2025, 1, 1)
+    assert lookup_bound([created, created + timedelta(days=3)]) == created - LOOKUP_SLACK
+    assert lookup_bound([created, None]) is None
+    assert lookup_bound([]) is None
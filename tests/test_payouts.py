@@ -0,0 +1,259 @@
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic")
+
+
+def items(*specs):
+    from app.schemas.payout import PayoutItem
+
+    return [PayoutItem(**spec) for spec in specs]
+
+
+class DummyResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class DummySession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return DummyResult(self.rows)
+
+
+def test_every_invalid_item_is_reported():
+    from app.services.payouts import validate_items
+
+    errors = validate_items(
+        "BTC",
+        items(
+            {"address": "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4", "amount": "0.1"},
+            {"amount": "1"},
+            {"address": "1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN2", "destination_user_id": "AB12", "amount": "1"},
+            {"address": "1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN2", "amount": "-1"},
+            # Finer than the asset's 8 decimals
+            {"destination_user_id": "AB12", "amount": "0.000000001"},
+            # Last character changed: the checksum no longer matches
+            {"address": "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t5", "amount": "1"},
+        ),
+    )
+
+    assert [e["index"] for e in errors] == [1, 2, 3, 4, 5]
+    assert errors[2]["error"] == "Invalid amount"
+    assert errors[4]["error"] == "Invalid address"
+
+
+def test_destinations_are_resolved_with_one_query():
+    from app.services.payouts import resolve_destinations
+
+    alice = SimpleNamespace(id=1, privacy_id="AAAA", username="alice", email_verified=True)
+    bob = SimpleNamespace(id=2, privacy_id="BBBB", username=None, email_verified=False)
+    alice_wallet = SimpleNamespace(id="w1", address="internal-addr", vault_id="V1")
+    session = DummySession([(alice, alice_wallet), (bob, None)])
+
+    destinations, errors = asyncio.run(
+        resolve_destinations(
+            session,
+            "BTC",
+            items(
+                {"destination_user_id": "alice", "amount": "1"},
+                {"address": "internal-addr", "amount": "1"},
+                {"address": "external-addr", "amount": "1"},
+                {"destination_user_id": "BBBB", "amount": "1"},
+                {"destination_user_id": "nobody", "amount": "1"},
+            ),
+        )
+    )
+
+    assert len(session.statements) == 1
+    assert destinations[0].wallet is alice_wallet
+    assert destinations[1].user is alice
+    assert destinations[2] is None
+    assert errors == [
+        {"index": 3, "error": "Destination email not verified"},
+        {"index": 4, "error": "Destination user not found"},
+    ]
+
+
+def test_pipeline_limits_concurrency_and_writes_results_in_bulk(monkeypatch):
+    from app.core.amounts import Amount
+    from app.models.transaction import TxStatus
+    from app.services import payouts
+
+    monkeypatch.setattr(payouts.settings, "PAYOUT_CONCURRENCY", 3)
+    in_flight = []
+    peak = []
+
+    class ApiError(Exception):
+        def __init__(self, status, message):
+            super().__init__(message)
+            self.status = status
+
+    async def create_transfer(vault_id, asset, amount, address, external_tx_id=None):
+        in_flight.append(external_tx_id)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0)
+        in_flight.remove(external_tx_id)
+        if address == "bad":
+            raise ApiError(400, "invalid address")
+        if address == "slow":
+            raise ApiError(503, "try later")
+        return {"id": f"fb-{external_tx_id}", "fee": "0.001"}
+
+    async def transfer_between_vault_accounts(src, dest, asset, amount, external_tx_id=None):
+        return {"id": f"fb-{external_tx_id}"}
+
+    writes = []
+
+    async def write(session_factory, updates):
+        writes.append(updates)
+
+    monkeypatch.setattr(payouts, "create_transfer", create_transfer)
+    monkeypatch.setattr(payouts, "transfer_between_vault_accounts", transfer_between_vault_accounts)
+    monkeypatch.setattr(payouts, "_write", write)
+
+    now = datetime(2024, 1, 1)
+    jobs = [
+        payouts.PayoutJob(uuid.uuid4(), None, now, "1", f"addr{n}", None, Amount.parse("5"))
+        for n in range(9)
+    ]
+    jobs.append(payouts.PayoutJob(uuid.uuid4(), None, now, "1", "bad", None, Amount.parse("5")))
+    jobs.append(payouts.PayoutJob(uuid.uuid4(), uuid.uuid4(), now, "1", None, "V2", Amount.parse("4")))
+    jobs.append(payouts.PayoutJob(uuid.uuid4(), None, now, "1", "slow", None, Amount.parse("3")))
+
+    asyncio.run(payouts.run_payout(None, "V1", "BTC", jobs))
+
+    assert max(peak) == 3
+    assert len(writes) < len(jobs)
+    updates = {u["id"]: u for batch in writes for u in batch}
+    assert len(updates) == len(jobs)
+    first = updates[jobs[0].out_id]
+    assert first["provider_ref_id"] == f"fb-{jobs[0].out_id}"
+    assert first["balance_after"] == Decimal("4.999")
+    assert updates[jobs[9].out_id]["status"] == TxStatus.failed
+    assert updates[jobs[10].in_id]["provider_ref_id"] == f"fb-{jobs[10].out_id}"
+    # A 503 may have created the transfer: the item stays queued
+    assert jobs[11].out_id not in updates
+
+
+def test_queued_items_are_resumed_with_their_external_ids(monkeypatch):
+    from app.core import metrics
+    from app.models.transaction import TxType
+    from app.services import payouts
+
+    now = datetime(2024, 1, 1)
+    adopted, lost, internal, legacy = (uuid.uuid4() for _ in range(4))
+    in_id = uuid.uuid4()
+
+    def row(tx_id, tx_type=TxType.crypto_out, **meta):
+        return SimpleNamespace(
+            id=tx_id,
+            type=tx_type,
+            created_at=now,
+            amount=Decimal("0.5"),
+            currency="BTC",
+            address_to="bc1qdest",
+            balance_after=Decimal("2"),
+            meta={"payout": 0, **meta},
+        )
+
+    rows = [
+        (row(adopted), "V1"),
+        (row(lost), "V1"),
+        (row(internal, TxType.internal_out, in_id=str(in_id), dest_vault_id="V9"), "V1"),
+        (row(legacy, TxType.internal_out), "V1"),
+    ]
+
+    class ResumeSession(DummySession):
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+    async def find_transaction_by_external_id(external_tx_id):
+        return {"id": "fb-old"} if external_tx_id == str(adopted) else None
+
+    submitted = []
+
+    async def create_transfer(vault_id, asset, amount, address, external_tx_id=None):
+        submitted.append((vault_id, amount, address, external_tx_id))
+        return {"id": f"fb-{external_tx_id}", "fee": "0.001"}
+
+    async def transfer_between_vault_accounts(src, dest, asset, amount, external_tx_id=None):
+        submitted.append((src, dest, amount, external_tx_id))
+        return {"id": f"fb-{external_tx_id}"}
+
+    writes = []
+
+    async def write(session_factory, updates):
+        writes.extend(updates)
+
+    monkeypatch.setattr(payouts, "find_transaction_by_external_id", find_transaction_by_external_id)
+    monkeypatch.setattr(payouts, "create_transfer", create_transfer)
+    monkeypatch.setattr(payouts, "transfer_between_vault_accounts", transfer_between_vault_accounts)
+    monkeypatch.setattr(payouts, "_write", write)
+    before = metrics.get("payout_items_adopted_total")
+
+    assert asyncio.run(payouts.resume_payouts(lambda: ResumeSession(rows))) == 3
+
+    assert sorted(submitted, key=str) == sorted(
+        [("V1", "0.5", "bc1qdest", str(lost)), ("V1", "V9", "0.5", str(internal))], key=str
+    )
+    assert metrics.get("payout_items_adopted_total") == before + 1
+    updates = {u["id"]: u for u in writes}
+    assert updates[adopted]["provider_ref_id"] == "fb-old"
+    assert updates[lost]["balance_after"] == Decimal("1.999")
+    assert updates[in_id]["provider_ref_id"] == f"fb-{internal}"
+    assert legacy not in updates
+
+
+def test_status_polls_look_back_over_the_overlap_window(monkeypatch):
+    from datetime import timedelta, timezone
+
+    from app.models.transaction import TxStatus
+    from app.services import payouts
+
+    cursor = datetime(2024, 1, 1, 12)
+    # Stamped before the previous poll's cursor but committed after it
+    late = SimpleNamespace(id=uuid.uuid4(), updated_at=cursor - timedelta(seconds=5))
+
+    class StatusResult(DummyResult):
+        def scalars(self):
+            return self
+
+    class StatusSession(DummySession):
+        async def execute(self, stmt):
+            self.statements.append(stmt)
+            if len(self.statements) == 1:
+                return StatusResult([(TxStatus.confirmed, False, 1)])
+            return StatusResult(self.rows)
+
+    monkeypatch.setattr(payouts.settings, "PAYOUT_CURSOR_OVERLAP", 30)
+    db = StatusSession([late])
+    since = cursor.replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=2)))
+
+    counts, txs, next_cursor = asyncio.run(payouts.payout_status(db, 1, uuid.uuid4(), since))
+
+    assert counts == {"confirmed": 1} and txs == [late]
+    # A repeat never moves the cursor back
+    assert next_cursor == cursor
+    bound = db.statements[1].compile().params
+    assert cursor - timedelta(seconds=30) in bound.values()
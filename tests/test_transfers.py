@@ -0,0 +1,140 @@
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+
+
+class DummyResult:
+    def __init__(self, value):
+        self._value = value
+
+    def scalar_one_or_none(self):
+        return self._value
+
+
+class DummySession:
+    def __init__(self, tx):
+        self.tx = tx
+        self.closed = False
+
+    async def execute(self, stmt):
+        return DummyResult(self.tx)
+
+    async def close(self):
+        self.closed = True
+
+
+def make_tx(user_id):
+    from app.models.transaction import TxStatus, TxType
+
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        user_id=user_id,
+        wallet_id=uuid.uuid4(),
+        type=TxType.crypto_out,
+        status=TxStatus.pending,
+        amount="1",
+        currency="BTC",
+        balance_after=None,
+        provider_ref_id="fb-1",
+        tx_hash=None,
+        updated_at=datetime.utcnow(),
+    )
+
+
+def test_wait_returns_when_status_changes():
+    from app.models.transaction import TxStatus
+    from app.routes.transfers import get_transfer_status
+    from app.services.notifications import publish_transaction_changes
+
+    user = SimpleNamespace(id=uuid.uuid4())
+    tx = make_tx(user.id)
+    db = DummySession(tx)
+
+    async def scenario():
+        waiter = asyncio.create_task(get_transfer_status("fb-1", 5, user, db))
+        await asyncio.sleep(0.01)
+        assert db.closed and not waiter.done()
+        confirmed = SimpleNamespace(**{**vars(tx), "status": TxStatus.confirmed, "tx_hash": "0xabc"})
+        publish_transaction_changes([confirmed])
+        return await asyncio.wait_for(waiter, 1)
+
+    response = asyncio.run(scenario())
+    assert response.status == "confirmed"
+    assert response.tx_hash == "0xabc"
+    assert response.changed
+
+
+def test_wait_times_out_with_current_status():
+    from app.routes.transfers import get_transfer_status
+
+    user = SimpleNamespace(id=uuid.uuid4())
+    response = asyncio.run(get_transfer_status("fb-1", 0.05, user, DummySession(make_tx(user.id))))
+    assert response.status == "pending"
+    assert not response.changed
+
+
+class NotifyServer:
+    """Postgres LISTEN/NOTIFY between the connections of several workers."""
+
+    def __init__(self):
+        self.listeners = []
+
+    def engine(self):
+        server = self
+
+        class Raw:
+            async def add_listener(self, channel, callback):
+                server.listeners.append(callback)
+
+            async def execute(self, sql, channel, payloads):
+                for callback in server.listeners:
+                    for payload in payloads:
+                        callback(self, 1, channel, payload)
+
+        class Conn:
+            async def get_raw_connection(self):
+                return SimpleNamespace(driver_connection=Raw())
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return SimpleNamespace(connect=Conn)
+
+
+def test_changes_reach_streams_on_every_worker():
+    from app.core.pubsub import broker
+    from app.services.notifications import ChangeRelay, _change, user_topic
+
+    user_id = uuid.uuid4()
+    server = NotifyServer()
+    committing, streaming = ChangeRelay(), ChangeRelay()
+
+    async def scenario():
+        tasks = [asyncio.create_task(r.run(server.engine())) for r in (committing, streaming)]
+        while len(server.listeners) < 2:
+            await asyncio.sleep(0)
+        with broker.subscribe(user_topic(user_id)) as queue:
+            committing.send([_change(make_tx(user_id))])
+            # One delivery per listening worker, all in this test's process
+            messages = [await asyncio.wait_for(queue.get(), 1) for _ in range(2)]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return messages
+
+    messages = asyncio.run(scenario())
+    assert [m["event"] for m in messages] == ["transaction", "transaction"]
+    assert messages[0]["transfer_id"] == "fb-1"
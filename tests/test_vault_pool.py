@@ -0,0 +1,118 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+pytest.importorskip("sqlalchemy")
+
+
+class PoolSession:
+    """Just enough of an ``AsyncSession`` for the refill queries."""
+
+    def __init__(self):
+        self.rows = []
+
+    async def execute(self, stmt):
+        unclaimed = [r for r in self.rows if r.claimed_by is None]
+        sql = str(stmt)
+        if "count(" in sql:
+            if "ready" in sql:
+                unclaimed = [r for r in unclaimed if r.ready]
+            return Result(len(unclaimed))
+        pending = [r for r in unclaimed if not r.ready]
+        return Result(pending[0] if pending else None)
+
+    def add(self, row):
+        row.claimed_by = None
+        row.ready = False
+        self.rows.append(row)
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class Result:
+    def __init__(self, value):
+        self._value = value
+
+    def scalar_one(self):
+        return self._value
+
+    def scalar_one_or_none(self):
+        return self._value
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    from app.config import settings
+    from app.services import vault_pool
+
+    async def no_lock(db, key):
+        pass
+
+    async def record_vault_assets(db, rows):
+        pass
+
+    created = []
+
+    async def create_vault_account(name):
+        created.append(name)
+        return {"vault_account_id": f"V{len(created)}"}
+
+    monkeypatch.setattr(vault_pool, "advisory_xact_lock", no_lock)
+    monkeypatch.setattr(vault_pool, "record_vault_assets", record_vault_assets)
+    monkeypatch.setattr(vault_pool, "create_vault_account", create_vault_account)
+    monkeypatch.setattr(settings, "VAULT_POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "VAULT_POOL_ASSETS", ["BTC", "ETH"])
+    return vault_pool, created
+
+
+def test_vault_is_kept_and_finished_when_activation_fails(pool, monkeypatch):
+    vault_pool, created = pool
+    failing = {"ETH"}
+    activated = []
+
+    async def activate_vault_asset(vault_id, asset):
+        activated.append(asset)
+        if asset in failing:
+            raise RuntimeError("provider down")
+        return f"{asset}-ADDR"
+
+    monkeypatch.setattr(vault_pool, "activate_vault_asset", activate_vault_asset)
+    db = PoolSession()
+
+    assert asyncio.run(vault_pool.refill_pool(lambda: db)) == 0
+    assert [(r.vault_id, r.ready, r.assets) for r in db.rows] == [
+        ("V1", False, {"BTC": "BTC-ADDR", "ETH": None})
+    ]
+
+    failing.clear()
+    activated.clear()
+    assert asyncio.run(vault_pool.refill_pool(lambda: db)) == 1
+    # The pending vault is finished rather than replaced by a new one
+    assert created == [created[0]]
+    assert activated == ["ETH"]
+    assert db.rows[0].ready
+    assert db.rows[0].assets == {"BTC": "BTC-ADDR", "ETH": "ETH-ADDR"}
+
+
+def test_unknown_pool_assets_are_rejected(pool, monkeypatch):
+    vault_pool, created = pool
+    from app.config import settings
+
+    vault_pool.validate_pool_assets()
+    monkeypatch.setattr(settings, "VAULT_POOL_ASSETS", ["BTC", "NOPE"])
+    with pytest.raises(ValueError, match="NOPE"):
+        vault_pool.validate_pool_assets()
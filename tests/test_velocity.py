@@ -0,0 +1,72 @@
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app.core.amounts import Amount
+from app.core.velocity import VelocityLimitExceeded, VelocityLimits, parse_limits
+
+
+def make_limits():
+    return VelocityLimits(parse_limits(["BTC:1"]), parse_limits(["BTC:2", "ETH:10"]), 60)
+
+
+def test_withdrawals_leave_each_window_as_it_rolls():
+    limits = make_limits()
+    start = 1_700_000_000
+    limits.record("u1", "BTC", "0.6", start)
+    limits.record("u1", "BTC", "0.6", start + 1800)
+
+    assert limits.exceeded("u1", "BTC", "0.1", start + 1800) == "hourly"
+    # The first withdrawal left the hour but not the day
+    assert limits.exceeded("u1", "BTC", "0.3", start + 3700) is None
+    assert limits.exceeded("u1", "BTC", "0.9", start + 5500) == "daily"
+    assert limits.exceeded("u1", "BTC", "0.9", start + 86400 + 60) is None
+    # Other users, and assets without limits, are not affected
+    assert limits.exceeded("u2", "BTC", "1", start + 1800) is None
+    assert limits.exceeded("u1", "TRX", "1000000", start) is None
+
+
+def test_reserve_counts_immediately_and_releases_on_failure():
+    limits = make_limits()
+
+    with limits.reserve("u1", "BTC", Amount.parse("0.7")):
+        with pytest.raises(VelocityLimitExceeded) as excinfo:
+            with limits.reserve("u1", "BTC", "0.7"):
+                pass
+    assert excinfo.value.window == "hourly"
+
+    with pytest.raises(RuntimeError):
+        with limits.reserve("u1", "BTC", "0.3"):
+            raise RuntimeError("transfer failed")
+    assert limits.exceeded("u1", "BTC", "0.3") is None
+    assert limits.exceeded("u1", "BTC", "0.31") == "hourly"
+
+
+def test_idle_users_are_pruned():
+    limits = make_limits()
+    limits.record("u1", "BTC", "0.1", 1_700_000_000)
+    limits.record("u2", "BTC", "0.1", 1_700_050_000)
+
+    assert limits.prune(1_700_000_000 + 86400 + 60) == 1
+    assert limits.tracked == 1
+
+
+def test_malformed_limits_are_rejected():
+    with pytest.raises(ValueError):
+        parse_limits(["BTC"])
+    with pytest.raises(ValueError):
+        parse_limits(["BTC:lots"])
+
+
+def test_exceeded_by_checks_amounts_summed_elsewhere():
+    limits = make_limits()
+    withdrawn = {"hourly": Decimal("0.4"), "daily": Decimal("1.8")}
+
+    assert limits.exceeded_by("BTC", withdrawn, "0.1") is None
+    assert limits.exceeded_by("BTC", withdrawn, "0.3") == "daily"
+    assert limits.exceeded_by("BTC", {"hourly": Decimal("0.4")}, "0.7") == "hourly"
+    assert limits.exceeded_by("TRX", withdrawn, "1000000") is None
@@ -2,8 +2,11 @@ import asyncio
 import sys
 import types
 import uuid
+from decimal import Decimal
 from pathlib import Path
 
+import pytest
+
 
 def setup_route(monkeypatch):
     # Stub FastAPI components
@@ -34,9 +37,17 @@ def setup_route(monkeypatch):
             self.status_code = status_code
             self.detail = detail
 
+    def Query(default=None, **kwargs):  # pragma: no cover - simple stub
+        return default
+
+    def Header(default=None, **kwargs):  # pragma: no cover - simple stub
+        return default
+
     fastapi_stub.APIRouter = APIRouter
     fastapi_stub.Depends = Depends
     fastapi_stub.HTTPException = HTTPException
+    fastapi_stub.Query = Query
+    fastapi_stub.Header = Header
     monkeypatch.setitem(sys.modules, "fastapi", fastapi_stub)
 
     # Stub SQLAlchemy pieces used for query construction
@@ -54,6 +65,9 @@ def setup_route(monkeypatch):
             self.filters.extend(conds)
             return self
 
+        def limit(self, n):
+            return self
+
     def select(model):
         return DummyQuery(model)
 
@@ -70,6 +84,13 @@ def setup_route(monkeypatch):
     # Stub models
     user_mod = types.ModuleType("app.models.user")
 
+    class AnyOf:
+        def __init__(self, values):
+            self.values = list(values)
+
+        def __eq__(self, other):
+            return other in self.values
+
     class Field:
         def __init__(self, name):
             self.name = name
@@ -77,6 +98,9 @@ def setup_route(monkeypatch):
         def __eq__(self, other):
             return (self.name, other)
 
+        def in_(self, values):
+            return (self.name, AnyOf(values))
+
     class User:  # pragma: no cover - simple data container
         id = Field("id")
         privacy_id = Field("privacy_id")
@@ -137,7 +161,11 @@ def setup_route(monkeypatch):
         pending = "pending"
 
     class Transaction:  # pragma: no cover - lightweight stand-in
+        user_id = Field("user_id")
+        idempotency_key = Field("idempotency_key")
+
         def __init__(self, **kwargs):
+            self.id = uuid.uuid4()
             for key, value in kwargs.items():
                 setattr(self, key, value)
 
@@ -153,6 +181,11 @@ def setup_route(monkeypatch):
         class Model:  # pragma: no cover - lightweight stand-in
             def __init__(self, **kwargs):
                 for key, value in kwargs.items():
+                    # Request amounts are parsed at the schema boundary
+                    if key == "amount" and name.endswith("Request"):
+                        from app.core.amounts import Amount
+
+                        value = Amount.parse(value)
                     setattr(self, key, value)
 
         Model.__name__ = name
@@ -160,6 +193,9 @@ def setup_route(monkeypatch):
 
     for name in [
         "WalletOut",
+        "BulkWalletRequest",
+        "BulkWalletResult",
+        "BulkWalletResponse",
         "WalletBalance",
         "WithdrawalRequest",
         "WithdrawalResponse",
@@ -170,6 +206,45 @@ def setup_route(monkeypatch):
     ]:
         setattr(schemas_wallet_mod, name, _model_factory(name))
     monkeypatch.setitem(sys.modules, "app.schemas.wallet", schemas_wallet_mod)
+    schemas_transaction_mod = types.ModuleType("app.schemas.transaction")
+    schemas_transaction_mod.TransactionPage = _model_factory("TransactionPage")
+    monkeypatch.setitem(sys.modules, "app.schemas.transaction", schemas_transaction_mod)
+
+    # Stub history reads; the wallet routes only delegate to them
+    history_mod = types.ModuleType("app.services.history")
+
+    async def fetch_page(db, user_id, **kwargs):  # pragma: no cover - placeholder
+        return [], None
+
+    history_mod.fetch_page = fetch_page
+    history_mod.parse_fields = lambda fields: fields
+    monkeypatch.setitem(sys.modules, "app.services.history", history_mod)
+
+    # Stub the fee table; quotes come from ``fee_engine.quotes`` when set
+    fee_engine_mod = types.ModuleType("app.services.fee_engine")
+
+    class FeeEngine:
+        def __init__(self):
+            self.quotes = {}
+
+        def quote(self, asset, amount, destination_address):
+            return self.quotes.get((asset, amount, destination_address))
+
+    fee_engine_mod.fee_engine = FeeEngine()
+    monkeypatch.setitem(sys.modules, "app.services.fee_engine", fee_engine_mod)
+
+    # Stub withdrawal batching; assets in ``batched`` are queued, not sent
+    batches_mod = types.ModuleType("app.services.withdrawal_batches")
+    batches_mod.QUEUED = "queued"
+    batches_mod.batched = set()
+    batches_mod.queued = {}
+
+    async def queued_amount(db, wallet_id):
+        return Decimal(batches_mod.queued.get(wallet_id, "0"))
+
+    batches_mod.supports_batching = lambda asset: asset in batches_mod.batched
+    batches_mod.queued_amount = queued_amount
+    monkeypatch.setitem(sys.modules, "app.services.withdrawal_batches", batches_mod)
 
     # Stub Fireblocks service
     fireblocks_mod = types.ModuleType("app.services.fireblocks")
@@ -192,6 +267,14 @@ def setup_route(monkeypatch):
         calls.append(("generate_address_for_vault", vault_id, asset))
         return f"ADDR_{asset}"
 
+    async def get_vault_asset_ids(vault_id: str):
+        calls.append(("get_vault_asset_ids", vault_id))
+        return set()
+
+    async def activate_vault_asset(vault_id: str, asset: str):
+        calls.append(("activate_vault_asset", vault_id, asset))
+        return f"ADDR_{asset}"
+
     async def get_wallet_balance(vault_id: str, asset: str):
         calls.append(("get_wallet_balance", vault_id, asset))
         return {
@@ -201,7 +284,9 @@ def setup_route(monkeypatch):
             "available_balance": "0",
         }
 
-    async def create_transfer(vault_id: str, asset: str, amount: str, address: str):
+    async def create_transfer(
+        vault_id: str, asset: str, amount: str, address: str, external_tx_id=None
+    ):
         calls.append(("create_transfer", vault_id, asset, amount, address))
         return {"id": "T1", "status": "COMPLETED"}
 
@@ -220,7 +305,7 @@ def setup_route(monkeypatch):
         return {"low": "0.1", "medium": "0.2", "high": "0.3"}
 
     async def transfer_between_vault_accounts(
-        source_vault_id: str, dest_vault_id: str, asset: str, amount: str
+        source_vault_id: str, dest_vault_id: str, asset: str, amount: str, external_tx_id=None
     ):
         calls.append(
             (
@@ -236,6 +321,8 @@ def setup_route(monkeypatch):
     fireblocks_mod.create_vault_account = create_vault_account
     fireblocks_mod.create_asset_for_vault = create_asset_for_vault
     fireblocks_mod.generate_address_for_vault = generate_address_for_vault
+    fireblocks_mod.get_vault_asset_ids = get_vault_asset_ids
+    fireblocks_mod.activate_vault_asset = activate_vault_asset
     fireblocks_mod.get_wallet_balance = get_wallet_balance
     fireblocks_mod.create_transfer = create_transfer
     fireblocks_mod.estimate_transaction_fee = estimate_transaction_fee
@@ -243,13 +330,79 @@ def setup_route(monkeypatch):
     fireblocks_mod.AssetAlreadyExistsError = AssetAlreadyExistsError
     monkeypatch.setitem(sys.modules, "app.services.fireblocks", fireblocks_mod)
 
+    # Stub the warm vault pool; tests run with an empty pool
+    vault_pool_mod = types.ModuleType("app.services.vault_pool")
+
+    async def claim_pooled_vault(db, user_id):
+        return None
+
+    async def pooled_address(db, vault_id: str, asset: str):
+        return None
+
+    async def pooled_addresses(db, vault_id: str):
+        return {}
+
+    vault_pool_mod.claim_pooled_vault = claim_pooled_vault
+    vault_pool_mod.pooled_address = pooled_address
+    vault_pool_mod.pooled_addresses = pooled_addresses
+    monkeypatch.setitem(sys.modules, "app.services.vault_pool", vault_pool_mod)
+
+    # Stub the vault/asset mirror with an in-memory dict
+    vault_assets_mod = types.ModuleType("app.services.vault_assets")
+    vault_assets_mod.mirror = {}
+
+    async def known_vault_assets(db, vault_id: str):
+        return {
+            asset: address
+            for (v, asset), address in vault_assets_mod.mirror.items()
+            if v == vault_id
+        }
+
+    async def record_vault_assets(db, rows):
+        for vault_id, asset, address in rows:
+            key = (vault_id, asset)
+            vault_assets_mod.mirror[key] = address or vault_assets_mod.mirror.get(key)
+
+    vault_assets_mod.known_vault_assets = known_vault_assets
+    vault_assets_mod.record_vault_assets = record_vault_assets
+    monkeypatch.setitem(sys.modules, "app.services.vault_assets", vault_assets_mod)
+    # ``from app.services import ...`` reads the package attribute,
+    # which is the real module if another test imported it first
+    import app.services
+
+    monkeypatch.setattr(app.services, "vault_assets", vault_assets_mod, raising=False)
+    monkeypatch.setattr(app.services, "withdrawal_batches", batches_mod, raising=False)
+
+    # Stub the database side of velocity limits with the session's transactions
+    velocity_mod = types.ModuleType("app.services.velocity")
+
+    async def recent_withdrawals(db, user_id, asset: str):
+        total = sum(
+            (
+                Decimal(t.amount)
+                for t in db.transactions
+                if t.user_id == user_id
+                and t.currency == asset
+                and t.type in ("crypto_out", "internal_out")
+            ),
+            Decimal("0"),
+        )
+        return {"hourly": total, "daily": total}
+
+    velocity_mod.recent_withdrawals = recent_withdrawals
+    monkeypatch.setitem(sys.modules, "app.services.velocity", velocity_mod)
+
     # Stub database dependency
     database_mod = types.ModuleType("app.database")
 
     async def get_db():  # pragma: no cover - placeholder generator
         yield None
 
+    async def advisory_xact_lock(db, key: str):  # pragma: no cover - no-op
+        pass
+
     database_mod.get_db = get_db
+    database_mod.advisory_xact_lock = advisory_xact_lock
     monkeypatch.setitem(sys.modules, "app.database", database_mod)
 
     # Stub auth utilities
@@ -264,20 +417,34 @@ def setup_route(monkeypatch):
     # Ensure repository root is on sys.path for imports
     sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-    # Reload route module each time to pick up stubs
+    # Reload route and service modules each time to pick up stubs
     sys.modules.pop("app.routes.wallet", None)
+    sys.modules.pop("app.services.provisioning", None)
+    sys.modules.pop("app.services.donation", None)
+    monkeypatch.delitem(sys.modules, "app.services.idempotency", raising=False)
     from app.routes.wallet import create_user_wallet
     from app.models.wallet import Wallet as RouteWallet
     from app.models.vault import Vault as RouteVault
     from app.models.user import User as RouteUser
 
+    class DummyScalars:
+        def __init__(self, values):
+            self._values = values
+
+        def all(self):
+            return list(self._values)
+
     class DummyResult:
-        def __init__(self, value):
+        def __init__(self, value, values=None):
             self._value = value
+            self._values = values if values is not None else ([value] if value else [])
 
         def scalar_one_or_none(self):
             return self._value
 
+        def scalars(self):
+            return DummyScalars(self._values)
+
     class DummySession:
         def __init__(self):
             self.vault = None
@@ -287,14 +454,21 @@ def setup_route(monkeypatch):
 
         async def execute(self, query):
             if query.model is RouteWallet:
-                for w in self.wallets:
-                    if all(getattr(w, f[0]) == f[1] for f in query.filters):
-                        return DummyResult(w)
-                return DummyResult(None)
+                matches = [
+                    w
+                    for w in self.wallets
+                    if all(getattr(w, f[0]) == f[1] for f in query.filters)
+                ]
+                return DummyResult(matches[0] if matches else None, matches)
             if query.model is RouteVault:
                 if self.vault and all(getattr(self.vault, f[0]) == f[1] for f in query.filters):
                     return DummyResult(self.vault)
                 return DummyResult(None)
+            if query.model is RouteTransaction:
+                for t in self.transactions:
+                    if all(getattr(t, f[0], None) == f[1] for f in query.filters):
+                        return DummyResult(t)
+                return DummyResult(None)
             if query.model is RouteUser:
                 for u in self.users:
                     if all(getattr(u, f[0]) == f[1] for f in query.filters):
@@ -336,8 +510,8 @@ def test_multiple_wallet_creations_reuse_same_vault(monkeypatch):
     assert wallet1.vault_id == wallet2.vault_id
     assert calls == [
         ("create_vault_account", "user-1"),
-        ("create_asset_for_vault", "V1", "BTC_TEST"),
-        ("create_asset_for_vault", "V1", "ETH_TEST"),
+        ("activate_vault_asset", "V1", "BTC_TEST"),
+        ("activate_vault_asset", "V1", "ETH_TEST"),
     ]
 
 
@@ -352,7 +526,7 @@ def test_user_with_existing_vault_uses_existing_id(monkeypatch):
     wallet = asyncio.run(create_user_wallet("BTC_TEST", current_user=user, db=session))
 
     assert wallet.vault_id == "V1"
-    assert calls == [("create_asset_for_vault", "V1", "BTC_TEST")]
+    assert calls == [("activate_vault_asset", "V1", "BTC_TEST")]
 
 
 def test_creating_wallet_for_existing_asset_returns_existing(monkeypatch):
@@ -368,6 +542,113 @@ def test_creating_wallet_for_existing_asset_returns_existing(monkeypatch):
     assert calls == []
 
 
+def test_wallet_creation_claims_pooled_vault(monkeypatch):
+    create_user_wallet, User, DummySession, calls = setup_route(monkeypatch)
+    from types import SimpleNamespace
+    from app.services import provisioning
+
+    async def claim_pooled_vault(db, user_id):
+        calls.append(("claim_pooled_vault", user_id))
+        return SimpleNamespace(vault_id="POOL1", assets={"BTC_TEST": "POOLADDR"})
+
+    async def pooled_address(db, vault_id: str, asset: str):
+        return {"BTC_TEST": "POOLADDR"}.get(asset) if vault_id == "POOL1" else None
+
+    monkeypatch.setattr(provisioning, "claim_pooled_vault", claim_pooled_vault)
+    monkeypatch.setattr(provisioning, "pooled_address", pooled_address)
+
+    session = DummySession()
+    user = User(id="user-1", email_verified=True)
+
+    wallet = asyncio.run(create_user_wallet("BTC_TEST", current_user=user, db=session))
+
+    assert wallet.vault_id == "POOL1"
+    assert wallet.address == "POOLADDR"
+    assert user.has_vault is True
+    assert calls == [("claim_pooled_vault", "user-1")]
+
+
+def test_concurrent_wallet_creations_provision_once(monkeypatch):
+    create_user_wallet, User, DummySession, calls = setup_route(monkeypatch)
+    from app.services import provisioning
+
+    async def slow_create_vault_account(name: str):
+        calls.append(("create_vault_account", name))
+        await asyncio.sleep(0.01)
+        return {"vault_account_id": "V1"}
+
+    async def slow_activate_vault_asset(vault_id: str, asset: str):
+        calls.append(("activate_vault_asset", vault_id, asset))
+        await asyncio.sleep(0.01)
+        return f"ADDR_{asset}"
+
+    monkeypatch.setattr(provisioning, "create_vault_account", slow_create_vault_account)
+    monkeypatch.setattr(provisioning, "activate_vault_asset", slow_activate_vault_asset)
+
+    session = DummySession()
+    user = User(id="user-1", email_verified=True)
+
+    async def create_concurrently():
+        return await asyncio.gather(
+            create_user_wallet("BTC_TEST", current_user=user, db=session),
+            create_user_wallet("BTC_TEST", current_user=user, db=session),
+            create_user_wallet("ETH_TEST", current_user=user, db=session),
+        )
+
+    btc1, btc2, eth = asyncio.run(create_concurrently())
+
+    assert btc1 is btc2
+    assert btc1.vault_id == eth.vault_id == "V1"
+    assert calls.count(("create_vault_account", "user-1")) == 1
+    assert calls.count(("activate_vault_asset", "V1", "BTC_TEST")) == 1
+    assert calls.count(("activate_vault_asset", "V1", "ETH_TEST")) == 1
+    assert len(session.wallets) == 2
+
+
+def test_bulk_wallet_creation_reports_per_asset(monkeypatch):
+    create_user_wallet, User, DummySession, calls = setup_route(monkeypatch)
+    from app.routes.wallet import create_user_wallets
+    from app.schemas.wallet import BulkWalletRequest
+    from app.services import provisioning
+
+    async def activate_vault_asset(vault_id: str, asset: str):
+        calls.append(("activate_vault_asset", vault_id, asset))
+        if asset == "USDT_TRC20":
+            raise RuntimeError("provider unavailable")
+        return f"ADDR_{asset}"
+
+    monkeypatch.setattr(provisioning, "activate_vault_asset", activate_vault_asset)
+    from app.services import vault_assets
+
+    # TRX is already activated in the vault but has no address on record
+    vault_assets.mirror[("V1", "TRX")] = None
+
+    session = DummySession()
+    user = User(id="user-1", email_verified=True)
+    existing = asyncio.run(create_user_wallet("BTC", current_user=user, db=session))
+    calls.clear()
+
+    payload = BulkWalletRequest(assets=["BTC", "ETH", "TRX", "USDT_TRC20", "DOGE", "ETH"])
+    response = asyncio.run(create_user_wallets(payload, current_user=user, db=session))
+
+    by_asset = {r.asset: r for r in response.results}
+    assert [r.asset for r in response.results] == ["BTC", "ETH", "TRX", "USDT_TRC20", "DOGE"]
+    assert by_asset["BTC"].status == "existing"
+    assert by_asset["BTC"].wallet is existing
+    assert by_asset["ETH"].status == "created"
+    assert by_asset["ETH"].wallet.address == "ADDR_ETH"
+    assert by_asset["TRX"].status == "created"
+    assert by_asset["USDT_TRC20"].status == "failed"
+    assert by_asset["USDT_TRC20"].error == "provider unavailable"
+    assert by_asset["DOGE"].status == "failed"
+    # The vault is only read from the provider to confirm the failed activation
+    assert calls.count(("get_vault_asset_ids", "V1")) == 1
+    assert ("generate_address_for_vault", "V1", "TRX") in calls
+    assert ("activate_vault_asset", "V1", "ETH") in calls
+    assert {w.currency for w in session.wallets} == {"BTC", "ETH", "TRX"}
+    assert vault_assets.mirror[("V1", "ETH")] == "ADDR_ETH"
+
+
 def test_create_vault(monkeypatch):
     create_user_wallet, User, DummySession, calls = setup_route(monkeypatch)
     from app.routes.wallet import create_user_vault
@@ -391,15 +672,10 @@ def test_create_vault(monkeypatch):
 
 def test_adding_existing_asset_returns_409(monkeypatch):
     create_user_wallet, User, DummySession, calls = setup_route(monkeypatch)
-    from app.routes import wallet as wallet_route
-    from app.services.fireblocks import AssetAlreadyExistsError
+    from app.services import vault_assets
     from app.models.vault import Vault as RouteVault
 
-    async def raise_exists(vault_id: str, asset: str):
-        calls.append(("create_asset_for_vault", vault_id, asset))
-        raise AssetAlreadyExistsError("exists")
-
-    wallet_route.create_asset_for_vault = raise_exists
+    vault_assets.mirror[("V1", "BTC_TEST")] = "OLDADDR"
 
     session = DummySession()
     user = User(id="user-1", email_verified=True, has_vault=True)
@@ -412,7 +688,41 @@ def test_adding_existing_asset_returns_409(monkeypatch):
         assert getattr(exc, "status_code", None) == 409
         assert getattr(exc, "detail", None) == "asset already provisioned for this vault"
 
-    assert calls == [("create_asset_for_vault", "V1", "BTC_TEST")]
+    # Answered from the local mirror without any provider call
+    assert calls == []
+
+
+def test_stale_mirror_falls_back_to_provider_read(monkeypatch):
+    create_user_wallet, User, DummySession, calls = setup_route(monkeypatch)
+    from app.services import provisioning, vault_assets
+    from app.models.vault import Vault as RouteVault
+
+    async def activation_fails(vault_id: str, asset: str):
+        calls.append(("activate_vault_asset", vault_id, asset))
+        raise RuntimeError("asset already exists")
+
+    async def get_vault_asset_ids(vault_id: str):
+        calls.append(("get_vault_asset_ids", vault_id))
+        return {"BTC_TEST"}
+
+    monkeypatch.setattr(provisioning, "activate_vault_asset", activation_fails)
+    monkeypatch.setattr(provisioning, "get_vault_asset_ids", get_vault_asset_ids)
+
+    session = DummySession()
+    user = User(id="user-1", email_verified=True, has_vault=True)
+    session.vault = RouteVault(vault_id="V1", user_id=user.id)
+
+    try:
+        asyncio.run(create_user_wallet("BTC_TEST", current_user=user, db=session))
+        assert False, "Expected HTTPException"
+    except Exception as exc:
+        assert getattr(exc, "status_code", None) == 409
+
+    assert calls == [
+        ("activate_vault_asset", "V1", "BTC_TEST"),
+        ("get_vault_asset_ids", "V1"),
+    ]
+    assert ("V1", "BTC_TEST") in vault_assets.mirror
 
 
 def test_external_transfer_internal_when_address_matches(monkeypatch):
@@ -496,6 +806,184 @@ def test_external_transfer_external_when_unknown_address(monkeypatch):
     assert session.transactions[0].address_to == "UNKNOWN"
 
 
+def test_external_transfer_over_velocity_limit_is_rejected(monkeypatch):
+    create_user_wallet, User, DummySession, calls = setup_route(monkeypatch)
+    from app.core.amounts import Amount
+    from app.core.velocity import VelocityLimits
+    from app.routes import wallet as wallet_route
+    from app.models.wallet import Wallet as RouteWallet
+    from app.schemas.wallet import WithdrawalRequest
+
+    limits = VelocityLimits({"BTC_TEST": Amount.parse("1.5")}, {})
+    monkeypatch.setattr(wallet_route, "velocity_limits", limits)
+
+    session = DummySession()
+    user = User(id="user-1", email_verified=True, has_vault=True)
+    wallet = RouteWallet(
+        user_id=user.id,
+        vault_id="V1",
+        address="SRCADDR",
+        currency="BTC_TEST",
+        network="FIREBLOCKS",
+    )
+    session.add(wallet)
+
+    def withdraw():
+        payload = WithdrawalRequest(address="UNKNOWN", amount="1", asset="BTC_TEST")
+        return asyncio.run(
+            wallet_route.external_transfer(wallet.id, payload, current_user=user, db=session)
+        )
+
+    assert withdraw().transfer_id == "T1"
+    try:
+        withdraw()
+        assert False, "Expected HTTPException"
+    except Exception as exc:
+        assert getattr(exc, "status_code", None) == 429
+    assert len(session.transactions) == 1
+    assert limits.exceeded(user.id, "BTC_TEST", "0.5") is None
+
+
+def test_velocity_limit_counts_withdrawals_made_through_other_workers(monkeypatch):
+    create_user_wallet, User, DummySession, calls = setup_route(monkeypatch)
+    from app.core.amounts import Amount
+    from app.core.velocity import VelocityLimits
+    from app.routes import wallet as wallet_route
+    from app.models.wallet import Wallet as RouteWallet
+    from app.schemas.wallet import WithdrawalRequest
+
+    session = DummySession()
+    user = User(id="user-1", email_verified=True, has_vault=True)
+    wallet = RouteWallet(
+        user_id=user.id,
+        vault_id="V1",
+        address="SRCADDR",
+        currency="BTC_TEST",
+        network="FIREBLOCKS",
+    )
+    session.add(wallet)
+
+    def withdraw():
+        # A fresh set of totals for each request, as if each hit another worker
+        limits = VelocityLimits({"BTC_TEST": Amount.parse("1.5")}, {})
+        monkeypatch.setattr(wallet_route, "velocity_limits", limits)
+        payload = WithdrawalRequest(address="UNKNOWN", amount="1", asset="BTC_TEST")
+        return asyncio.run(
+            wallet_route.external_transfer(wallet.id, payload, current_user=user, db=session)
+        )
+
+    assert withdraw().transfer_id == "T1"
+    try:
+        withdraw()
+        assert False, "Expected HTTPException"
+    except Exception as exc:
+        assert getattr(exc, "status_code", None) == 429
+    assert len(session.transactions) == 1
+
+
+def test_external_transfer_retry_with_idempotency_key_is_replayed(monkeypatch):
+    create_user_wallet, User, DummySession, calls = setup_route(monkeypatch)
+    from app.routes.wallet import external_transfer
+    from app.models.wallet import Wallet as RouteWallet
+    from app.schemas.wallet import WithdrawalRequest
+
+    session = DummySession()
+    user = User(id="user-1", email_verified=True, has_vault=True)
+    wallet = RouteWallet(
+        user_id=user.id,
+        vault_id="V1",
+        address="SRCADDR",
+        currency="BTC_TEST",
+        network="FIREBLOCKS",
+    )
+    session.add(wallet)
+
+    def withdraw(amount):
+        payload = WithdrawalRequest(address="UNKNOWN", amount=amount, asset="BTC_TEST")
+        return external_transfer(
+            wallet.id, payload, current_user=user, db=session, idempotency_key="retry-1"
+        )
+
+    async def scenario():
+        # A concurrent duplicate waits for the first request
+        return await asyncio.gather(withdraw("1"), withdraw("1.0"))
+
+    first, duplicate = asyncio.run(scenario())
+    retry = asyncio.run(withdraw("1"))
+
+    assert first.transfer_id == duplicate.transfer_id == retry.transfer_id == "T1"
+    assert [c[0] for c in calls].count("create_transfer") == 1
+    assert len(session.transactions) == 1
+    assert session.transactions[0].idempotency_key == "retry-1"
+    try:
+        asyncio.run(withdraw("2"))
+        assert False, "Expected HTTPException"
+    except Exception as exc:
+        assert getattr(exc, "status_code", None) == 422
+
+    # Another worker only finds the transaction, which keeps the fingerprint
+    from app.routes import wallet as wallet_route
+    from app.services.idempotency import IdempotencyStore
+
+    monkeypatch.setattr(wallet_route, "idempotency_store", IdempotencyStore(60, 10))
+    try:
+        asyncio.run(withdraw("2"))
+        assert False, "Expected HTTPException"
+    except Exception as exc:
+        assert getattr(exc, "status_code", None) == 422
+    assert [c[0] for c in calls].count("create_transfer") == 1
+
+
+def test_external_transfer_is_queued_when_batching(monkeypatch):
+    create_user_wallet, User, DummySession, calls = setup_route(monkeypatch)
+    from app.routes import wallet as wallet_routes
+    from app.models.wallet import Wallet as RouteWallet
+    from app.schemas.wallet import WithdrawalRequest
+    from app.services import withdrawal_batches
+
+    async def get_wallet_balance(vault_id, asset):
+        calls.append(("get_wallet_balance", vault_id, asset))
+        return {"balance": "3"}
+
+    monkeypatch.setattr(wallet_routes, "get_wallet_balance", get_wallet_balance)
+    session = DummySession()
+    user = User(id="user-1", email_verified=True, has_vault=True)
+    wallet = RouteWallet(
+        user_id=user.id,
+        vault_id="V1",
+        address="SRCADDR",
+        currency="BTC_TEST",
+        network="FIREBLOCKS",
+    )
+    session.add(wallet)
+    withdrawal_batches.batched.add("BTC_TEST")
+    withdrawal_batches.queued[wallet.id] = "1.5"
+
+    payload = WithdrawalRequest(address="UNKNOWN", amount="1", asset="BTC_TEST")
+    result = asyncio.run(
+        wallet_routes.external_transfer(wallet.id, payload, current_user=user, db=session)
+    )
+
+    assert result.status == "queued"
+    assert result.transfer_id == ""
+    assert calls == [("get_wallet_balance", "V1", "BTC_TEST")]
+    tx = session.transactions[0]
+    assert tx.meta == {"batch": "queued"}
+    assert not hasattr(tx, "provider_ref_id")
+    assert tx.balance_after == Decimal("0.5")
+
+    # Queued withdrawals count against the balance
+    withdrawal_batches.queued[wallet.id] = "2.5"
+    try:
+        asyncio.run(
+            wallet_routes.external_transfer(wallet.id, payload, current_user=user, db=session)
+        )
+        assert False, "Expected HTTPException"
+    except Exception as exc:
+        assert getattr(exc, "status_code", None) == 400
+    assert len(session.transactions) == 1
+
+
 def test_internal_transfer_between_users(monkeypatch):
     create_user_wallet, User, DummySession, calls = setup_route(monkeypatch)
     from app.routes.wallet import internal_transfer
@@ -636,6 +1124,132 @@ def test_donation_asset_mismatch_raises(monkeypatch):
         assert getattr(exc, "status_code", None) == 400
 
 
+def test_donation_destination_is_resolved_once(monkeypatch):
+    create_user_wallet, User, DummySession, calls = setup_route(monkeypatch)
+    from app.routes.wallet import donate
+    from app.models.wallet import Wallet as RouteWallet
+    from app.models.user import User as RouteUser
+    from app.schemas.wallet import DonationRequest
+    from app.config import settings
+
+    settings.DONATION_PRIVACY_ID = "DONATE"
+
+    session = DummySession()
+    user = User(id="user-1", email_verified=True, has_vault=True)
+    wallet = RouteWallet(
+        user_id=user.id,
+        vault_id="V1",
+        address="SRCADDR",
+        currency="BTC_TEST",
+        network="FIREBLOCKS",
+    )
+    session.add(wallet)
+    session.add(User(id="user-2", email_verified=True, has_vault=True, privacy_id="DONATE"))
+    session.add(
+        RouteWallet(
+            user_id="user-2",
+            vault_id="V2",
+            address="DONADDR",
+            currency="BTC_TEST",
+            network="FIREBLOCKS",
+        )
+    )
+
+    queried = []
+    execute = session.execute
+
+    async def tracking_execute(query):
+        queried.append(query.model)
+        return await execute(query)
+
+    session.execute = tracking_execute
+    payload = DonationRequest(amount="1", asset="BTC_TEST")
+
+    asyncio.run(donate(wallet.id, payload, current_user=user, db=session))
+    assert RouteUser in queried
+
+    queried.clear()
+    asyncio.run(donate(wallet.id, payload, current_user=user, db=session))
+    assert queried == [RouteWallet]
+    assert len(session.transactions) == 4
+    assert session.transactions[3].address_to == "DONADDR"
+
+
+def test_donation_destination_is_provisioned_before_the_idempotency_lock(monkeypatch):
+    create_user_wallet, User, DummySession, calls = setup_route(monkeypatch)
+    from app.routes import wallet as wallet_route
+    from app.models.wallet import Wallet as RouteWallet
+    from app.schemas.wallet import DonationRequest
+    from app.config import settings
+
+    settings.DONATION_PRIVACY_ID = "DONATE"
+
+    session = DummySession()
+    user = User(id="user-1", email_verified=True, has_vault=True)
+    wallet = RouteWallet(
+        user_id=user.id,
+        vault_id="V1",
+        address="SRCADDR",
+        currency="BTC_TEST",
+        network="FIREBLOCKS",
+    )
+    session.add(wallet)
+    session.add(User(id="user-2", email_verified=True, has_vault=True, privacy_id="DONATE"))
+
+    resolved = []
+
+    class Store:
+        async def run(self, db, user_id, key, fingerprint, handler, replay):
+            resolved.append(dict(wallet_route.donation_destinations._by_asset))
+            return await handler()
+
+    monkeypatch.setattr(wallet_route, "idempotency_store", Store())
+    payload = DonationRequest(amount="1", asset="BTC_TEST")
+    asyncio.run(
+        wallet_route.donate(
+            wallet.id, payload, current_user=user, db=session, idempotency_key="k1"
+        )
+    )
+
+    assert list(resolved[0]) == ["BTC_TEST"]
+    assert session.transactions[0].address_to == resolved[0]["BTC_TEST"].address
+
+
+def test_failed_donation_forgets_the_cached_destination(monkeypatch):
+    create_user_wallet, User, DummySession, calls = setup_route(monkeypatch)
+    from app.routes import wallet as wallet_route
+    from app.models.wallet import Wallet as RouteWallet
+    from app.schemas.wallet import DonationRequest
+    from app.config import settings
+
+    settings.DONATION_PRIVACY_ID = "DONATE"
+
+    session = DummySession()
+    user = User(id="user-1", email_verified=True, has_vault=True)
+    wallet = RouteWallet(
+        user_id=user.id,
+        vault_id="V1",
+        address="SRCADDR",
+        currency="BTC_TEST",
+        network="FIREBLOCKS",
+    )
+    session.add(wallet)
+    session.add(User(id="user-2", email_verified=True, has_vault=True, privacy_id="DONATE"))
+
+    async def transfer_between_vault_accounts(*args, **kwargs):
+        raise RuntimeError("vault not found")
+
+    monkeypatch.setattr(
+        wallet_route, "transfer_between_vault_accounts", transfer_between_vault_accounts
+    )
+    payload = DonationRequest(amount="1", asset="BTC_TEST")
+    with pytest.raises(RuntimeError):
+        asyncio.run(wallet_route.donate(wallet.id, payload, current_user=user, db=session))
+
+    assert "BTC_TEST" not in wallet_route.donation_destinations._by_asset
+    assert session.transactions == []
+
+
 def test_estimate_fee_route(monkeypatch):
     create_user_wallet, User, DummySession, calls = setup_route(monkeypatch)
     from app.routes.wallet import estimate_fee
@@ -671,3 +1285,36 @@ def test_estimate_fee_route(monkeypatch):
         "ADDR",
     )
 
+
+def test_estimate_fee_route_uses_fee_table(monkeypatch):
+    create_user_wallet, User, DummySession, calls = setup_route(monkeypatch)
+    from app.routes.wallet import estimate_fee
+    from app.schemas.wallet import FeeEstimateRequest
+    from app.models.wallet import Wallet as RouteWallet
+    from app.services.fee_engine import fee_engine
+
+    user = User(id="user-1", email_verified=True)
+    session = DummySession()
+    wallet = RouteWallet(
+        user_id=user.id,
+        vault_id="V1",
+        address="SRCADDR",
+        currency="BTC_TEST",
+        network="FIREBLOCKS",
+    )
+    session.add(wallet)
+    quote = {"low": "0.00001", "medium": "0.00002", "high": "0.00003"}
+    fee_engine.quotes[("BTC_TEST", "0.5", "ADDR")] = quote
+
+    payload = FeeEstimateRequest(
+        wallet_id=wallet.id,
+        asset="BTC_TEST",
+        amount="0.5",
+        destination_address="ADDR",
+    )
+
+    result = asyncio.run(estimate_fee(payload, current_user=user, db=session))
+
+    assert result == quote
+    assert not any(call[0] == "estimate_transaction_fee" for call in calls)
+
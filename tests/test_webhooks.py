@@ -0,0 +1,246 @@
+import asyncio
+import base64
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("cryptography")
+
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+
+class DummyResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class DummySession:
+    def __init__(self, store):
+        self.store = store
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt):
+        params = stmt.compile().params
+        new = []
+        for key, value in params.items():
+            if key.startswith("event_id") and value not in self.store:
+                self.store.add(value)
+                new.append(value)
+        return DummyResult(new)
+
+    async def commit(self):
+        pass
+
+
+def test_signature_verification(monkeypatch):
+    from app.config import settings
+    from app.services import webhook_ingest
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    monkeypatch.setattr(settings, "FIREBLOCKS_WEBHOOK_PUBLIC_KEY", pem)
+
+    body = json.dumps({"type": "TRANSACTION_STATUS_UPDATED", "data": {"id": "tx1"}}).encode()
+    signature = base64.b64encode(
+        key.sign(body, padding.PKCS1v15(), hashes.SHA512())
+    ).decode()
+
+    assert webhook_ingest.verify_signature(body, signature)
+    assert not webhook_ingest.verify_signature(body + b" ", signature)
+    assert not webhook_ingest.verify_signature(body, None)
+
+    monkeypatch.setattr(settings, "FIREBLOCKS_WEBHOOK_PUBLIC_KEY", None)
+    assert not webhook_ingest.verify_signature(body, signature)
+
+
+def test_writer_batches_and_deduplicates():
+    from app.services.webhook_ingest import WebhookIngestor, WebhookQueueFullError
+
+    store = set()
+    ingestor = WebhookIngestor(maxsize=10)
+
+    async def scenario():
+        for i in [1, 2, 2, 3]:
+            payload = {"id": f"evt{i}", "type": "TRANSACTION_STATUS_UPDATED", "data": {"id": f"tx{i}"}}
+            ingestor.submit(json.dumps(payload).encode(), payload)
+        batch = await ingestor._next_batch()
+        assert len(batch) == 4
+        written = await ingestor.write(lambda: DummySession(store), batch)
+        assert written == 3
+
+        for i in range(10):
+            ingestor.submit(b"{}", {"id": f"more{i}"})
+        with pytest.raises(WebhookQueueFullError):
+            ingestor.submit(b"{}", {"id": "overflow"})
+
+    asyncio.run(scenario())
+    assert store == {"evt1", "evt2", "evt3"}
+
+
+class RejectingSession(DummySession):
+    async def execute(self, stmt):
+        if "bad" in stmt.compile().params.values():
+            raise ValueError("malformed event")
+        return await super().execute(stmt)
+
+
+def test_writer_dead_letters_rows_the_database_rejects():
+    from app.core import metrics
+    from app.services.webhook_ingest import WebhookIngestor, event_row
+
+    store = set()
+    ingestor = WebhookIngestor(maxsize=10)
+    batch = [event_row(b"{}", {"id": event_id}) for event_id in ("evt1", "bad", "evt2")]
+    before = metrics.get("webhook_events_dead_lettered_total")
+
+    asyncio.run(ingestor._flush(lambda: RejectingSession(store), batch))
+
+    assert store == {"evt1", "evt2"}
+    assert batch == []
+    assert metrics.get("webhook_events_dead_lettered_total") == before + 1
+
+
+def test_processor_keeps_final_status_and_latest_details():
+    from decimal import Decimal
+
+    from app.models.transaction import TxStatus
+    from app.services.webhook_processor import _merge, parse_transaction_event
+
+    completed = parse_transaction_event(
+        {"id": "tx1", "status": "COMPLETED", "txHash": "0xabc", "feeInfo": {"networkFee": "0.0021"}}
+    )
+    assert completed.status == TxStatus.confirmed
+    assert completed.fee == Decimal("0.0021")
+
+    late = parse_transaction_event({"id": "tx1", "status": "CONFIRMING"})
+    merged = _merge(completed, late)
+    assert merged.status == TxStatus.confirmed
+    assert merged.tx_hash == "0xabc"
+    assert merged.fee == Decimal("0.0021")
+
+    with pytest.raises(ValueError):
+        parse_transaction_event({"status": "COMPLETED"})
+
+
+def test_inbound_transfer_is_a_deposit():
+    from decimal import Decimal
+
+    from app.models.transaction import TxStatus
+    from app.services.deposits import parse_deposit_event
+
+    event = {
+        "id": "tx9",
+        "assetId": "BTC",
+        "status": "COMPLETED",
+        "source": {"type": "UNKNOWN"},
+        "destination": {"type": "VAULT_ACCOUNT", "id": "7"},
+        "amountInfo": {"amount": "0.015"},
+        "destinationAddress": "bc1qdest",
+    }
+    deposit = parse_deposit_event(event, TxStatus.confirmed)
+    assert (deposit.vault_id, deposit.asset, deposit.amount) == ("7", "BTC", Decimal("0.015"))
+    assert deposit.status == TxStatus.confirmed
+
+    internal = dict(event, source={"type": "VAULT_ACCOUNT", "id": "3"})
+    assert parse_deposit_event(internal) is None
+    outgoing = dict(event, destination={"type": "EXTERNAL_WALLET"})
+    assert parse_deposit_event(outgoing) is None
+
+
+def test_status_poller_backs_off_with_age():
+    from datetime import datetime, timedelta
+
+    from app.services.status_poller import StatusPoller, poll_interval
+
+    assert poll_interval(60) < poll_interval(3600) <= poll_interval(10 ** 6)
+
+    poller = StatusPoller()
+    now = datetime.utcnow()
+    pending = {
+        "fresh": now - timedelta(seconds=5),
+        "young": now - timedelta(seconds=60),
+        "old": now - timedelta(hours=6),
+    }
+    assert sorted(poller.due(pending, now)) == ["old", "young"]
+
+    for ref in ("young", "old"):
+        poller._last_polled[ref] = 0
+    poller._last_polled["gone"] = 0
+    poller.due(pending, now)
+    assert "gone" not in poller._last_polled
+
+
+def test_status_poller_pages_through_pending_ids(monkeypatch):
+    from datetime import datetime, timedelta
+
+    from app.config import settings
+    from app.services.status_poller import StatusPoller
+
+    monkeypatch.setattr(settings, "STATUS_POLL_BATCH_SIZE", 2)
+    created = datetime.utcnow() - timedelta(hours=1)
+    stuck = ["a", "b", "c"]
+    seen = []
+
+    class PageResult:
+        def __init__(self, rows):
+            self._rows = rows
+
+        def all(self):
+            return self._rows
+
+    class PageSession:
+        async def execute(self, stmt):
+            params = stmt.compile().params
+            # param_1 is the cursor when there is one, else the LIMIT
+            after = params["param_1"] if "param_2" in params else None
+            refs = [ref for ref in stuck if after is None or ref > after]
+            return PageResult([(ref, created) for ref in refs[:2]])
+
+    poller = StatusPoller()
+    poller._last_polled["a2"] = 0
+
+    async def scenario():
+        for _ in range(3):
+            pending, after, upto = await poller._pending(PageSession())
+            seen.append(list(pending))
+            poller.due(pending, datetime.utcnow(), after, upto)
+
+    asyncio.run(scenario())
+    assert seen == [["a", "b"], ["c"], ["a", "b"]]
+    # Only ids inside a page's range are forgotten
+    assert "a2" not in poller._last_polled
+
+
+def test_broker_fans_out_and_drops_oldest_for_slow_subscribers():
+    from app.core.pubsub import Broker
+
+    broker = Broker(maxsize=2)
+
+    async def scenario():
+        with broker.subscribe("a") as first, broker.subscribe("a", "b") as second:
+            assert broker.publish("a", 1) == 2
+            broker.publish("b", 2)
+            broker.publish("a", 3)
+            assert [first.get_nowait(), first.get_nowait()] == [1, 3]
+            # second is full: the oldest message made room for the newest
+            assert [second.get_nowait(), second.get_nowait()] == [2, 3]
+        assert broker.subscriber_count("a") == 0
+        assert broker.publish("a", 4) == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,167 @@
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+pytest.importorskip("sqlalchemy")
+
+
+def make_tx(amount, age=0, currency="BTC", group_id=None, batch="queued"):
+    from app.models.transaction import TxStatus, TxType
+
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        user_id=uuid.uuid4(),
+        wallet_id=uuid.uuid4(),
+        type=TxType.crypto_out,
+        status=TxStatus.pending,
+        amount=Decimal(amount),
+        currency=currency,
+        balance_after=Decimal("10"),
+        fee_amount=Decimal("0"),
+        provider_ref_id=None,
+        address_to="bc1qexample",
+        tx_hash=None,
+        description=None,
+        group_id=group_id,
+        meta={"batch": batch, "vault_id": "V1"},
+        created_at=datetime(2024, 1, 1) - timedelta(seconds=age),
+        updated_at=datetime(2024, 1, 1),
+    )
+
+
+class DummyResult:
+    def __init__(self, value):
+        self._value = value
+
+    def scalar_one_or_none(self):
+        return self._value
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self._value
+
+
+class DummySession:
+    def __init__(self, results):
+        self.results = list(results)
+        self.committed = False
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=SimpleNamespace(name="sqlite"))
+
+    async def execute(self, stmt):
+        return DummyResult(self.results.pop(0))
+
+    async def commit(self):
+        self.committed = True
+
+    async def rollback(self):
+        pass
+
+
+def test_batches_are_per_asset_and_vault_and_due_by_age_or_size():
+    from app.services.withdrawal_batches import plan_batches
+
+    now = datetime(2024, 1, 1)
+    old = [(make_tx("1", age=120), "V1"), (make_tx("2", age=10), "V1")]
+    other_vault = [(make_tx("1", age=10), "V2")]
+    full = [(make_tx("1", age=1, currency="BTC_TEST"), "V1") for _ in range(3)]
+
+    batches = plan_batches(old + other_vault + full, now, window=60, max_outputs=3)
+
+    assert batches == [old, full]
+
+
+def test_submitted_batch_pro_rates_the_fee(monkeypatch):
+    from app.services import withdrawal_batches
+
+    group_id = uuid.uuid4()
+    txs = [make_tx("1", group_id=group_id, batch="submitting"),
+           make_tx("3", group_id=group_id, batch="submitting")]
+    calls = []
+
+    async def create_batch_transfer(vault_id, asset, outputs, external_tx_id):
+        calls.append((vault_id, asset, outputs, external_tx_id))
+        return {"id": "FB1", "status": "SUBMITTED", "fee": "0.0004"}
+
+    monkeypatch.setattr(withdrawal_batches, "create_batch_transfer", create_batch_transfer)
+    monkeypatch.setattr(withdrawal_batches, "publish_transaction_changes", lambda rows: None)
+    session = DummySession([group_id, txs])
+
+    assert asyncio.run(withdrawal_batches.submit_next_batch(session)) is True
+
+    assert calls == [
+        ("V1", "BTC", [("bc1qexample", "1"), ("bc1qexample", "3")], str(group_id))
+    ]
+    assert session.committed
+    assert [tx.provider_ref_id for tx in txs] == ["FB1", "FB1"]
+    assert [tx.fee_amount for tx in txs] == [Decimal("0.0001"), Decimal("0.0003")]
+    assert txs[1].balance_after == Decimal("9.9997")
+    assert txs[1].meta["batch"] == "submitted"
+    assert Decimal(txs[1].meta["fee_share"]) == Decimal("0.75")
+
+
+def test_rejected_batch_fails_its_withdrawals(monkeypatch):
+    from app.models.transaction import TxStatus
+    from app.services import withdrawal_batches
+
+    group_id = uuid.uuid4()
+    txs = [make_tx("1", group_id=group_id, batch="submitting")]
+
+    class ApiError(Exception):
+        status = 400
+
+    async def create_batch_transfer(*args):
+        raise ApiError("invalid address")
+
+    monkeypatch.setattr(withdrawal_batches, "create_batch_transfer", create_batch_transfer)
+    monkeypatch.setattr(withdrawal_batches, "publish_transaction_changes", lambda rows: None)
+
+    assert asyncio.run(withdrawal_batches.submit_next_batch(DummySession([group_id, txs])))
+    assert txs[0].status == TxStatus.failed
+    assert txs[0].meta["batch"] == "rejected"
+
+    # Unclear failures back off and are retried with the same external id
+    class ServerError(Exception):
+        status = 503
+
+    async def unavailable(*args):
+        raise ServerError("try later")
+
+    txs = [make_tx("1", group_id=group_id, batch="submitting")]
+    monkeypatch.setattr(withdrawal_batches, "create_batch_transfer", unavailable)
+    session = DummySession([group_id, txs])
+    assert asyncio.run(withdrawal_batches.submit_next_batch(session))
+    assert session.committed
+    assert txs[0].status == TxStatus.pending
+    assert txs[0].meta["batch"] == "submitting"
+    assert txs[0].meta["attempts"] == 1
+    assert txs[0].meta["retry_at"] > time.time()
+
+
+def test_failing_batch_is_parked_after_max_attempts(monkeypatch):
+    from app.config import settings
+    from app.services import withdrawal_batches
+
+    monkeypatch.setattr(settings, "WITHDRAWAL_BATCH_MAX_ATTEMPTS", 3)
+    group_id = uuid.uuid4()
+    # A bug rather than a provider error: no vault recorded on the batch
+    txs = [make_tx("1", group_id=group_id, batch="submitting")]
+    del txs[0].meta["vault_id"]
+
+    for _ in range(3):
+        assert asyncio.run(withdrawal_batches.submit_next_batch(DummySession([group_id, txs])))
+
+    assert txs[0].meta["attempts"] == 3
+    assert txs[0].meta["batch"] == "stalled"